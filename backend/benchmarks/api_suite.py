@@ -0,0 +1,320 @@
+"""
+Reproducible API benchmark suite.
+
+Builds a synthetic dataset (see benchmarks/datasets.py) in the local SQLite
+store, then drives the real FastAPI app in-process through one scenario per
+endpoint group and reports p50/p95/p99 latency, requests per second, CPU
+time per request (process CPU, all threads) and store operations (SQL
+statements) per request.
+
+The dataset is built once per profile and seed and cached; every run works
+on a fresh copy, so writes made by one run never leak into the next. Results
+can be saved as a baseline, and a comparison run exits non-zero when a
+scenario regresses beyond the tolerances.
+
+Usage (from the backend directory):
+    python -m benchmarks.api_suite --profile small
+    python -m benchmarks.api_suite --profile full --save-baseline benchmarks/baselines/full.json
+    python -m benchmarks.api_suite --profile full --compare benchmarks/baselines/full.json
+"""
+import argparse
+import asyncio
+import inspect
+import json
+import math
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+from typing import Optional
+from urllib.parse import quote
+
+import httpx
+
+from benchmarks.datasets import DATASET_NOW, PROFILES, build_dataset, user_ids
+from models.schemas import QuizQuestion, ItemType
+from services.quiz_attempt_buffer import get_quiz_attempt_buffer
+from services.quiz_sessions import get_quiz_session_store
+from services.repository import get_async_repository
+
+QUIZ_LENGTH = 10
+DUE_PAGE_SIZE = 20
+
+
+# Each scenario returns (method, url, json body) for one request
+def _catalog(rng, ctx):
+    if rng.random() < 0.5:
+        return 'GET', f"/api/radicals/?limit=50&offset={rng.randrange(0, 200, 50)}", None
+    hsk = rng.choice(['', '&hsk_level=1', '&hsk_level=3'])
+    return 'GET', f"/api/characters/?limit=50&offset={rng.randrange(0, 1000, 50)}{hsk}", None
+
+
+def _search(rng, ctx):
+    character = ctx['characters'][rng.randrange(len(ctx['characters']))]
+    query = rng.choice([character['meaning'].split(',')[0][:4], character['pinyin'], character['hanzi']])
+    return 'GET', f"/api/characters/search/{query}", None
+
+
+def _quiz_generate(rng, ctx):
+    return 'GET', f"/api/quiz/generate/{rng.choice(ctx['users'])}?count=10", None
+
+
+async def _quiz_submit(rng, ctx):
+    # Answers one question of a server-side quiz session, opening a new session every QUIZ_LENGTH questions
+    pending = ctx.setdefault('quiz_questions', [])
+    if not pending:
+        user_id = rng.choice(ctx['users'])
+        questions = [
+            QuizQuestion(id=f"q_{c['id']}_{i}", question_type='meaning_match', question_text=f"What does '{c['hanzi']}' mean?",
+                         options=[c['meaning']], item_id=c['id'], item_type=ItemType.CHARACTER, correct_answer=c['meaning'])
+            for i, c in enumerate(rng.sample(ctx['characters'], QUIZ_LENGTH))
+        ]
+        session = await get_quiz_session_store().create(user_id, questions)
+        pending.extend((user_id, session.quiz_id, question) for question in questions)
+
+    user_id, quiz_id, question = pending.pop()
+    return 'POST', "/api/quiz/submit", {
+        'user_id': user_id,
+        'quiz_id': quiz_id,
+        'question_id': question.id,
+        'answer': question.correct_answer if rng.random() < 0.7 else 'x',
+    }
+
+
+def _review(rng, ctx):
+    return ('POST', f"/api/progress/{rng.choice(ctx['users'])}/review?item_id={rng.choice(ctx['character_ids'])}"
+                    f"&item_type=character&correct={'true' if rng.random() < 0.7 else 'false'}", None)
+
+
+def _progress(rng, ctx):
+    return 'GET', f"/api/progress/{rng.choice(ctx['users'])}", None
+
+
+def _due_url(user_id: str, limit: int, cursor: Optional[str] = None) -> str:
+    # Evaluated at the dataset's reference instant, so the due share does not drift with the run date
+    url = f"/api/progress/{user_id}/due?limit={limit}&now={quote(DATASET_NOW.isoformat())}"
+    return url + f"&cursor={quote(cursor)}" if cursor else url
+
+
+def _due(rng, ctx):
+    return 'GET', _due_url(rng.choice(ctx['users']), 50), None
+
+
+async def _due_pages(rng, ctx):
+    # Walks a user's due list page by page. The cursors are read from the store while the requests are
+    # prepared, so each request carries the cursor the previous page returns in X-Next-Cursor
+    pending = ctx.setdefault('due_pages', [])
+    if not pending:
+        user_id, cursor = rng.choice(ctx['users']), None
+        while True:
+            pending.append(_due_url(user_id, DUE_PAGE_SIZE, cursor))
+            _, cursor = await get_async_repository().get_due_progress(user_id, limit=DUE_PAGE_SIZE, cursor=cursor,
+                                                                      now=DATASET_NOW)
+            if not cursor:
+                break
+        pending.reverse()
+    return 'GET', pending.pop(), None
+
+
+def _stats(rng, ctx):
+    return 'GET', f"/api/progress/{rng.choice(ctx['users'])}/stats", None
+
+
+def _mistakes(rng, ctx):
+    return 'GET', f"/api/quiz/{rng.choice(ctx['users'])}/mistakes?decay={rng.choice(['true', 'false'])}", None
+
+
+SCENARIOS = {
+    'catalog': _catalog,
+    'search': _search,
+    'quiz_generate': _quiz_generate,
+    'quiz_submit': _quiz_submit,
+    'review': _review,
+    'progress': _progress,
+    'due': _due,
+    'due_pages': _due_pages,
+    'stats': _stats,
+    'mistakes': _mistakes,
+}
+
+
+def percentile(sorted_values: list, p: float) -> float:
+    """Nearest-rank percentile of an ascending list"""
+    if not sorted_values:
+        return 0.0
+    return sorted_values[max(0, math.ceil(p / 100 * len(sorted_values)) - 1)]
+
+
+async def run_scenario(client: httpx.AsyncClient, repository, requests: list, concurrency: int, warmup: int):
+    """Send `requests` with `concurrency` clients and measure them (after `warmup` unmeasured ones)"""
+    for method, url, body in requests[:warmup]:
+        await client.request(method, url, json=body)
+
+    queue = iter(requests[warmup:])
+    latencies, errors = [], []
+
+    async def worker():
+        for method, url, body in queue:
+            start = time.perf_counter()
+            response = await client.request(method, url, json=body)
+            latencies.append(time.perf_counter() - start)
+            if response.status_code >= 400:
+                errors.append(response.status_code)
+
+    statements_before = repository.statement_count
+    cpu_start = time.process_time()
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    cpu = time.process_time() - cpu_start
+    # Count the writes the requests left in the write-behind buffer too
+    await get_quiz_attempt_buffer().flush()
+    statements = repository.statement_count - statements_before
+
+    latencies.sort()
+    return {
+        'requests': len(latencies),
+        'rps': len(latencies) / elapsed,
+        'p50_ms': percentile(latencies, 50) * 1000,
+        'p95_ms': percentile(latencies, 95) * 1000,
+        'p99_ms': percentile(latencies, 99) * 1000,
+        'cpu_ms_per_request': cpu * 1000 / max(len(latencies), 1),
+        'store_ops_per_request': statements / max(len(latencies), 1),
+        'errors': len(errors),
+    }
+
+
+def compare(results: dict, baseline: dict, latency_tolerance: float, ops_tolerance: float) -> list:
+    """Regressions of `results` against `baseline`, as human-readable lines"""
+    regressions = []
+    for name, base in baseline['scenarios'].items():
+        current = results['scenarios'].get(name)
+        if current is None:
+            continue
+        if current['p95_ms'] > base['p95_ms'] * (1 + latency_tolerance):
+            regressions.append(f"{name}: p95 {base['p95_ms']:.2f}ms -> {current['p95_ms']:.2f}ms")
+        if current['rps'] < base['rps'] * (1 - latency_tolerance):
+            regressions.append(f"{name}: req/s {base['rps']:.1f} -> {current['rps']:.1f}")
+        base_cpu = base.get('cpu_ms_per_request')
+        if base_cpu is not None and current['cpu_ms_per_request'] > base_cpu * (1 + latency_tolerance):
+            regressions.append(f"{name}: CPU/request {base_cpu:.2f}ms "
+                               f"-> {current['cpu_ms_per_request']:.2f}ms")
+        if current['store_ops_per_request'] > base['store_ops_per_request'] * (1 + ops_tolerance) + 1e-9:
+            regressions.append(f"{name}: store ops/request {base['store_ops_per_request']:.2f} "
+                               f"-> {current['store_ops_per_request']:.2f}")
+        if current['errors'] > base['errors']:
+            regressions.append(f"{name}: errors {base['errors']} -> {current['errors']}")
+    return regressions
+
+
+def prepare_store(args) -> str:
+    """Build (or reuse) the pristine dataset file and return the path of a fresh working copy"""
+    pristine = args.db or os.path.join(tempfile.gettempdir(), f"happy-hanzy-bench-{args.profile}-{args.seed}.sqlite")
+    if args.fresh and os.path.exists(pristine):
+        os.remove(pristine)
+
+    if not os.path.exists(pristine):
+        from services.sqlite_repository import SQLiteRepository
+        print(f"Building '{args.profile}' dataset in {pristine} ...")
+        start = time.perf_counter()
+        builder = SQLiteRepository(pristine + ".tmp")
+        build_dataset(builder, args.profile, args.seed)
+        builder.close()
+        os.replace(pristine + ".tmp", pristine)
+        print(f"✓ Dataset built in {time.perf_counter() - start:.1f}s\n")
+
+    working = pristine + ".run"
+    # WAL files left by an interrupted run would be replayed into the fresh copy and corrupt it
+    for path in (working + "-wal", working + "-shm"):
+        if os.path.exists(path):
+            os.remove(path)
+    shutil.copyfile(pristine, working)
+    return working
+
+
+async def main_async(args):
+    working = prepare_store(args)
+    os.environ['STORAGE_BACKEND'] = 'sqlite'
+    os.environ['SQLITE_PATH'] = working
+
+    import main
+    from services.repository import get_repository
+    repository = get_repository()
+
+    radicals, characters = repository.load_catalog()
+    users = user_ids(min(args.users or PROFILES[args.profile]['users'], PROFILES[args.profile]['users']))
+    ctx = {'users': users, 'characters': list(characters.values()), 'character_ids': list(characters)}
+
+    results = {'profile': args.profile, 'seed': args.seed, 'concurrency': args.concurrency, 'scenarios': {}}
+    header = (f"{'scenario':<14} {'requests':>9} {'req/s':>9} {'p50':>9} {'p95':>9} {'p99':>9} "
+              f"{'cpu/req':>9} {'ops/req':>8} {'errors':>7}")
+    print(f"profile={args.profile} users={len(users):,} concurrency={args.concurrency}\n")
+    print(header)
+    print("-" * len(header))
+
+    # ASGITransport does not send lifespan events, so run the app's startup/shutdown hooks here
+    await main.app.router.startup()
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for name in args.scenarios:
+            rng = random.Random(f"{args.seed}:{name}")
+            requests = []
+            for _ in range(args.warmup + args.requests):
+                # Builders that set up server-side state (quiz sessions) are coroutines
+                request = SCENARIOS[name](rng, ctx)
+                requests.append(await request if inspect.isawaitable(request) else request)
+            result = await run_scenario(client, repository, requests, args.concurrency, args.warmup)
+            results['scenarios'][name] = result
+            print(f"{name:<14} {result['requests']:>9} {result['rps']:>9.1f} {result['p50_ms']:>7.2f}ms "
+                  f"{result['p95_ms']:>7.2f}ms {result['p99_ms']:>7.2f}ms "
+                  f"{result['cpu_ms_per_request']:>7.2f}ms {result['store_ops_per_request']:>8.2f} "
+                  f"{result['errors']:>7}")
+    await main.app.router.shutdown()
+
+    for path in (working, working + "-wal", working + "-shm"):
+        if os.path.exists(path):
+            os.remove(path)
+
+    if args.save_baseline:
+        os.makedirs(os.path.dirname(os.path.abspath(args.save_baseline)), exist_ok=True)
+        with open(args.save_baseline, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"\n✓ Baseline saved to {args.save_baseline}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.latency_tolerance, args.ops_tolerance)
+        if regressions:
+            print(f"\n✗ {len(regressions)} regression(s) against {args.compare}:")
+            for line in regressions:
+                print(f"  {line}")
+            return 1
+        print(f"\n✓ No regressions against {args.compare}")
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="API benchmark suite on the local SQLite store")
+    parser.add_argument('--profile', choices=sorted(PROFILES), default='small')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--db', help="Dataset file (default: cached in the temp directory per profile and seed)")
+    parser.add_argument('--fresh', action='store_true', help="Rebuild the dataset even if it is cached")
+    parser.add_argument('--scenarios', nargs='+', choices=list(SCENARIOS), default=list(SCENARIOS))
+    parser.add_argument('--users', type=int, help="Virtual users drawn from (default: all users in the profile)")
+    parser.add_argument('--concurrency', type=int, default=32, help="Requests in flight")
+    parser.add_argument('--requests', type=int, default=2000, help="Measured requests per scenario")
+    parser.add_argument('--warmup', type=int, default=50)
+    parser.add_argument('--save-baseline', metavar='PATH')
+    parser.add_argument('--compare', metavar='PATH', help="Fail if results regress against this baseline")
+    parser.add_argument('--latency-tolerance', type=float, default=0.25,
+                        help="Allowed relative p95/throughput regression")
+    parser.add_argument('--ops-tolerance', type=float, default=0.0,
+                        help="Allowed relative increase in store operations per request")
+    sys.exit(asyncio.run(main_async(parser.parse_args())))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,171 @@
+"""
+Benchmark comparing the scalar SpacedRepetitionService with the columnar
+VectorizedSpacedRepetition engine, and checking that both produce identical
+results.
+
+Usage (from the backend directory):
+    python -m benchmarks.bench_srs
+    python -m benchmarks.bench_srs --sizes 1000 100000 --scalar-cap 20000
+"""
+import argparse
+import copy
+import random
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from models.schemas import UserProgress, MasteryLevel, ItemType
+from services.spaced_repetition import SpacedRepetitionService
+from services.srs_vectorized import ProgressColumns, VectorizedSpacedRepetition, to_micros
+
+
+def make_progress(n: int, seed: int = 42) -> list:
+    """Synthetic progress rows with a realistic spread of scheduling state"""
+    rng = random.Random(seed)
+    now = datetime(2026, 1, 1, 12, 0, 0)
+    levels = list(MasteryLevel)
+    rows = []
+    for i in range(n):
+        last = now - timedelta(days=rng.randint(0, 60), seconds=rng.randint(0, 86_399), microseconds=rng.randint(0, 999_999))
+        interval = rng.choice([0, 1, 6, 15, 40])
+        rows.append(UserProgress(
+            user_id=f"user_{i % 1000}",
+            item_id=f"item_{i}",
+            item_type=ItemType.CHARACTER if i % 3 else ItemType.RADICAL,
+            mastery_level=rng.choice(levels),
+            last_reviewed=last,
+            next_review=last + timedelta(days=interval),
+            correct_count=rng.randint(0, 20),
+            incorrect_count=rng.randint(0, 10),
+            ease_factor=round(rng.uniform(1.3, 3.0), 2),
+            interval=interval
+        ))
+    return rows
+
+
+def make_columns(n: int, seed: int = 42) -> ProgressColumns:
+    """Synthetic columns generated directly with NumPy (for sizes too large for objects)"""
+    rng = np.random.default_rng(seed)
+    now = to_micros(datetime(2026, 1, 1, 12, 0, 0))
+    interval = rng.choice(np.array([0, 1, 6, 15, 40], dtype=np.int64), n)
+    last = now - rng.integers(0, 60 * 86_400_000_000, n, dtype=np.int64)
+    ids = np.empty(n, dtype=object)
+    return ProgressColumns(
+        user_id=ids, item_id=ids, item_type=ids,
+        mastery=rng.integers(0, 4, n, dtype=np.int8),
+        last_reviewed=last,
+        next_review=last + interval * 86_400_000_000,
+        correct_count=rng.integers(0, 21, n, dtype=np.int64),
+        incorrect_count=rng.integers(0, 11, n, dtype=np.int64),
+        ease_factor=np.round(rng.uniform(1.3, 3.0, n), 2),
+        interval=interval,
+    )
+
+
+def run_scalar(progress_list, answers, reviewed_at, now):
+    srs = SpacedRepetitionService
+    start = time.perf_counter()
+    for progress, correct in zip(progress_list, answers):
+        srs.calculate_next_review(progress, correct, reviewed_at)
+    review_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    due = srs.get_items_due_for_review(progress_list)
+    due_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    retention = [srs.calculate_retention_rate(p) for p in progress_list]
+    retention_time = time.perf_counter() - start
+    return (review_time, due_time, retention_time), due, retention
+
+
+def run_vectorized(columns, answers, reviewed_at, now):
+    vsrs = VectorizedSpacedRepetition
+    start = time.perf_counter()
+    vsrs.calculate_next_review(columns, answers, reviewed_at)
+    review_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    due = vsrs.get_items_due_for_review(columns, now)
+    due_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    retention = vsrs.calculate_retention_rate(columns)
+    retention_time = time.perf_counter() - start
+    return (review_time, due_time, retention_time), due, retention
+
+
+def verify(n: int):
+    """Check that the vectorized engine matches the scalar service row for row"""
+    progress_list = make_progress(n, seed=7)
+    columns = ProgressColumns.from_progress(progress_list)
+    rng = random.Random(7)
+    reviewed_at = datetime(2026, 1, 2, 8, 30, 0, 123456)
+
+    # Several rounds so intervals, ease and mastery walk through every branch
+    for _ in range(6):
+        answers = [rng.random() < 0.75 for _ in range(n)]
+        for progress, correct in zip(progress_list, answers):
+            SpacedRepetitionService.calculate_next_review(progress, correct, reviewed_at)
+        VectorizedSpacedRepetition.calculate_next_review(columns, np.array(answers), reviewed_at)
+        reviewed_at += timedelta(days=3)
+
+    for i, progress in enumerate(progress_list):
+        assert columns.to_progress(i) == progress, f"row {i} differs"
+
+    now = reviewed_at + timedelta(days=10)
+    scalar_due = [p.item_id for p in _due_at(progress_list, now)]
+    vector_due = [columns.item_id[i] for i in VectorizedSpacedRepetition.get_items_due_for_review(columns, now)]
+    assert scalar_due == vector_due, "due ordering differs"
+
+    scalar_rates = [SpacedRepetitionService.calculate_retention_rate(p) for p in progress_list]
+    assert scalar_rates == VectorizedSpacedRepetition.calculate_retention_rate(columns).tolist(), "retention differs"
+
+
+def _due_at(progress_list, now):
+    priority = {MasteryLevel.NEW: 0, MasteryLevel.LEARNING: 1, MasteryLevel.FAMILIAR: 2, MasteryLevel.MASTERED: 3}
+    due = [p for p in progress_list if p.next_review <= now]
+    due.sort(key=lambda x: (x.next_review, priority[x.mastery_level]))
+    return due
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Scalar vs vectorized SRS benchmark")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1_000, 100_000, 10_000_000])
+    parser.add_argument('--scalar-cap', type=int, default=100_000,
+                        help="Largest size run through the scalar path; bigger sizes are extrapolated")
+    parser.add_argument('--verify-rows', type=int, default=20_000)
+    args = parser.parse_args()
+
+    verify(args.verify_rows)
+    print(f"✓ Vectorized results match scalar results on {args.verify_rows} rows\n")
+
+    reviewed_at = datetime(2026, 1, 2, 8, 30, 0)
+    now = datetime(2026, 1, 3)
+    header = f"{'rows':>12} {'path':>10} {'review':>10} {'due':>10} {'retention':>10} {'total':>10}"
+    print(header)
+    print("-" * len(header))
+
+    for n in args.sizes:
+        scalar_n = min(n, args.scalar_cap)
+        progress_list = make_progress(scalar_n)
+        answers = [i % 4 != 0 for i in range(scalar_n)]
+        scalar_times, _, _ = run_scalar(copy.deepcopy(progress_list), answers, reviewed_at, now)
+        scale = n / scalar_n
+        scalar_times = [t * scale for t in scalar_times]
+        label = "scalar" if scale == 1 else "scalar*"
+
+        columns = make_columns(n)
+        vector_answers = np.arange(n) % 4 != 0
+        vector_times, _, _ = run_vectorized(columns, vector_answers, reviewed_at, now)
+
+        for path, times in ((label, scalar_times), ("vector", vector_times)):
+            print(f"{n:>12,} {path:>10} " + " ".join(f"{t * 1000:>8.1f}ms" for t in times) + f" {sum(times) * 1000:>8.1f}ms")
+        print(f"{'':>12} {'speedup':>10} {sum(scalar_times) / max(sum(vector_times), 1e-9):>9.1f}x")
+
+    print("\n* extrapolated linearly from --scalar-cap rows")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,206 @@
+"""
+Cold-start profile of the API.
+
+Each run starts a fresh interpreter (with `-X importtime`) that imports the
+app, runs its startup hooks and serves one first request per probe URL,
+timing every phase. Reports the median phase times, import time per
+top-level package and the slowest modules, and can append the result to a
+history file (one JSON record per line) to track cold-start milliseconds
+over time.
+
+The app is configured from the environment as usual, so profile the
+serverless setup with e.g.:
+    STARTUP_MODE=lazy CATALOG_SNAPSHOT_PATH=data/catalog_snapshot.json python -m benchmarks.cold_start
+
+Usage (from the backend directory):
+    python -m benchmarks.cold_start
+    python -m benchmarks.cold_start --runs 5 --probe /api/radicals/?limit=50 --probe /api/progress/USER_ID/due
+    python -m benchmarks.cold_start --history benchmarks/cold_start_history.ndjson
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from collections import defaultdict
+from datetime import datetime
+from typing import Dict, List, Tuple
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_PROBES = ['/health', '/api/radicals/?limit=50']
+
+# Written to stderr around `import main`, to pick its lines out of the -X importtime output
+IMPORT_BEGIN = '-- cold-start: import main begin --'
+IMPORT_END = '-- cold-start: import main end --'
+
+
+def _child(probes: List[str]):
+    """Runs in the profiled interpreter; prints the phase timings as JSON"""
+    sys.stderr.write(IMPORT_BEGIN + '\n')
+    start = time.perf_counter()
+    import main
+    import_ms = (time.perf_counter() - start) * 1000
+    sys.stderr.write(IMPORT_END + '\n')
+
+    async def serve():
+        import httpx
+        phases = {}
+        start = time.perf_counter()
+        await main.app.router.startup()
+        phases['startup_ms'] = (time.perf_counter() - start) * 1000
+
+        requests = []
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://cold-start") as client:
+            for url in probes:
+                start = time.perf_counter()
+                response = await client.get(url)
+                requests.append({'url': url, 'status': response.status_code,
+                                 'ms': (time.perf_counter() - start) * 1000})
+        await main.app.router.shutdown()
+        phases['requests'] = requests
+        return phases
+
+    result = {'import_ms': import_ms, **asyncio.run(serve()),
+              'firebase_loaded': 'firebase_admin' in sys.modules}
+    print(json.dumps(result))
+
+
+def parse_importtime(stderr: str) -> List[Tuple[str, int, int]]:
+    """(module, self µs, cumulative µs) for every module imported by `import main`"""
+    modules, inside = [], False
+    for line in stderr.splitlines():
+        if line == IMPORT_BEGIN:
+            inside = True
+        elif line == IMPORT_END:
+            break
+        elif inside and line.startswith('import time:') and '|' in line:
+            self_us, cumulative_us, name = line[len('import time:'):].split('|')
+            if self_us.strip().isdigit():
+                modules.append((name.strip(), int(self_us), int(cumulative_us)))
+    return modules
+
+
+def profile_once(probes: List[str]) -> dict:
+    """One cold start in a fresh interpreter"""
+    command = [sys.executable, '-X', 'importtime', '-m', 'benchmarks.cold_start', '--child']
+    for url in probes:
+        command += ['--probe', url]
+
+    start = time.perf_counter()
+    completed = subprocess.run(command, cwd=BACKEND_DIR, capture_output=True, text=True)
+    process_ms = (time.perf_counter() - start) * 1000
+    if completed.returncode != 0:
+        raise RuntimeError(f"Cold start failed:\n{completed.stderr[-2000:]}")
+
+    result = json.loads(completed.stdout.strip().splitlines()[-1])
+    result['process_ms'] = process_ms
+    result['modules'] = parse_importtime(completed.stderr)
+    return result
+
+
+def _median(values: List[float]) -> float:
+    return statistics.median(values) if values else 0.0
+
+
+def summarize(runs: List[dict], top: int) -> dict:
+    """Median phases over the runs, and import time by package and module"""
+    summary = {
+        'runs': len(runs),
+        'process_ms': _median([r['process_ms'] for r in runs]),
+        'import_ms': _median([r['import_ms'] for r in runs]),
+        'startup_ms': _median([r['startup_ms'] for r in runs]),
+        'requests': [
+            {'url': request['url'], 'status': request['status'],
+             'ms': _median([r['requests'][i]['ms'] for r in runs])}
+            for i, request in enumerate(runs[0]['requests'])
+        ],
+        'firebase_loaded': runs[0]['firebase_loaded'],
+    }
+    summary['cold_start_ms'] = (summary['import_ms'] + summary['startup_ms']
+                                + sum(request['ms'] for request in summary['requests']))
+
+    by_package: Dict[str, List[int]] = defaultdict(list)
+    by_module: Dict[str, List[int]] = defaultdict(list)
+    for run in runs:
+        package_us: Dict[str, int] = defaultdict(int)
+        for name, self_us, cumulative_us in run['modules']:
+            package_us[name.split('.')[0]] += self_us
+            by_module[name].append(self_us)
+        for package, us in package_us.items():
+            by_package[package].append(us)
+
+    summary['packages_ms'] = dict(sorted(
+        ((package, _median(values) / 1000) for package, values in by_package.items()),
+        key=lambda item: -item[1]
+    )[:top])
+    summary['modules_ms'] = dict(sorted(
+        ((name, _median(values) / 1000) for name, values in by_module.items()),
+        key=lambda item: -item[1]
+    )[:top])
+    return summary
+
+
+def _git_revision() -> str:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=BACKEND_DIR,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ''
+
+
+def print_report(summary: dict):
+    print(f"\nmedian of {summary['runs']} cold start(s)")
+    print(f"  import main       {summary['import_ms']:>9.1f}ms")
+    print(f"  startup hooks     {summary['startup_ms']:>9.1f}ms")
+    for request in summary['requests']:
+        print(f"  GET {request['url']:<40} {request['ms']:>9.1f}ms  ({request['status']})")
+    print(f"  cold start        {summary['cold_start_ms']:>9.1f}ms (import + startup + probes)")
+    print(f"  whole process     {summary['process_ms']:>9.1f}ms (interpreter start to exit)")
+    print(f"  firebase_admin imported: {'yes' if summary['firebase_loaded'] else 'no'}")
+
+    print("\nimport time by top-level package (self time)")
+    for package, ms in summary['packages_ms'].items():
+        print(f"  {package:<40} {ms:>9.1f}ms")
+    print("\nslowest modules (self time)")
+    for name, ms in summary['modules_ms'].items():
+        print(f"  {name:<56} {ms:>9.1f}ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Profile API cold starts (imports, startup hooks, first requests)")
+    parser.add_argument('--runs', type=int, default=3, help="Cold starts to take the median of")
+    parser.add_argument('--probe', action='append', dest='probes', metavar='URL',
+                        help=f"Path requested after startup, in order (default: {' '.join(DEFAULT_PROBES)})")
+    parser.add_argument('--top', type=int, default=15, help="Packages and modules listed")
+    parser.add_argument('--history', metavar='PATH', help="Append the result as one JSON line to this file")
+    parser.add_argument('--child', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    probes = args.probes or DEFAULT_PROBES
+
+    if args.child:
+        _child(probes)
+        return
+
+    summary = summarize([profile_once(probes) for _ in range(args.runs)], args.top)
+    print_report(summary)
+
+    if args.history:
+        record = {
+            'timestamp': datetime.now().astimezone().isoformat(timespec='seconds'),
+            'revision': _git_revision(),
+            'startup_mode': os.getenv('STARTUP_MODE', 'eager'),
+            'storage_backend': os.getenv('STORAGE_BACKEND', 'firestore'),
+            'catalog_snapshot': bool(os.getenv('CATALOG_SNAPSHOT_PATH')),
+            **summary,
+        }
+        with open(args.history, 'a') as f:
+            f.write(json.dumps(record) + '\n')
+        print(f"\n✓ Appended to {args.history}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+"""
+Synthetic datasets for the API benchmarks.
+
+The shape follows seed_data.py (radicals with examples, characters with
+pinyin, HSK level, frequency and component radicals, per-user progress),
+scaled up to realistic sizes. Generation is seeded, so a profile and seed
+always produce the same data.
+"""
+import random
+from datetime import datetime, timedelta
+from typing import Dict, List
+
+from models.schemas import UserProgress, QuizAttempt, MasteryLevel, ItemType
+
+PROFILES = {
+    'small': {'characters': 1_000, 'users': 100, 'progress_rows': 10_000},
+    'medium': {'characters': 10_000, 'users': 1_000, 'progress_rows': 100_000},
+    'full': {'characters': 10_000, 'users': 10_000, 'progress_rows': 1_000_000},
+}
+
+RADICAL_COUNT = 214
+MISTAKES_PER_USER = 5
+
+# Schedules are generated around a fixed instant, so a profile and seed always produce the same
+# rows; due queries in the benchmarks are evaluated at it, so the same share of items is due on every run
+DATASET_NOW = datetime(2025, 1, 15, 12)
+
+_WORDS = ['person', 'mouth', 'hand', 'heart', 'water', 'tree', 'fire', 'earth', 'sun', 'moon', 'speech',
+          'thread', 'woman', 'child', 'one', 'two', 'bamboo', 'rain', 'metal', 'gate', 'good', 'big',
+          'small', 'go', 'come', 'eat', 'drink', 'see', 'hear', 'say', 'learn', 'write', 'road', 'house']
+_INITIALS = ['', 'b', 'p', 'm', 'f', 'd', 't', 'n', 'l', 'g', 'k', 'h', 'j', 'q', 'x', 'zh', 'ch', 'sh', 'r',
+             'z', 'c', 's', 'y', 'w']
+_FINALS = ['a', 'o', 'e', 'i', 'u', 'ai', 'ei', 'ao', 'ou', 'an', 'en', 'ang', 'eng', 'ong', 'ia', 'ie', 'in']
+_TONES = {'a': 'āáǎà', 'o': 'ōóǒò', 'e': 'ēéěè', 'i': 'īíǐì', 'u': 'ūúǔù'}
+
+
+def _pinyin(rng: random.Random) -> str:
+    syllable = rng.choice(_INITIALS) + rng.choice(_FINALS)
+    vowel = next(ch for ch in syllable if ch in _TONES)
+    tone = rng.randrange(5)
+    if tone == 4:
+        return syllable
+    return syllable.replace(vowel, _TONES[vowel][tone], 1)
+
+
+def make_catalog(characters: int, seed: int = 42):
+    """
+    Radicals (the 214 Kangxi radicals) and `characters` CJK ideographs.
+
+    Returns:
+        (radicals, characters) keyed by id, as stored in the catalog
+    """
+    rng = random.Random(seed)
+    radicals = {}
+    for i in range(RADICAL_COUNT):
+        radicals[f"rad_{i:03d}"] = {
+            'character': chr(0x2F00 + i),
+            'meaning': f"{rng.choice(_WORDS)}/{rng.choice(_WORDS)}",
+            'stroke_count': rng.randint(1, 17),
+            'frequency': rng.randint(1, 100),
+            'examples': [chr(0x4E00 + rng.randrange(characters)) for _ in range(3)],
+        }
+
+    radical_ids = list(radicals)
+    chars = {}
+    for i in range(characters):
+        chars[f"char_{i:05d}"] = {
+            'hanzi': chr(0x4E00 + i),
+            'pinyin': _pinyin(rng),
+            'meaning': ", ".join(rng.sample(_WORDS, rng.randint(1, 3))),
+            'hsk_level': rng.randint(1, 6),
+            'frequency': rng.randint(1, 100),
+            'radicals': rng.sample(radical_ids, rng.randint(1, 3)),
+        }
+    return radicals, chars
+
+
+def user_ids(users: int) -> List[str]:
+    return [f"user_{i:05d}" for i in range(users)]
+
+
+def make_progress(user_id: str, items: List[tuple], rng: random.Random) -> List[UserProgress]:
+    """Progress for `items` ((item_id, item_type) pairs) with a spread of scheduling state"""
+    levels = list(MasteryLevel)
+    rows = []
+    for item_id, item_type in items:
+        last = DATASET_NOW - timedelta(days=rng.randint(0, 60), seconds=rng.randint(0, 86_399))
+        interval = rng.choice([0, 1, 6, 15, 40])
+        rows.append(UserProgress(
+            user_id=user_id,
+            item_id=item_id,
+            item_type=item_type,
+            mastery_level=rng.choice(levels),
+            last_reviewed=last,
+            next_review=last + timedelta(days=interval),
+            correct_count=rng.randint(0, 20),
+            incorrect_count=rng.randint(0, 10),
+            ease_factor=round(rng.uniform(1.3, 3.0), 2),
+            interval=interval
+        ))
+    return rows
+
+
+def build_dataset(repository, profile: str, seed: int = 42, log=print) -> Dict[str, int]:
+    """
+    Load a profile's catalog, progress, stats and quiz history into `repository`.
+
+    Args:
+        repository: An empty SQLiteRepository
+        profile: Key of PROFILES
+        seed: Random seed
+
+    Returns:
+        The profile's size parameters
+    """
+    sizes = PROFILES[profile]
+    rng = random.Random(seed)
+
+    radicals, characters = make_catalog(sizes['characters'], seed)
+    repository.upsert_catalog_items('radicals', radicals)
+    repository.upsert_catalog_items('characters', characters)
+    repository.bump_catalog_version()
+    log(f"✓ Catalog: {len(radicals)} radicals, {len(characters)} characters")
+
+    items = [(r_id, ItemType.RADICAL) for r_id in radicals] + [(c_id, ItemType.CHARACTER) for c_id in characters]
+    users = user_ids(sizes['users'])
+    per_user = min(sizes['progress_rows'] // len(users), len(items))
+
+    for start in range(0, len(users), 500):
+        chunk = users[start:start + 500]
+        repository.import_progress(
+            row for user_id in chunk for row in make_progress(user_id, rng.sample(items, per_user), rng)
+        )
+    log(f"✓ Progress: {per_user * len(users):,} rows for {len(users):,} users")
+
+    for user_id in users:
+        repository.reconcile_stats(user_id)
+        for _ in range(MISTAKES_PER_USER):
+            item_id, item_type = rng.choice(items)
+            repository.add_quiz_attempt(QuizAttempt(
+                user_id=user_id,
+                question_id=f"q_{item_id}_0",
+                question_type='meaning_match',
+                answer='x',
+                correct=False,
+                timestamp=DATASET_NOW - timedelta(days=rng.randint(0, 30)),
+                item_id=item_id,
+                item_type=item_type
+            ))
+    log(f"✓ Stats and {MISTAKES_PER_USER} quiz mistakes per user")
+    return sizes
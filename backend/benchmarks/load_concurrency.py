@@ -0,0 +1,72 @@
+"""
+Concurrency load test for a single API worker.
+
+Fires requests at one endpoint with increasing numbers of concurrent
+clients and reports throughput and latency, to check that throughput
+scales with concurrency instead of being serialized by blocking store
+calls on the event loop.
+
+Usage (start the API with one worker first):
+    uvicorn main:app --workers 1
+    python -m benchmarks.load_concurrency --path /api/progress/USER_ID/due
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+import httpx
+
+
+async def _client(client: httpx.AsyncClient, path: str, deadline: float, latencies: list, errors: list):
+    while time.perf_counter() < deadline:
+        start = time.perf_counter()
+        try:
+            response = await client.get(path)
+            if response.status_code >= 500:
+                errors.append(response.status_code)
+        except httpx.HTTPError as e:
+            errors.append(type(e).__name__)
+        latencies.append(time.perf_counter() - start)
+
+
+async def run_level(base_url: str, path: str, concurrency: int, duration: float):
+    latencies, errors = [], []
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=30) as client:
+        deadline = time.perf_counter() + duration
+        await asyncio.gather(*(_client(client, path, deadline, latencies, errors) for _ in range(concurrency)))
+
+    latencies.sort()
+    return {
+        'concurrency': concurrency,
+        'requests': len(latencies),
+        'rps': len(latencies) / duration,
+        'p50_ms': statistics.median(latencies) * 1000 if latencies else 0.0,
+        'p95_ms': latencies[int(len(latencies) * 0.95) - 1] * 1000 if latencies else 0.0,
+        'errors': len(errors),
+    }
+
+
+async def main_async(args):
+    print(f"{'clients':>8} {'requests':>9} {'req/s':>9} {'p50':>9} {'p95':>9} {'errors':>7}")
+    baseline = None
+    for concurrency in args.concurrency:
+        result = await run_level(args.base_url, args.path, concurrency, args.duration)
+        baseline = baseline or result['rps']
+        print(f"{result['concurrency']:>8} {result['requests']:>9} {result['rps']:>9.1f} "
+              f"{result['p50_ms']:>7.1f}ms {result['p95_ms']:>7.1f}ms {result['errors']:>7}"
+              f"   ({result['rps'] / baseline:.1f}x)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Single-worker concurrency load test")
+    parser.add_argument('--base-url', default="http://localhost:8000")
+    parser.add_argument('--path', default="/api/radicals/")
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 4, 16, 64])
+    parser.add_argument('--duration', type=float, default=10.0, help="Seconds per concurrency level")
+    asyncio.run(main_async(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
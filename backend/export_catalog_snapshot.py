@@ -0,0 +1,60 @@
+"""
+Catalog snapshot export: writes the stored radicals and characters (with the
+catalog version and ETag) to a JSON file that the API loads at startup when
+CATALOG_SNAPSHOT_PATH points at it. A cold start then serves the catalog
+without querying the store; the first version check (after
+CATALOG_VERSION_CHECK_INTERVAL seconds) replaces it if the store has moved on.
+
+Run it as a deploy build step, after ingesting the catalog.
+
+Usage:
+    python export_catalog_snapshot.py                          # data/catalog_snapshot.json
+    python export_catalog_snapshot.py --output build/catalog.json
+"""
+import argparse
+import os
+import time
+from pathlib import Path
+from dotenv import load_dotenv
+load_dotenv()
+from services.firebase_service import initialize_firebase
+from services.repository import get_repository, storage_backend
+from services.catalog_cache import CatalogSnapshot, write_snapshot_file
+
+DEFAULT_OUTPUT = Path(__file__).resolve().parent / 'data' / 'catalog_snapshot.json'
+
+
+def export(output: Path = DEFAULT_OUTPUT):
+    if storage_backend() == "firestore":
+        initialize_firebase()
+    repository = get_repository()
+
+    started = time.perf_counter()
+    version = repository.get_catalog_version()
+    radicals, characters = repository.load_catalog()
+    if not radicals and not characters:
+        raise ValueError("The stored catalog is empty; run ingest_catalog.py first")
+
+    output.parent.mkdir(parents=True, exist_ok=True)
+    write_snapshot_file(str(output), CatalogSnapshot(radicals, characters, version))
+    print(f"radicals: {len(radicals)}, characters: {len(characters)}, version: {version}")
+    print(f"\n✓ Wrote {output} ({os.path.getsize(output) / 1024:.0f} KiB) in {time.perf_counter() - started:.1f}s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Write the stored catalog to a snapshot file for fast cold starts")
+    parser.add_argument('--output', type=Path, default=DEFAULT_OUTPUT, help="Snapshot file to write")
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("Happy Hanzy - Catalog Snapshot Export")
+    print("=" * 60)
+
+    try:
+        export(args.output)
+    except Exception as e:
+        print(f"\n✗ Error during export: {str(e)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""
+Catalog ingestion: loads radicals and characters from CSV/JSON files into
+the configured store (Firestore or SQLite).
+
+New documents get deterministic ids derived from their glyphs; documents
+already stored (e.g. with random ids from older seed scripts) are matched
+by glyph and keep their ids, so user data that refers to them stays valid.
+Character radicals are given as glyphs (variants such as 亻 included) and
+resolved to radical ids, and only documents that differ from what is
+stored are written, in parallel batches with retries. Safe to re-run.
+--prune refuses to delete items that user data still refers to.
+
+Radicals columns: character, meaning, stroke_count, frequency, examples, variants
+Characters columns: hanzi, pinyin, meaning, hsk_level, frequency, radicals
+
+Usage:
+    python ingest_catalog.py                              # bundled sample data (data/)
+    python ingest_catalog.py --radicals kangxi.csv --characters hsk.json
+    python ingest_catalog.py --prune                      # also delete what is not in the files
+    python ingest_catalog.py --dry-run                    # report only
+"""
+import argparse
+import time
+from pathlib import Path
+from dotenv import load_dotenv
+load_dotenv()
+from services.firebase_service import initialize_firebase
+from services.repository import get_repository, storage_backend
+from services.progress_service import WRITE_BATCH_SIZE
+from services.catalog_ingest import plan_ingest, write_changes
+
+DATA_DIR = Path(__file__).resolve().parent / 'data'
+SAMPLE_RADICALS = DATA_DIR / 'radicals.csv'
+SAMPLE_CHARACTERS = DATA_DIR / 'characters.csv'
+
+
+def ingest(radicals_path: Path = None, characters_path: Path = None, prune: bool = False,
+           dry_run: bool = False, workers: int = 8, chunk_size: int = WRITE_BATCH_SIZE):
+    if storage_backend() == "firestore":
+        initialize_firebase()
+    repository = get_repository()
+
+    started = time.perf_counter()
+    diffs, unresolved = plan_ingest(repository, radicals_path, characters_path, prune=prune)
+
+    for diff in diffs:
+        print(f"{diff.collection}: {len(diff.upserts)} to write, {len(diff.deletes)} to delete, "
+              f"{diff.unchanged} unchanged")
+    for hanzi, glyphs in unresolved.items():
+        print(f"  ! {hanzi}: unknown radical glyph(s) {' '.join(glyphs)} (skipped)")
+
+    if dry_run:
+        print("\nDry run - no changes written")
+        return
+    if not any(diff.changed for diff in diffs):
+        print("\n✓ Catalog already up to date")
+        return
+
+    write_changes(repository, diffs, workers=workers, chunk_size=chunk_size)
+    repository.bump_catalog_version()
+    print(f"\n✓ Catalog updated in {time.perf_counter() - started:.1f}s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load radicals and characters from CSV/JSON files")
+    parser.add_argument('--radicals', type=Path, help="Radicals file (.csv, .json or .jsonl)")
+    parser.add_argument('--characters', type=Path, help="Characters file (.csv, .json or .jsonl)")
+    parser.add_argument('--prune', action='store_true', help="Delete stored documents that are not in the files")
+    parser.add_argument('--dry-run', action='store_true', help="Report what would change without writing")
+    parser.add_argument('--workers', type=int, default=8, help="Batches written in parallel")
+    parser.add_argument('--chunk-size', type=int, default=WRITE_BATCH_SIZE,
+                        help=f"Documents per batch (at most {WRITE_BATCH_SIZE})")
+    args = parser.parse_args()
+
+    radicals, characters = args.radicals, args.characters
+    if radicals is None and characters is None:
+        radicals, characters = SAMPLE_RADICALS, SAMPLE_CHARACTERS
+
+    print("=" * 60)
+    print("Happy Hanzy - Catalog Ingestion")
+    print("=" * 60)
+
+    try:
+        ingest(radicals, characters, prune=args.prune, dry_run=args.dry_run,
+               workers=args.workers, chunk_size=args.chunk_size)
+    except Exception as e:
+        print(f"\n✗ Error during ingestion: {str(e)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,21 +1,31 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
 from dotenv import load_dotenv
 import os
 
 from routes import radicals, characters, progress, quiz
 from services.firebase_service import initialize_firebase
+from services.repository import run_blocking, shutdown_executor, storage_backend
+from services.metrics import MetricsMiddleware, get_metrics_registry
+from services.quiz_attempt_buffer import get_quiz_attempt_buffer
+from services.codec import FastJSONResponse
+from services.catalog_cache import get_catalog_cache
 
 # Load environment variables
 load_dotenv()
 
-# Initialize Firebase
-initialize_firebase()
+# Initialize Firebase now (not needed when running on the local SQLite store).
+# With STARTUP_MODE=lazy (serverless) it is initialized on the first store call instead
+if storage_backend() == "firestore" and os.getenv("STARTUP_MODE", "eager").lower() != "lazy":
+    initialize_firebase()
 
 app = FastAPI(
     title="Happy Hanzy API",
     description="API for Chinese Hanzi learning application",
-    version="1.0.0"
+    version="1.0.0",
+    # orjson-based rendering for every JSON response (see services/codec.py)
+    default_response_class=FastJSONResponse
 )
 
 # CORS Configuration
@@ -27,14 +37,30 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag", "X-Next-Cursor"],
 )
 
+# Per-request store operation accounting, Server-Timing headers and slow-request log
+app.add_middleware(MetricsMiddleware)
+
 # Include routers
 app.include_router(radicals.router, prefix="/api/radicals", tags=["radicals"])
 app.include_router(characters.router, prefix="/api/characters", tags=["characters"])
 app.include_router(progress.router, prefix="/api/progress", tags=["progress"])
 app.include_router(quiz.router, prefix="/api/quiz", tags=["quiz"])
 
+@app.on_event("startup")
+async def startup():
+    get_quiz_attempt_buffer().start()
+    # Serve the bundled catalog snapshot (CATALOG_SNAPSHOT_PATH) from the first request
+    await run_blocking(get_catalog_cache().preload)
+
+@app.on_event("shutdown")
+async def shutdown():
+    # Write buffered quiz attempts before the store thread pool goes away
+    await get_quiz_attempt_buffer().stop()
+    shutdown_executor()
+
 @app.get("/")
 async def root():
     return {
@@ -46,3 +72,8 @@ async def root():
 @app.get("/health")
 async def health_check():
     return {"status": "healthy"}
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Per-route request, latency and store operation metrics (Prometheus text format)"""
+    return PlainTextResponse(get_metrics_registry().render(), media_type="text/plain; version=0.0.4")
@@ -0,0 +1,108 @@
+"""
+Migration script that moves user_progress documents to deterministic ids
+({user_id}_{item_type}_{item_id}), merges duplicate rows created by
+concurrent reviews and converts legacy ISO-string review dates to native
+timestamps (required by the due-queue query). Safe to re-run: already
+migrated documents are left untouched.
+
+Usage:
+    python migrate_progress.py            # apply
+    python migrate_progress.py --dry-run  # report only
+"""
+import argparse
+from collections import defaultdict
+from dotenv import load_dotenv
+load_dotenv()
+from services.firebase_service import initialize_firebase
+from services.progress_service import PROGRESS_COLLECTION, progress_doc_id, progress_from_doc, progress_to_doc
+
+# Firestore limits a write batch to 500 operations
+BATCH_SIZE = 500
+
+
+def merge_progress(rows):
+    """
+    Merge duplicate progress rows for the same item.
+
+    Review counts are summed; scheduling state (ease, interval, mastery,
+    next review) is taken from the most recently reviewed row.
+    """
+    progress = [progress_from_doc(row) for row in rows]
+    latest = max(progress, key=lambda p: p.last_reviewed)
+    latest.correct_count = sum(p.correct_count for p in progress)
+    latest.incorrect_count = sum(p.incorrect_count for p in progress)
+    return latest
+
+
+def migrate(dry_run: bool = False):
+    db = initialize_firebase()
+    progress_ref = db.collection(PROGRESS_COLLECTION)
+
+    groups = defaultdict(list)
+    for doc in progress_ref.stream():
+        data = doc.to_dict()
+        key = progress_doc_id(data['user_id'], data['item_type'], data['item_id'])
+        groups[key].append((doc.id, data))
+
+    # Each item's rewrite and its deletes go in the same batch, so an
+    # interrupted run never leaves a merged row next to its old duplicates
+    item_operations = []
+    merged_count = 0
+    delete_count = 0
+    for doc_id, rows in groups.items():
+        if len(rows) == 1 and rows[0][0] == doc_id and not isinstance(rows[0][1].get('next_review'), str):
+            continue
+
+        if len(rows) > 1:
+            merged_count += 1
+        merged = progress_to_doc(merge_progress([data for _, data in rows]))
+        operations = [('set', doc_id, merged)]
+        operations += [('delete', old_id, None) for old_id, _ in rows if old_id != doc_id]
+        delete_count += len(operations) - 1
+        item_operations.append(operations)
+
+    print(f"Found {sum(len(rows) for rows in groups.values())} progress documents for {len(groups)} items")
+    print(f"  {len(item_operations)} items to rewrite ({merged_count} with duplicates), {delete_count} documents to delete")
+
+    if dry_run:
+        print("\nDry run - no changes written")
+        return
+
+    batch = db.batch()
+    pending = 0
+    for operations in item_operations:
+        if pending and pending + len(operations) > BATCH_SIZE:
+            batch.commit()
+            batch = db.batch()
+            pending = 0
+
+        for op, doc_id, data in operations:
+            if op == 'set':
+                batch.set(progress_ref.document(doc_id), data)
+            else:
+                batch.delete(progress_ref.document(doc_id))
+        pending += len(operations)
+
+    if pending:
+        batch.commit()
+
+    print(f"\n✓ Migrated {len(item_operations)} progress items")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Migrate user_progress to deterministic document ids")
+    parser.add_argument('--dry-run', action='store_true', help="Report what would change without writing")
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("Happy Hanzy - Progress Migration")
+    print("=" * 60)
+
+    try:
+        migrate(dry_run=args.dry_run)
+    except Exception as e:
+        print(f"\n✗ Error during migration: {str(e)}")
+
+
+if __name__ == "__main__":
+    main()
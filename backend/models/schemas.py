@@ -7,6 +7,10 @@ class ItemType(str, Enum):
     RADICAL = "radical"
     CHARACTER = "character"
 
+class ExportFormat(str, Enum):
+    NDJSON = "ndjson"
+    CSV = "csv"
+
 class MasteryLevel(str, Enum):
     NEW = "new"
     LEARNING = "learning"
@@ -35,6 +39,12 @@ class CharacterRadical(BaseModel):
     radical_id: str
     position: str  # left, right, top, bottom, enclosure, etc.
 
+class CharacterComponent(Radical):
+    position: Optional[str] = None  # where the radical sits in the character, if known
+
+class RadicalOccurrence(Character):
+    position: Optional[str] = None  # where the radical sits in this character, if known
+
 class UserProgress(BaseModel):
     user_id: str
     item_id: str
@@ -47,6 +57,12 @@ class UserProgress(BaseModel):
     ease_factor: float = 2.5
     interval: int = 0  # days
 
+class ReviewEvent(BaseModel):
+    item_id: str
+    item_type: ItemType
+    correct: bool
+    answered_at: datetime
+
 class QuizAttempt(BaseModel):
     user_id: str
     question_id: str
@@ -54,16 +70,40 @@ class QuizAttempt(BaseModel):
     answer: str
     correct: bool
     timestamp: datetime
+    item_id: Optional[str] = None
+    item_type: Optional[ItemType] = None
 
-class QuizQuestion(BaseModel):
+# A quiz question as shown to the user; the answer stays on the server
+class QuizPrompt(BaseModel):
     id: str
     question_type: str
     question_text: str
-    correct_answer: str
     options: List[str]
     item_id: str
     item_type: ItemType
 
+class QuizQuestion(QuizPrompt):
+    correct_answer: str
+
+class QuizSession(BaseModel):
+    quiz_id: str
+    expires_at: datetime
+    questions: List[QuizPrompt]
+
+class QuizAnswer(BaseModel):
+    user_id: str
+    quiz_id: str
+    question_id: str
+    answer: str
+    answered_at: Optional[datetime] = None
+
+class Recommendation(BaseModel):
+    item_id: str
+    item_type: ItemType
+    score: float
+    missing_radicals: List[str] = []  # radicals to learn before this character
+    item: dict
+
 class ProgressStats(BaseModel):
     total_learned: int
     radicals_mastered: int
@@ -78,3 +118,5 @@ class MistakeLog(BaseModel):
     item_type: ItemType
     timestamp: datetime
     mistake_count: int
+    question_type: Optional[str] = None
+    decayed_count: Optional[float] = None
@@ -0,0 +1,54 @@
+"""
+Reconciliation job for the per-user stats aggregates (user_stats).
+
+Rebuilds each user's aggregate from a full scan of their progress and
+rewrites it when the stored counters have drifted. Run it periodically or
+after bulk data changes.
+
+Usage:
+    python reconcile_stats.py                 # all users
+    python reconcile_stats.py --user USER_ID  # a single user
+"""
+import argparse
+from dotenv import load_dotenv
+load_dotenv()
+from services.firebase_service import initialize_firebase
+from services.progress_service import PROGRESS_COLLECTION, reconcile_stats
+
+
+def reconcile(user_id: str = None):
+    db = initialize_firebase()
+
+    if user_id:
+        user_ids = [user_id]
+    else:
+        docs = db.collection(PROGRESS_COLLECTION).select(['user_id']).stream()
+        user_ids = sorted({doc.to_dict()['user_id'] for doc in docs})
+
+    drifted_count = 0
+    for uid in user_ids:
+        _, drifted = reconcile_stats(db, uid)
+        if drifted:
+            drifted_count += 1
+            print(f"Rebuilt stats for {uid}")
+
+    print(f"\n✓ Checked {len(user_ids)} users, rebuilt {drifted_count} aggregates")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rebuild drifted per-user stats aggregates")
+    parser.add_argument('--user', help="Only reconcile this user")
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("Happy Hanzy - Stats Reconciliation")
+    print("=" * 60)
+
+    try:
+        reconcile(args.user)
+    except Exception as e:
+        print(f"\n✗ Error during reconciliation: {str(e)}")
+
+
+if __name__ == "__main__":
+    main()
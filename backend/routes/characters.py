@@ -1,103 +1,87 @@
-from fastapi import APIRouter, HTTPException
-from typing import List
-from models.schemas import Character
-from services.firebase_service import get_db
+from fastapi import APIRouter, HTTPException, Request, Response
+from typing import List, Optional
+from models.schemas import Character, CharacterComponent
+from services.catalog_cache import get_catalog_cache
+from services.decomposition_graph import get_decomposition_graph
+from services.search_index import get_catalog_search
+from services.http_cache import catalog_conditional
+from services.pagination import NEXT_CURSOR_HEADER, frequency_cursor, decode_frequency_cursor
+from services.codec import json_response, project
+from services.metrics import TimedRoute
 
-router = APIRouter()
+router = APIRouter(route_class=TimedRoute)
 
 @router.get("/", response_model=List[Character])
-async def get_characters(limit: int = 50, offset: int = 0, hsk_level: int = None):
-    """Get all characters with pagination and optional HSK level filter"""
+async def get_characters(request: Request, response: Response, limit: int = 50, offset: int = 0,
+                         hsk_level: int = None, cursor: Optional[str] = None):
+    """Get all characters by frequency with an optional HSK level filter. Page with `cursor` or `offset`"""
     try:
-        db = get_db()
-        characters_ref = db.collection('characters')
+        snapshot, not_modified = await catalog_conditional(request, response)
+        if not_modified:
+            return not_modified
         
-        # Query with optional HSK filter
-        query = characters_ref
-        if hsk_level:
-            query = query.where('hsk_level', '==', hsk_level)
+        after = decode_frequency_cursor(cursor) if cursor else None
+        characters = await get_catalog_cache().list_characters(
+            limit=limit, offset=offset, hsk_level=hsk_level, after=after, snapshot=snapshot
+        )
         
-        query = query.order_by('frequency', direction='DESCENDING').limit(limit).offset(offset)
-        docs = query.stream()
-        
-        characters = []
-        for doc in docs:
-            data = doc.to_dict()
-            data['id'] = doc.id
-            characters.append(Character(**data))
-        
-        return characters
+        if characters and len(characters) == limit:
+            response.headers[NEXT_CURSOR_HEADER] = frequency_cursor(characters[-1])
+        return json_response(project(Character, characters), response)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/{character_id}", response_model=Character)
-async def get_character(character_id: str):
+async def get_character(character_id: str, request: Request, response: Response):
     """Get a specific character by ID"""
     try:
-        db = get_db()
-        doc = db.collection('characters').document(character_id).get()
+        snapshot, not_modified = await catalog_conditional(request, response)
+        if not_modified:
+            return not_modified
+        
+        data = await get_catalog_cache().get_character(character_id, snapshot)
         
-        if not doc.exists:
+        if data is None:
             raise HTTPException(status_code=404, detail="Character not found")
         
-        data = doc.to_dict()
-        data['id'] = doc.id
-        return Character(**data)
+        return json_response(project(Character, [data])[0], response)
     except HTTPException:
         raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-@router.get("/{character_id}/radicals")
-async def get_character_radicals(character_id: str):
-    """Get all radicals that compose a character"""
+@router.get("/{character_id}/radicals", response_model=List[CharacterComponent])
+async def get_character_radicals(character_id: str, request: Request, response: Response):
+    """Get all radicals that compose a character, with their position in it when known"""
     try:
-        db = get_db()
+        graph = await get_decomposition_graph()
+        _, not_modified = await catalog_conditional(request, response, graph.snapshot)
+        if not_modified:
+            return not_modified
         
-        # Get character
-        char_doc = db.collection('characters').document(character_id).get()
-        if not char_doc.exists:
+        radicals = graph.decompose(character_id)
+        if radicals is None:
             raise HTTPException(status_code=404, detail="Character not found")
         
-        char_data = char_doc.to_dict()
-        radical_ids = char_data.get('radicals', [])
-        
-        # Get radical details
-        radicals = []
-        for radical_id in radical_ids:
-            radical_doc = db.collection('radicals').document(radical_id).get()
-            if radical_doc.exists:
-                data = radical_doc.to_dict()
-                data['id'] = radical_doc.id
-                radicals.append(data)
-        
-        return radicals
+        return json_response(project(CharacterComponent, radicals), response)
     except HTTPException:
         raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/search/{query}")
-async def search_characters(query: str):
-    """Search characters by meaning, pinyin, or hanzi"""
+async def search_characters(query: str, request: Request, response: Response, limit: int = 50):
+    """Search characters by meaning, pinyin (with or without tones), or hanzi"""
     try:
-        db = get_db()
-        characters_ref = db.collection('characters')
-        
-        docs = characters_ref.stream()
-        
-        results = []
-        query_lower = query.lower()
-        for doc in docs:
-            data = doc.to_dict()
-            data['id'] = doc.id
-            
-            # Simple text search
-            if (query_lower in data.get('meaning', '').lower() or 
-                query_lower in data.get('pinyin', '').lower() or 
-                query in data.get('hanzi', '')):
-                results.append(Character(**data))
+        # Tagged with the snapshot the index was built from, which may trail the cache's during a reload
+        search = await get_catalog_search()
+        _, not_modified = await catalog_conditional(request, response, search.snapshot)
+        if not_modified:
+            return not_modified
         
-        return results
+        results = search.search_characters(query, limit=limit)
+        return json_response(project(Character, results), response)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
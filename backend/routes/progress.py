@@ -1,52 +1,52 @@
-from fastapi import APIRouter, HTTPException
-from typing import List
+from fastapi import APIRouter, HTTPException, Response
+import asyncio
 from datetime import datetime
-from models.schemas import UserProgress, ProgressStats, MasteryLevel, ItemType
-from services.firebase_service import get_db
-from services.spaced_repetition import SpacedRepetitionService
+from typing import List, Optional
+from models.schemas import UserProgress, ProgressStats, ItemType, ReviewEvent, Character, Recommendation, ExportFormat
+from services import stats_service
+from services.repository import get_async_repository
+from services.decomposition_graph import get_decomposition_graph
+from services.recommender import get_recommender
+from services.pagination import NEXT_CURSOR_HEADER
+from services.export_service import stream_export
+from services.codec import json_response, project
+from services.metrics import TimedRoute
 
-router = APIRouter()
-srs = SpacedRepetitionService()
+router = APIRouter(route_class=TimedRoute)
 
 @router.get("/{user_id}", response_model=List[UserProgress])
 async def get_user_progress(user_id: str):
     """Get all progress for a user"""
     try:
-        db = get_db()
-        docs = db.collection('user_progress').where('user_id', '==', user_id).stream()
-        
-        progress_list = []
-        for doc in docs:
-            data = doc.to_dict()
-            # Convert timestamps
-            if 'last_reviewed' in data and isinstance(data['last_reviewed'], str):
-                data['last_reviewed'] = datetime.fromisoformat(data['last_reviewed'])
-            if 'next_review' in data and isinstance(data['next_review'], str):
-                data['next_review'] = datetime.fromisoformat(data['next_review'])
-            progress_list.append(UserProgress(**data))
-        
-        return progress_list
+        return json_response(await get_async_repository().list_progress(user_id))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-@router.get("/{user_id}/due")
-async def get_due_items(user_id: str):
-    """Get items due for review"""
+@router.get("/{user_id}/export")
+async def export_user_progress(user_id: str, format: ExportFormat = ExportFormat.NDJSON, cursor: Optional[str] = None):
+    """Stream all progress for a user as NDJSON or CSV. Pass the cursor of the last record received to resume"""
     try:
-        db = get_db()
-        docs = db.collection('user_progress').where('user_id', '==', user_id).stream()
-        
-        progress_list = []
-        for doc in docs:
-            data = doc.to_dict()
-            if 'last_reviewed' in data and isinstance(data['last_reviewed'], str):
-                data['last_reviewed'] = datetime.fromisoformat(data['last_reviewed'])
-            if 'next_review' in data and isinstance(data['next_review'], str):
-                data['next_review'] = datetime.fromisoformat(data['next_review'])
-            progress_list.append(UserProgress(**data))
+        return await stream_export(
+            get_async_repository().list_progress_page, user_id, list(UserProgress.model_fields),
+            format, f"progress-{user_id}", cursor=cursor
+        )
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/{user_id}/due", response_model=List[UserProgress])
+async def get_due_items(user_id: str, response: Response, limit: int = 50, cursor: Optional[str] = None,
+                        now: Optional[datetime] = None):
+    """Get items due for review at `now` (default: the current time), oldest first. The next page cursor is returned in the X-Next-Cursor header"""
+    try:
+        due_items, next_cursor = await get_async_repository().get_due_progress(user_id, limit=limit, cursor=cursor, now=now)
         
-        due_items = srs.get_items_due_for_review(progress_list)
-        return due_items
+        if next_cursor:
+            response.headers[NEXT_CURSOR_HEADER] = next_cursor
+        return json_response(due_items, response)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -54,57 +54,19 @@ async def get_due_items(user_id: str):
 async def record_review(user_id: str, item_id: str, item_type: ItemType, correct: bool):
     """Record a review attempt and update progress"""
     try:
-        db = get_db()
-        
-        # Find or create progress record
-        progress_ref = db.collection('user_progress')
-        query = progress_ref.where('user_id', '==', user_id).where('item_id', '==', item_id)
-        docs = list(query.stream())
+        updated_progress = await get_async_repository().record_review(user_id, item_id, item_type, correct)
         
-        if docs:
-            # Update existing progress
-            doc = docs[0]
-            data = doc.to_dict()
-            if 'last_reviewed' in data and isinstance(data['last_reviewed'], str):
-                data['last_reviewed'] = datetime.fromisoformat(data['last_reviewed'])
-            if 'next_review' in data and isinstance(data['next_review'], str):
-                data['next_review'] = datetime.fromisoformat(data['next_review'])
-            progress = UserProgress(**data)
-            updated_progress = srs.calculate_next_review(progress, correct)
-            
-            # Save to Firestore
-            progress_dict = updated_progress.dict()
-            progress_dict['last_reviewed'] = updated_progress.last_reviewed.isoformat()
-            progress_dict['next_review'] = updated_progress.next_review.isoformat()
-            progress_dict['mastery_level'] = updated_progress.mastery_level.value
-            progress_dict['item_type'] = updated_progress.item_type.value
-            
-            doc.reference.update(progress_dict)
-        else:
-            # Create new progress record
-            new_progress = UserProgress(
-                user_id=user_id,
-                item_id=item_id,
-                item_type=item_type,
-                mastery_level=MasteryLevel.NEW,
-                last_reviewed=datetime.now(),
-                next_review=datetime.now(),
-                correct_count=0,
-                incorrect_count=0,
-                ease_factor=2.5,
-                interval=0
-            )
-            updated_progress = srs.calculate_next_review(new_progress, correct)
-            
-            progress_dict = updated_progress.dict()
-            progress_dict['last_reviewed'] = updated_progress.last_reviewed.isoformat()
-            progress_dict['next_review'] = updated_progress.next_review.isoformat()
-            progress_dict['mastery_level'] = updated_progress.mastery_level.value
-            progress_dict['item_type'] = updated_progress.item_type.value
-            
-            progress_ref.add(progress_dict)
+        return json_response({"status": "success", "progress": updated_progress})
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.post("/{user_id}/reviews")
+async def record_reviews(user_id: str, events: List[ReviewEvent]):
+    """Record an ordered batch of review attempts (e.g. an offline flashcard session)"""
+    try:
+        updated_progress = await get_async_repository().record_reviews(user_id, events)
         
-        return {"status": "success", "progress": updated_progress}
+        return json_response({"status": "success", "reviewed": len(events), "progress": updated_progress})
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -112,40 +74,37 @@ async def record_review(user_id: str, item_id: str, item_type: ItemType, correct
 async def get_progress_stats(user_id: str):
     """Get progress statistics for a user"""
     try:
-        db = get_db()
-        docs = db.collection('user_progress').where('user_id', '==', user_id).stream()
+        stats = await get_async_repository().get_progress_stats(user_id)
         
-        total_learned = 0
-        radicals_mastered = 0
-        characters_mastered = 0
-        total_correct = 0
-        total_attempts = 0
-        
-        for doc in docs:
-            data = doc.to_dict()
-            total_learned += 1
-            
-            if data.get('mastery_level') == MasteryLevel.MASTERED.value:
-                if data.get('item_type') == ItemType.RADICAL.value:
-                    radicals_mastered += 1
-                elif data.get('item_type') == ItemType.CHARACTER.value:
-                    characters_mastered += 1
-            
-            total_correct += data.get('correct_count', 0)
-            total_attempts += data.get('correct_count', 0) + data.get('incorrect_count', 0)
-        
-        accuracy_rate = (total_correct / total_attempts * 100) if total_attempts > 0 else 0.0
-        
-        # Calculate streak (simplified - would need more complex logic for real streak)
-        streak_days = 0
+        return json_response(stats_service.to_progress_stats(stats))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/{user_id}/unlockable", response_model=List[Character])
+async def get_unlockable_characters(user_id: str, limit: int = 20):
+    """Get characters the user has not learned yet whose radicals they all know, most frequent first"""
+    try:
+        learned_items, graph = await asyncio.gather(
+            get_async_repository().list_learned_items(user_id),
+            get_decomposition_graph()
+        )
         
-        return ProgressStats(
-            total_learned=total_learned,
-            radicals_mastered=radicals_mastered,
-            characters_mastered=characters_mastered,
-            accuracy_rate=accuracy_rate,
-            streak_days=streak_days,
-            total_reviews=total_attempts
+        known_radicals = [i['item_id'] for i in learned_items if i['item_type'] == ItemType.RADICAL.value]
+        learned_characters = [i['item_id'] for i in learned_items if i['item_type'] == ItemType.CHARACTER.value]
+        unlockable = graph.unlockable(known_radicals, exclude=learned_characters, limit=limit)
+        return json_response(project(Character, unlockable))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/{user_id}/recommendations", response_model=List[Recommendation])
+async def get_recommendations(user_id: str, limit: int = 10):
+    """Get the radicals and characters the user should study next, best first"""
+    try:
+        learned_items, recommender = await asyncio.gather(
+            get_async_repository().list_learned_items(user_id),
+            get_recommender()
         )
+        
+        return json_response(recommender.recommend(learned_items, limit=limit))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -1,69 +1,94 @@
-from fastapi import APIRouter, HTTPException
-from typing import List
+from fastapi import APIRouter, Header, HTTPException, Response
+from typing import List, Optional
+import asyncio
 import random
 from datetime import datetime
-from models.schemas import QuizQuestion, QuizAttempt, ItemType
-from services.firebase_service import get_db
+from models.schemas import QuizQuestion, QuizSession, QuizAnswer, QuizAttempt, MistakeLog, ItemType, ExportFormat
+from services.repository import get_async_repository
+from services.pagination import NEXT_CURSOR_HEADER
+from services.export_service import stream_export
+from services.codec import json_response
+from services.quiz_attempt_buffer import get_quiz_attempt_buffer
+from services.quiz_sessions import get_quiz_session_store
+from services.progress_service import to_local_naive
+from services.catalog_cache import CatalogSnapshot, get_catalog_cache
+from services.distractor_index import DistractorIndex, get_distractor_index
+from services.decomposition_graph import DecompositionGraph, get_decomposition_graph
+from services.metrics import TimedRoute
 
-router = APIRouter()
+router = APIRouter(route_class=TimedRoute)
 
-@router.get("/generate/{user_id}")
+@router.get("/generate/{user_id}", response_model=QuizSession)
 async def generate_quiz(user_id: str, count: int = 10, quiz_type: str = "mixed"):
     """
     Generate a quiz with questions based on user's progress
     
     quiz_type: radical_recognition, character_composition, meaning_match, or mixed
+    
+    The quiz is kept on the server for answer checking; submit answers with its quiz_id.
+    The following quiz is generated in the background, so the next call is served instantly.
     """
     try:
-        db = get_db()
-        
-        # Get user's learned items
-        progress_docs = db.collection('user_progress').where('user_id', '==', user_id).stream()
-        learned_items = []
-        
-        for doc in progress_docs:
-            data = doc.to_dict()
-            learned_items.append({
-                'item_id': data['item_id'],
-                'item_type': data['item_type']
-            })
-        
-        if len(learned_items) < 4:
-            raise HTTPException(status_code=400, detail="Not enough learned items to generate quiz")
-        
-        # Generate questions
-        questions = []
-        quiz_types = ['radical_recognition', 'meaning_match', 'character_composition'] if quiz_type == "mixed" else [quiz_type]
-        
-        for _ in range(count):
-            selected_type = random.choice(quiz_types)
-            item = random.choice(learned_items)
-            
-            if item['item_type'] == 'radical':
-                question = await _generate_radical_question(db, item['item_id'], selected_type)
-            else:
-                question = await _generate_character_question(db, item['item_id'], selected_type)
-            
-            if question:
-                questions.append(question)
-        
-        return questions
+        sessions = get_quiz_session_store()
+        key = (user_id, quiz_type, count)
+        
+        questions = await sessions.take_prefetched(key)
+        if questions is None:
+            questions = await _build_quiz(user_id, count, quiz_type)
+        
+        session = await sessions.create(user_id, questions)
+        sessions.prefetch(key, lambda: _build_quiz(user_id, count, quiz_type))
+        
+        return json_response({
+            'quiz_id': session.quiz_id,
+            'expires_at': session.expires_at,
+            'questions': [q.model_dump(exclude={'correct_answer'}) for q in questions]
+        })
     except HTTPException:
         raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-async def _generate_radical_question(db, radical_id: str, question_type: str):
+async def _build_quiz(user_id: str, count: int, quiz_type: str) -> List[QuizQuestion]:
+    """Generate `count` questions from the user's learned items"""
+    # The user's learned items and the catalog are independent reads
+    learned_items, snapshot, distractors, graph = await asyncio.gather(
+        get_async_repository().list_learned_items(user_id),
+        get_catalog_cache().get_snapshot(),
+        get_distractor_index(),
+        get_decomposition_graph()
+    )
+    
+    if len(learned_items) < 4:
+        raise HTTPException(status_code=400, detail="Not enough learned items to generate quiz")
+    
+    # Decide every question up front, then assemble them in memory from
+    # a single catalog snapshot and the precomputed distractor index
+    quiz_types = ['radical_recognition', 'meaning_match', 'character_composition'] if quiz_type == "mixed" else [quiz_type]
+    plan = [(random.choice(quiz_types), random.choice(learned_items)) for _ in range(count)]
+    
+    questions = []
+    for selected_type, item in plan:
+        if item['item_type'] == 'radical':
+            question = _generate_radical_question(snapshot, distractors, item['item_id'], selected_type)
+        else:
+            question = _generate_character_question(snapshot, distractors, graph, item['item_id'], selected_type)
+        
+        if question:
+            # Unique within the quiz, which is what answers are checked against
+            question.id = f"q_{question.item_id}_{len(questions)}"
+            questions.append(question)
+    
+    return questions
+
+def _generate_radical_question(snapshot: CatalogSnapshot, distractors: DistractorIndex, radical_id: str, question_type: str):
     """Generate a question for a radical"""
-    doc = db.collection('radicals').document(radical_id).get()
-    if not doc.exists:
+    radical_data = snapshot.radicals.get(radical_id)
+    if radical_data is None:
         return None
     
-    radical_data = doc.to_dict()
-    
     # Get other radicals for wrong options
-    all_radicals = list(db.collection('radicals').limit(20).stream())
-    wrong_options = [r.to_dict() for r in all_radicals if r.id != radical_id][:3]
+    wrong_options = distractors.sample_radicals(radical_id, 3)
     
     if question_type == "radical_recognition":
         options = [radical_data['meaning']] + [r['meaning'] for r in wrong_options]
@@ -92,17 +117,15 @@ async def _generate_radical_question(db, radical_id: str, question_type: str):
             item_type=ItemType.RADICAL
         )
 
-async def _generate_character_question(db, character_id: str, question_type: str):
+def _generate_character_question(snapshot: CatalogSnapshot, distractors: DistractorIndex, graph: DecompositionGraph,
+                                 character_id: str, question_type: str):
     """Generate a question for a character"""
-    doc = db.collection('characters').document(character_id).get()
-    if not doc.exists:
+    char_data = snapshot.characters.get(character_id)
+    if char_data is None:
         return None
     
-    char_data = doc.to_dict()
-    
     # Get other characters for wrong options
-    all_chars = list(db.collection('characters').limit(20).stream())
-    wrong_options = [c.to_dict() for c in all_chars if c.id != character_id][:3]
+    wrong_options = distractors.sample_characters(character_id, 3)
     
     if question_type == "meaning_match":
         options = [char_data['meaning']] + [c['meaning'] for c in wrong_options]
@@ -118,20 +141,15 @@ async def _generate_character_question(db, character_id: str, question_type: str
             item_type=ItemType.CHARACTER
         )
     else:  # character_composition
-        # Get radicals for this character
-        radical_ids = char_data.get('radicals', [])
+        # Get radicals for this character from the decomposition graph
+        radical_ids = list(graph.radical_ids(character_id))
         if not radical_ids:
             return None
         
-        radicals = []
-        for r_id in radical_ids:
-            r_doc = db.collection('radicals').document(r_id).get()
-            if r_doc.exists:
-                radicals.append(r_doc.to_dict()['character'])
+        radicals = [snapshot.radicals[r_id]['character'] for r_id in radical_ids if r_id in snapshot.radicals]
         
         # Get wrong radical options
-        all_radicals = list(db.collection('radicals').limit(10).stream())
-        wrong_radical_chars = [r.to_dict()['character'] for r in all_radicals if r.id not in radical_ids][:3]
+        wrong_radical_chars = [r['character'] for r in distractors.sample_composition_radicals(radical_ids, 3)]
         
         options = [', '.join(radicals)] + [', '.join(random.sample(wrong_radical_chars, min(len(radicals), len(wrong_radical_chars)))) for _ in range(3)]
         random.shuffle(options)
@@ -147,61 +165,105 @@ async def _generate_character_question(db, character_id: str, question_type: str
         )
 
 @router.post("/submit")
-async def submit_quiz_answer(attempt: QuizAttempt):
-    """Submit a quiz answer and record it"""
+async def submit_quiz_answer(answer: QuizAnswer, idempotency_key: Optional[str] = Header(None)):
+    """Submit an answer to a generated quiz. The answer is checked on the server and recorded"""
     try:
-        db = get_db()
+        sessions = get_quiz_session_store()
+        session = await sessions.get(answer.quiz_id)
+        if session is None:
+            raise HTTPException(status_code=404, detail="Quiz not found or expired")
+        if session.user_id != answer.user_id:
+            raise HTTPException(status_code=403, detail="Quiz belongs to another user")
+        
+        question = session.questions.get(answer.question_id)
+        if question is None:
+            raise HTTPException(status_code=404, detail="Question not found in this quiz")
+        
+        # One answer per question, claimed in the store before queuing the attempt,
+        # so a different answer (on any instance) gets a 409
+        correct = answer.answer == question.correct_answer
+        previous = await sessions.claim_answer(session, question.id, answer.answer, correct)
+        if previous is not None:
+            if previous[0] != answer.answer:
+                raise HTTPException(status_code=409, detail="Question already answered")
+            # A client retry: already recorded
+            return {"status": "success", "correct": previous[1], "correct_answer": question.correct_answer,
+                    "duplicate": True}
+        
+        # Clients may report when the answer was given (e.g. queued while offline),
+        # but it can only have been given between generating the quiz and now
+        now = datetime.now()
+        answered_at = to_local_naive(answer.answered_at) if answer.answered_at else now
+        attempt = QuizAttempt(
+            user_id=answer.user_id,
+            question_id=question.id,
+            question_type=question.question_type,
+            answer=answer.answer,
+            correct=correct,
+            timestamp=min(max(answered_at, session.created_at), now),
+            item_id=question.item_id,
+            item_type=question.item_type
+        )
         
-        # Save attempt
-        attempt_dict = attempt.dict()
-        attempt_dict['timestamp'] = attempt.timestamp.isoformat()
-        db.collection('quiz_attempts').add(attempt_dict)
+        # Queued for a group commit (counted as a mistake when written, if incorrect).
+        # One answer per question, so the question itself is the default idempotency key
+        key = idempotency_key or f"{session.quiz_id}_{question.id}"
+        try:
+            accepted = await get_quiz_attempt_buffer().submit(attempt, key=key)
+        except BaseException:
+            # Not recorded (e.g. 503 while the buffer is full): let the client's retry through
+            await sessions.release_answer(session, question.id)
+            raise
         
-        return {"status": "success", "correct": attempt.correct}
+        return {"status": "success", "correct": correct, "correct_answer": question.correct_answer,
+                "duplicate": not accepted}
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/{user_id}/history")
-async def get_quiz_history(user_id: str, limit: int = 50):
-    """Get quiz attempt history for a user"""
+async def get_quiz_history(user_id: str, response: Response, limit: int = 50, cursor: Optional[str] = None):
+    """Get quiz attempt history for a user, newest first. The next page cursor is returned in the X-Next-Cursor header"""
     try:
-        db = get_db()
-        docs = db.collection('quiz_attempts').where('user_id', '==', user_id).order_by('timestamp', direction='DESCENDING').limit(limit).stream()
+        await get_quiz_attempt_buffer().flush_user(user_id)
+        attempts, next_cursor = await get_async_repository().get_quiz_history(user_id, limit=limit, cursor=cursor)
         
-        attempts = []
-        for doc in docs:
-            data = doc.to_dict()
-            if 'timestamp' in data and isinstance(data['timestamp'], str):
-                data['timestamp'] = datetime.fromisoformat(data['timestamp'])
-            attempts.append(data)
-        
-        return attempts
+        if next_cursor:
+            response.headers[NEXT_CURSOR_HEADER] = next_cursor
+        return json_response(attempts, response)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/{user_id}/history/export")
+async def export_quiz_history(user_id: str, format: ExportFormat = ExportFormat.NDJSON, cursor: Optional[str] = None):
+    """Stream a user's whole quiz history, newest first, as NDJSON or CSV. Pass the cursor of the last record received to resume"""
+    try:
+        await get_quiz_attempt_buffer().flush_user(user_id)
+        return await stream_export(
+            get_async_repository().list_quiz_attempts_page, user_id, list(QuizAttempt.model_fields),
+            format, f"quiz-history-{user_id}", cursor=cursor
+        )
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/{user_id}/mistakes", response_model=List[MistakeLog])
+async def get_mistakes(user_id: str, limit: int = 20, decay: bool = False):
+    """Get items the user frequently gets wrong, optionally weighting recent mistakes higher"""
+    try:
+        await get_quiz_attempt_buffer().flush_user(user_id)
+        return json_response(await get_async_repository().top_mistakes(user_id, limit=limit, decay=decay))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-@router.get("/{user_id}/mistakes")
-async def get_mistakes(user_id: str):
-    """Get items the user frequently gets wrong"""
+@router.get("/distractors/stats")
+async def get_distractor_stats():
+    """Get size and memory footprint of the precomputed distractor index"""
     try:
-        db = get_db()
-        docs = db.collection('quiz_attempts').where('user_id', '==', user_id).where('correct', '==', False).stream()
-        
-        mistakes = {}
-        for doc in docs:
-            data = doc.to_dict()
-            question_id = data.get('question_id')
-            if question_id in mistakes:
-                mistakes[question_id]['count'] += 1
-            else:
-                mistakes[question_id] = {
-                    'question_id': question_id,
-                    'question_type': data.get('question_type'),
-                    'count': 1
-                }
-        
-        # Sort by count
-        sorted_mistakes = sorted(mistakes.values(), key=lambda x: x['count'], reverse=True)
-        
-        return sorted_mistakes[:20]  # Return top 20 mistakes
+        return (await get_distractor_index()).memory_usage()
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
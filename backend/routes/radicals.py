@@ -1,70 +1,87 @@
-from fastapi import APIRouter, HTTPException
-from typing import List
-from models.schemas import Radical
-from services.firebase_service import get_db
+from fastapi import APIRouter, HTTPException, Request, Response
+from typing import List, Optional
+from models.schemas import Radical, RadicalOccurrence
+from services.catalog_cache import get_catalog_cache
+from services.decomposition_graph import get_decomposition_graph
+from services.search_index import get_catalog_search
+from services.http_cache import catalog_conditional
+from services.pagination import NEXT_CURSOR_HEADER, frequency_cursor, decode_frequency_cursor
+from services.codec import json_response, project
+from services.metrics import TimedRoute
 
-router = APIRouter()
+router = APIRouter(route_class=TimedRoute)
 
 @router.get("/", response_model=List[Radical])
-async def get_radicals(limit: int = 50, offset: int = 0):
-    """Get all radicals with pagination"""
+async def get_radicals(request: Request, response: Response, limit: int = 50, offset: int = 0,
+                       cursor: Optional[str] = None):
+    """Get all radicals by frequency. Page with `cursor` (from the X-Next-Cursor header) or `offset`"""
     try:
-        db = get_db()
-        radicals_ref = db.collection('radicals')
+        snapshot, not_modified = await catalog_conditional(request, response)
+        if not_modified:
+            return not_modified
         
-        # Query with pagination
-        query = radicals_ref.order_by('frequency', direction='DESCENDING').limit(limit).offset(offset)
-        docs = query.stream()
+        after = decode_frequency_cursor(cursor) if cursor else None
+        radicals = await get_catalog_cache().list_radicals(limit=limit, offset=offset, after=after,
+                                                          snapshot=snapshot)
         
-        radicals = []
-        for doc in docs:
-            data = doc.to_dict()
-            data['id'] = doc.id
-            radicals.append(Radical(**data))
-        
-        return radicals
+        if radicals and len(radicals) == limit:
+            response.headers[NEXT_CURSOR_HEADER] = frequency_cursor(radicals[-1])
+        return json_response(project(Radical, radicals), response)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/{radical_id}", response_model=Radical)
-async def get_radical(radical_id: str):
+async def get_radical(radical_id: str, request: Request, response: Response):
     """Get a specific radical by ID"""
     try:
-        db = get_db()
-        doc = db.collection('radicals').document(radical_id).get()
+        snapshot, not_modified = await catalog_conditional(request, response)
+        if not_modified:
+            return not_modified
         
-        if not doc.exists:
+        data = await get_catalog_cache().get_radical(radical_id, snapshot)
+        
+        if data is None:
             raise HTTPException(status_code=404, detail="Radical not found")
         
-        data = doc.to_dict()
-        data['id'] = doc.id
-        return Radical(**data)
+        return json_response(project(Radical, [data])[0], response)
     except HTTPException:
         raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/search/{query}")
-async def search_radicals(query: str):
+async def search_radicals(query: str, request: Request, response: Response, limit: int = 50):
     """Search radicals by meaning or character"""
     try:
-        db = get_db()
-        radicals_ref = db.collection('radicals')
+        # Tagged with the snapshot the index was built from, which may trail the cache's during a reload
+        search = await get_catalog_search()
+        _, not_modified = await catalog_conditional(request, response, search.snapshot)
+        if not_modified:
+            return not_modified
         
-        # Search by meaning or character (Firestore limitations apply)
-        docs = radicals_ref.stream()
+        results = search.search_radicals(query, limit=limit)
+        return json_response(project(Radical, results), response)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/{radical_id}/characters", response_model=List[RadicalOccurrence])
+async def get_radical_characters(radical_id: str, request: Request, response: Response, limit: int = 50,
+                                 offset: int = 0):
+    """Get the characters containing a radical, most frequent first, with the radical's position in each"""
+    try:
+        graph = await get_decomposition_graph()
+        snapshot, not_modified = await catalog_conditional(request, response, graph.snapshot)
+        if not_modified:
+            return not_modified
         
-        results = []
-        query_lower = query.lower()
-        for doc in docs:
-            data = doc.to_dict()
-            data['id'] = doc.id
-            
-            # Simple text search (in production, use a proper search service)
-            if (query_lower in data.get('meaning', '').lower() or 
-                query in data.get('character', '')):
-                results.append(Radical(**data))
+        if await get_catalog_cache().get_radical(radical_id, snapshot) is None:
+            raise HTTPException(status_code=404, detail="Radical not found")
         
-        return results
+        characters = graph.characters_containing(radical_id, limit=limit, offset=offset)
+        return json_response(project(RadicalOccurrence, characters), response)
+    except HTTPException:
+        raise
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+        raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
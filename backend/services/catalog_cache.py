@@ -0,0 +1,300 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from bisect import bisect_right
+from collections import OrderedDict
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Tuple
+
+import orjson
+
+from services.codec import dumps
+from services.repository import get_repository, run_blocking
+
+logger = logging.getLogger(__name__)
+
+
+def _frequency_order(item: dict):
+    return (-item.get('frequency', 0), item['id'])
+
+
+class _OrderedItems:
+    """Items in frequency order with their sort keys, for O(log n) seeks to a cursor position"""
+
+    def __init__(self, items: List[dict]):
+        self.items = items
+        self.keys = [_frequency_order(item) for item in items]
+
+    def page(self, limit: int, offset: int = 0, after: Optional[Tuple[int, str]] = None) -> List[dict]:
+        """
+        One page of items.
+
+        Args:
+            limit: Page size
+            offset: Items to skip (ignored when `after` is given)
+            after: (frequency, id) of the last item of the previous page
+        """
+        if after is not None:
+            frequency, item_id = after
+            start = bisect_right(self.keys, (-frequency, item_id))
+        else:
+            start = offset
+        return self.items[start:start + limit]
+
+
+class CatalogSnapshot:
+    """
+    Read-only in-memory copy of the radicals and characters collections.
+    """
+
+    def __init__(self, radicals: Dict[str, dict], characters: Dict[str, dict], version=None,
+                 etag: Optional[str] = None):
+        self.radicals = radicals
+        self.characters = characters
+        self.version = version
+        self.loaded_at = time.monotonic()
+
+        # Pre-sorted views so list endpoints never sort or scan per request
+        self.radicals_by_frequency = sorted(radicals.values(), key=_frequency_order)
+        self.characters_by_frequency = sorted(characters.values(), key=_frequency_order)
+
+        self.radical_pages = _OrderedItems(self.radicals_by_frequency)
+        self.character_pages = _OrderedItems(self.characters_by_frequency)
+        by_level: Dict[int, List[dict]] = {}
+        for character in self.characters_by_frequency:
+            by_level.setdefault(character.get('hsk_level'), []).append(character)
+        self.character_pages_by_level = {level: _OrderedItems(items) for level, items in by_level.items()}
+
+        # Derived query results (an LRU filled by CatalogCache). Kept on the
+        # snapshot so a reload replaces them together with the data
+        self.results: "OrderedDict[tuple, list]" = OrderedDict()
+
+        # HTTP entity tag for everything derived from this snapshot. Built from
+        # the version and a content digest, so it also changes when documents
+        # are edited without bumping the version. Computed here, off the event
+        # loop (reloads run on the store thread pool), unless a snapshot file
+        # already carries it.
+        if etag is None:
+            digest = hashlib.sha256(json.dumps(
+                [radicals, characters], sort_keys=True, ensure_ascii=False, default=str
+            ).encode('utf-8')).hexdigest()[:16]
+            etag = f'"{version}-{digest}"'
+        self.etag = etag
+
+
+def write_snapshot_file(path: str, snapshot: CatalogSnapshot):
+    """Write a snapshot to a file that CatalogCache can preload (see CATALOG_SNAPSHOT_PATH)"""
+    data = {
+        'version': snapshot.version,
+        'etag': snapshot.etag,
+        'exported_at': datetime.now().astimezone(),
+        'radicals': snapshot.radicals,
+        'characters': snapshot.characters,
+    }
+    with open(path + '.tmp', 'wb') as f:
+        f.write(dumps(data))
+    os.replace(path + '.tmp', path)
+
+
+def read_snapshot_file(path: str) -> CatalogSnapshot:
+    """Load a snapshot written by write_snapshot_file"""
+    with open(path, 'rb') as f:
+        data = orjson.loads(f.read())
+    return CatalogSnapshot(data['radicals'], data['characters'], data['version'], etag=data['etag'])
+
+
+class CatalogCache:
+    """
+    Process-wide cache of the radical/character catalog.
+
+    The catalog is loaded from the repository once and served from memory.
+    It is reloaded when the TTL expires or when the catalog version marker
+    changes. The version marker is polled at most once every
+    `version_check_interval` seconds so the check itself stays cheap.
+    Derived query results (filtered/paginated lists) are kept in a
+    size-bounded LRU on each snapshot, so they go away with it on reload.
+
+    The lock serializes reloads, which hold it across store reads, so it is
+    never taken on the event loop; the LRU has its own lock, held only for
+    in-memory work.
+
+    With a `snapshot_path` (a file written by export_catalog_snapshot.py),
+    the first load reads that file instead of the store, so a cold start
+    serves the catalog without a query; the regular version check then
+    replaces it if the store has moved on.
+    """
+
+    def __init__(self, ttl_seconds: float = 3600, version_check_interval: float = 30,
+                 max_entries: int = 256, snapshot_path: Optional[str] = None):
+        self.ttl_seconds = ttl_seconds
+        self.version_check_interval = version_check_interval
+        self.max_entries = max_entries
+        self.snapshot_path = snapshot_path
+        self._snapshot_file_pending = bool(snapshot_path)
+
+        self._snapshot: Optional[CatalogSnapshot] = None
+        self._last_version_check = 0.0
+        self._listeners: List[Callable[[CatalogSnapshot], None]] = []
+        self._lock = threading.RLock()
+        self._results_lock = threading.Lock()
+
+    def subscribe(self, callback: Callable[[CatalogSnapshot], None]):
+        """
+        Call `callback` with the current snapshot, loading it if needed, and
+        then after every reload (blocking).
+
+        Both happen under the reload lock, so no reload can fall between the
+        first call and the registration.
+        """
+        with self._lock:
+            callback(self.snapshot())
+            self._listeners.append(callback)
+
+    def invalidate(self):
+        """Force a reload on the next access"""
+        with self._lock:
+            self._snapshot = None
+
+    def preload(self) -> bool:
+        """
+        Load the snapshot file, if one is configured and nothing has been loaded yet (blocking).
+
+        Returns:
+            Whether the file was loaded
+        """
+        with self._lock:
+            if self._snapshot is not None or not self._snapshot_file_pending:
+                return False
+            self._snapshot_file_pending = False
+            try:
+                snapshot = read_snapshot_file(self.snapshot_path)
+            except (OSError, ValueError, KeyError) as e:
+                logger.warning("Catalog snapshot %s not loaded (%s), reading the store instead", self.snapshot_path, e)
+                return False
+            self._install(snapshot)
+            return True
+
+    def snapshot(self) -> CatalogSnapshot:
+        """Return the current catalog snapshot, reloading it if stale (blocking)"""
+        with self._lock:
+            if self._is_stale():
+                self._reload()
+            return self._snapshot
+
+    async def get_snapshot(self) -> CatalogSnapshot:
+        """
+        Return the current catalog snapshot from async code.
+
+        The fresh case is answered without I/O; version checks and reloads
+        run on the store thread pool.
+        """
+        snapshot = self._snapshot
+        if snapshot is not None:
+            now = time.monotonic()
+            if (now - snapshot.loaded_at < self.ttl_seconds
+                    and now - self._last_version_check < self.version_check_interval):
+                return snapshot
+        return await run_blocking(self.snapshot)
+
+    def _is_stale(self) -> bool:
+        if self._snapshot is None:
+            return True
+
+        now = time.monotonic()
+        if now - self._snapshot.loaded_at >= self.ttl_seconds:
+            return True
+
+        if now - self._last_version_check >= self.version_check_interval:
+            self._last_version_check = now
+            return get_repository().get_catalog_version() != self._snapshot.version
+
+        return False
+
+    def _reload(self):
+        if self.preload():
+            return
+        repository = get_repository()
+        version = repository.get_catalog_version()
+        radicals, characters = repository.load_catalog()
+        self._install(CatalogSnapshot(radicals, characters, version))
+
+    def _install(self, snapshot: CatalogSnapshot):
+        self._snapshot = snapshot
+        self._last_version_check = time.monotonic()
+
+        for callback in self._listeners:
+            callback(self._snapshot)
+
+    async def _cached_result(self, key: tuple, compute: Callable[[CatalogSnapshot], list],
+                             snapshot: Optional[CatalogSnapshot] = None) -> list:
+        snapshot = snapshot or await self.get_snapshot()
+        results = snapshot.results
+        with self._results_lock:
+            if key in results:
+                results.move_to_end(key)
+                return results[key]
+
+            result = compute(snapshot)
+            results[key] = result
+            while len(results) > self.max_entries:
+                results.popitem(last=False)
+            return result
+
+    async def list_radicals(self, limit: int = 50, offset: int = 0,
+                            after: Optional[Tuple[int, str]] = None,
+                            snapshot: Optional[CatalogSnapshot] = None) -> List[dict]:
+        """
+        Radicals ordered by frequency (descending).
+
+        Pass the (frequency, id) of the last radical of the previous page as
+        `after` to continue from it; `offset` is then ignored. Pass `snapshot`
+        to read a snapshot already in hand (e.g. the one whose ETag the
+        response carries) rather than the current one.
+        """
+        if after is not None:
+            # Seeking to a cursor is O(log n); not worth an LRU slot per position
+            return (snapshot or await self.get_snapshot()).radical_pages.page(limit, after=after)
+
+        return await self._cached_result(
+            ('radicals', limit, offset),
+            lambda s: s.radical_pages.page(limit, offset),
+            snapshot
+        )
+
+    async def list_characters(self, limit: int = 50, offset: int = 0, hsk_level: int = None,
+                              after: Optional[Tuple[int, str]] = None,
+                              snapshot: Optional[CatalogSnapshot] = None) -> List[dict]:
+        """Characters ordered by frequency (descending), optionally filtered by HSK level (see list_radicals)"""
+        def compute(s: CatalogSnapshot):
+            pages = s.character_pages_by_level.get(hsk_level) if hsk_level else s.character_pages
+            return pages.page(limit, offset, after) if pages else []
+
+        if after is not None:
+            return compute(snapshot or await self.get_snapshot())
+        return await self._cached_result(('characters', hsk_level, limit, offset), compute, snapshot)
+
+    async def get_radical(self, radical_id: str, snapshot: Optional[CatalogSnapshot] = None) -> Optional[dict]:
+        return (snapshot or await self.get_snapshot()).radicals.get(radical_id)
+
+    async def get_character(self, character_id: str,
+                            snapshot: Optional[CatalogSnapshot] = None) -> Optional[dict]:
+        return (snapshot or await self.get_snapshot()).characters.get(character_id)
+
+
+_catalog_cache: Optional[CatalogCache] = None
+
+
+def get_catalog_cache() -> CatalogCache:
+    """Get the process-wide catalog cache"""
+    global _catalog_cache
+    if _catalog_cache is None:
+        _catalog_cache = CatalogCache(
+            ttl_seconds=float(os.getenv("CATALOG_CACHE_TTL", "3600")),
+            version_check_interval=float(os.getenv("CATALOG_VERSION_CHECK_INTERVAL", "30")),
+            max_entries=int(os.getenv("CATALOG_CACHE_MAX_ENTRIES", "256")),
+            snapshot_path=os.getenv("CATALOG_SNAPSHOT_PATH") or None,
+        )
+    return _catalog_cache
@@ -0,0 +1,331 @@
+import csv
+import json
+import logging
+import random
+import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from google.api_core import exceptions as api_exceptions
+from pydantic import ValidationError
+
+from models.schemas import Radical, Character
+from services.progress_service import WRITE_BATCH_SIZE
+
+logger = logging.getLogger(__name__)
+
+RADICALS_COLLECTION = 'radicals'
+CHARACTERS_COLLECTION = 'characters'
+
+# Errors worth retrying: Firestore contention, throttling and timeouts, and a busy SQLite file.
+# Every write is a full document set or a delete, so replaying a chunk is harmless.
+RETRYABLE_ERRORS = (
+    api_exceptions.Aborted,
+    api_exceptions.DeadlineExceeded,
+    api_exceptions.InternalServerError,
+    api_exceptions.ResourceExhausted,
+    api_exceptions.ServiceUnavailable,
+    sqlite3.OperationalError,
+)
+
+# Separators allowed between glyphs in list columns ("女子", "女 子" and "女,子" all work)
+_GLYPH_SEPARATORS = ' ,;|'
+
+
+def radical_id(glyph: str) -> str:
+    """Deterministic document id for a radical, from its glyph"""
+    return "rad_" + "_".join(f"{ord(ch):04x}" for ch in glyph)
+
+
+def character_id(hanzi: str) -> str:
+    """Deterministic document id for a character (or word), from its hanzi"""
+    return "char_" + "_".join(f"{ord(ch):04x}" for ch in hanzi)
+
+
+def _ids_by_glyph(stored: Dict[str, dict], key: str) -> Dict[str, List[str]]:
+    by_glyph: Dict[str, List[str]] = {}
+    for item_id, doc in stored.items():
+        if doc.get(key):
+            by_glyph.setdefault(doc[key], []).append(item_id)
+    return by_glyph
+
+
+def existing_ids(stored: Dict[str, dict], key: str, make_id: Callable[[str], str],
+                 in_use: Set[str]) -> Dict[str, str]:
+    """
+    The stored id to keep for every glyph already in the catalog.
+
+    Re-ingesting then updates documents in place, including those created
+    with random ids by earlier seed scripts, instead of adding copies under
+    deterministic ids: user progress, mistakes and quiz attempts refer to
+    the stored ids. Where a glyph is stored more than once, the copy user data
+    refers to is kept, then the one with the deterministic id, then the lowest id.
+
+    Args:
+        stored: Stored documents keyed by id
+        key: Glyph field ('character' or 'hanzi')
+        make_id: Deterministic id for a glyph
+        in_use: Stored ids that user data (or other catalog documents) refer to
+    """
+    return {
+        glyph: min(ids, key=lambda item_id: (item_id not in in_use, item_id != make_id(glyph), item_id))
+        for glyph, ids in _ids_by_glyph(stored, key).items()
+    }
+
+
+def duplicate_ids(stored: Dict[str, dict], key: str) -> List[str]:
+    """Ids of stored documents whose glyph is stored more than once"""
+    return [item_id for ids in _ids_by_glyph(stored, key).values() if len(ids) > 1 for item_id in ids]
+
+
+def read_records(path: Path) -> List[dict]:
+    """
+    Read dataset rows from a .csv, .json (a list of objects) or .jsonl/.ndjson file.
+    """
+    suffix = path.suffix.lower()
+    with open(path, encoding='utf-8-sig', newline='') as f:
+        if suffix == '.csv':
+            return list(csv.DictReader(f))
+        if suffix == '.json':
+            records = json.load(f)
+            if not isinstance(records, list):
+                raise ValueError(f"{path}: expected a JSON list of objects")
+            return records
+        if suffix in ('.jsonl', '.ndjson'):
+            return [json.loads(line) for line in f if line.strip()]
+    raise ValueError(f"{path}: unsupported file type (use .csv, .json or .jsonl)")
+
+
+def _glyphs(value) -> List[str]:
+    """Glyph list from a list column or a string of glyphs"""
+    if value is None:
+        return []
+    if isinstance(value, list):
+        return [str(glyph).strip() for glyph in value if str(glyph).strip()]
+    return [ch for ch in str(value) if ch not in _GLYPH_SEPARATORS and not ch.isspace()]
+
+
+def parse_radicals(records: Iterable[dict], source: str = 'radicals',
+                   ids: Optional[Dict[str, str]] = None) -> Tuple[Dict[str, dict], Dict[str, str]]:
+    """
+    Validate radical rows and key them by id.
+
+    Args:
+        records: Rows with character, meaning, stroke_count, frequency, examples and variants
+        ids: Glyph -> id of radicals already stored (see existing_ids); others get deterministic ids
+
+    Returns:
+        (radicals keyed by id, glyph -> radical id including variant forms such as 亻 for 人)
+    """
+    radicals: Dict[str, dict] = {}
+    glyph_index: Dict[str, str] = {}
+    for line, record in enumerate(records, start=1):
+        try:
+            doc = {
+                'character': str(record['character']).strip(),
+                'meaning': str(record['meaning']).strip(),
+                'stroke_count': int(record['stroke_count']),
+                'frequency': int(record['frequency']),
+                'examples': _glyphs(record.get('examples')),
+            }
+            variants = _glyphs(record.get('variants'))
+            if variants:
+                doc['variants'] = variants
+            item_id = (ids or {}).get(doc['character']) or radical_id(doc['character'])
+            Radical(id=item_id, **doc)
+        except (KeyError, TypeError, ValueError, ValidationError) as e:
+            raise ValueError(f"{source} row {line}: {e}") from e
+
+        if item_id in radicals:
+            raise ValueError(f"{source} row {line}: duplicate radical {doc['character']}")
+        radicals[item_id] = doc
+        for glyph in [doc['character']] + variants:
+            glyph_index[glyph] = item_id
+    return radicals, glyph_index
+
+
+def parse_characters(records: Iterable[dict], glyph_index: Dict[str, str], source: str = 'characters',
+                     ids: Optional[Dict[str, str]] = None) -> Tuple[Dict[str, dict], Dict[str, List[str]]]:
+    """
+    Validate character rows, resolve their radical glyphs and key them by id.
+
+    Args:
+        records: Rows with hanzi, pinyin, meaning, hsk_level, frequency and radicals (glyphs)
+        glyph_index: Radical glyph (or variant) -> radical id
+        ids: Hanzi -> id of characters already stored (see existing_ids); others get deterministic ids
+
+    Returns:
+        (characters keyed by id, hanzi -> radical glyphs that could not be resolved)
+    """
+    characters: Dict[str, dict] = {}
+    unresolved: Dict[str, List[str]] = {}
+    for line, record in enumerate(records, start=1):
+        try:
+            hanzi = str(record['hanzi']).strip()
+            radical_ids, missing = [], []
+            for glyph in _glyphs(record.get('radicals')):
+                r_id = glyph_index.get(glyph)
+                if r_id is None:
+                    missing.append(glyph)
+                elif r_id not in radical_ids:
+                    radical_ids.append(r_id)
+
+            doc = {
+                'hanzi': hanzi,
+                'pinyin': str(record['pinyin']).strip(),
+                'meaning': str(record['meaning']).strip(),
+                'hsk_level': int(record['hsk_level']),
+                'frequency': int(record['frequency']),
+                'radicals': radical_ids,
+            }
+            positions = record.get('radical_positions')
+            if isinstance(positions, dict):
+                doc['radical_positions'] = {
+                    glyph_index[glyph]: position for glyph, position in positions.items() if glyph in glyph_index
+                }
+            item_id = (ids or {}).get(hanzi) or character_id(hanzi)
+            Character(id=item_id, **doc)
+        except (KeyError, TypeError, ValueError, ValidationError) as e:
+            raise ValueError(f"{source} row {line}: {e}") from e
+
+        if item_id in characters:
+            raise ValueError(f"{source} row {line}: duplicate character {hanzi}")
+        characters[item_id] = doc
+        if missing:
+            unresolved[hanzi] = missing
+    return characters, unresolved
+
+
+@dataclass
+class CatalogDiff:
+    collection: str
+    upserts: Dict[str, dict] = field(default_factory=dict)
+    deletes: List[str] = field(default_factory=list)
+    unchanged: int = 0
+
+    @property
+    def changed(self) -> bool:
+        return bool(self.upserts or self.deletes)
+
+
+def diff_catalog(collection: str, stored: Dict[str, dict], incoming: Dict[str, dict],
+                 prune: bool = False) -> CatalogDiff:
+    """
+    Compare a dataset with what is stored.
+
+    Args:
+        stored: Stored documents keyed by id (as returned by load_catalog)
+        incoming: Dataset documents keyed by id
+        prune: Also delete stored documents that are not in the dataset
+            (including duplicates left behind by the old random-id seed script)
+    """
+    diff = CatalogDiff(collection)
+    for item_id, doc in incoming.items():
+        current = stored.get(item_id)
+        if current is not None and {k: v for k, v in current.items() if k != 'id'} == doc:
+            diff.unchanged += 1
+        else:
+            diff.upserts[item_id] = doc
+    if prune:
+        diff.deletes = sorted(item_id for item_id in stored if item_id not in incoming)
+    return diff
+
+
+def with_retry(func: Callable, *args, attempts: int = 5, base_delay: float = 0.5, max_delay: float = 8.0):
+    """
+    Call `func`, retrying transient store errors with exponential backoff and full jitter.
+    """
+    for attempt in range(1, attempts + 1):
+        try:
+            return func(*args)
+        except RETRYABLE_ERRORS as e:
+            if attempt == attempts:
+                raise
+            delay = random.uniform(0, min(max_delay, base_delay * 2 ** (attempt - 1)))
+            logger.warning("Catalog write failed (%s), retry %d/%d in %.2fs", e, attempt, attempts - 1, delay)
+            time.sleep(delay)
+
+
+def write_changes(repository, diffs: List[CatalogDiff], workers: int = 8,
+                  chunk_size: int = WRITE_BATCH_SIZE, attempts: int = 5):
+    """
+    Apply diffs through the repository in parallel chunked batches.
+
+    Upserts of every collection are written before any delete, so characters
+    never point at radicals that are not there yet. Each chunk is one batch
+    commit (at most WRITE_BATCH_SIZE documents) and is retried on its own.
+    """
+    chunk_size = min(chunk_size, WRITE_BATCH_SIZE)
+    upserts, deletes = [], []
+    for diff in diffs:
+        items = list(diff.upserts.items())
+        upserts += [(repository.upsert_catalog_items, diff.collection, dict(items[i:i + chunk_size]))
+                    for i in range(0, len(items), chunk_size)]
+        deletes += [(repository.delete_catalog_items, diff.collection, diff.deletes[i:i + chunk_size])
+                    for i in range(0, len(diff.deletes), chunk_size)]
+
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="ingest") as executor:
+        for phase in (upserts, deletes):
+            futures = [executor.submit(with_retry, func, collection, chunk, attempts=attempts)
+                       for func, collection, chunk in phase]
+            for future in futures:
+                future.result()
+
+
+def plan_ingest(repository, radicals_path: Optional[Path] = None, characters_path: Optional[Path] = None,
+                prune: bool = False) -> Tuple[List[CatalogDiff], Dict[str, List[str]]]:
+    """
+    Read the dataset files and diff them against the stored catalog.
+
+    Items already stored keep their ids (matched by glyph). Character
+    radicals resolve against the radicals file and, for glyphs it does not
+    cover, the radicals already stored (unless they are being pruned).
+
+    Returns:
+        (diffs, hanzi -> radical glyphs that could not be resolved)
+
+    Raises:
+        ValueError if pruning would delete items that user data refers to
+    """
+    stored_radicals, stored_characters = repository.load_catalog()
+    diffs: List[CatalogDiff] = []
+
+    duplicates = duplicate_ids(stored_radicals, 'character') + duplicate_ids(stored_characters, 'hanzi')
+    in_use = repository.referenced_item_ids(duplicates) if duplicates else set()
+    # Radicals the stored characters point at count as in use too
+    in_use.update(r_id for character in stored_characters.values() for r_id in character.get('radicals') or [])
+    radical_ids = existing_ids(stored_radicals, 'character', radical_id, in_use)
+    character_ids = existing_ids(stored_characters, 'hanzi', character_id, in_use)
+
+    glyph_index: Dict[str, str] = {}
+    if not (prune and radicals_path):
+        for r_id, radical in stored_radicals.items():
+            for glyph in [radical.get('character')] + list(radical.get('variants') or []):
+                if glyph:
+                    glyph_index.setdefault(glyph, radical_ids.get(glyph, r_id))
+
+    if radicals_path:
+        radicals, dataset_index = parse_radicals(read_records(radicals_path), source=str(radicals_path),
+                                                 ids=radical_ids)
+        glyph_index.update(dataset_index)
+        diffs.append(diff_catalog(RADICALS_COLLECTION, stored_radicals, radicals, prune=prune))
+
+    unresolved: Dict[str, List[str]] = {}
+    if characters_path:
+        characters, unresolved = parse_characters(read_records(characters_path), glyph_index,
+                                                  source=str(characters_path), ids=character_ids)
+        diffs.append(diff_catalog(CHARACTERS_COLLECTION, stored_characters, characters, prune=prune))
+
+    deletes = [item_id for diff in diffs for item_id in diff.deletes]
+    referenced = sorted(repository.referenced_item_ids(deletes)) if deletes else []
+    if referenced:
+        raise ValueError(
+            f"--prune would delete {len(referenced)} item(s) that user progress, mistakes or quiz attempts "
+            f"still refer to ({', '.join(referenced[:5])}{', ...' if len(referenced) > 5 else ''}); "
+            f"run without --prune, or move that user data to the items being kept first"
+        )
+
+    return diffs, unresolved
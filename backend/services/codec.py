@@ -0,0 +1,94 @@
+import functools
+from datetime import datetime
+from enum import Enum
+from typing import Iterable, List, Optional, Tuple, Type
+
+import orjson
+from fastapi import Response
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+
+# UTC offsets are written as "Z", as pydantic does; naive datetimes stay naive
+_OPTIONS = orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+
+def encode_datetime(value: datetime) -> str:
+    """ISO 8601 text for a datetime, identical to its JSON encoding"""
+    text = value.isoformat()
+    return text[:-6] + 'Z' if text.endswith('+00:00') else text
+
+
+def plain(value):
+    """A datetime or enum as the JSON scalar it encodes to; anything else unchanged"""
+    if isinstance(value, datetime):
+        return encode_datetime(value)
+    if isinstance(value, Enum):
+        return value.value
+    return value
+
+
+def _default(value):
+    # Models built by the repositories hold already valid field values, so
+    # their fields are encoded as they are instead of being dumped first
+    if isinstance(value, BaseModel):
+        return value.__dict__
+    if isinstance(value, datetime):
+        return encode_datetime(value)
+    if isinstance(value, (set, frozenset)):
+        return list(value)
+    raise TypeError(f"Type is not JSON serializable: {type(value).__name__}")
+
+
+def dumps(content) -> bytes:
+    """
+    Encode content as JSON (UTF-8).
+
+    Datetimes are ISO 8601, enums their values and models their fields, so
+    the output matches what FastAPI's response_model serialization produces.
+    """
+    return orjson.dumps(content, default=_default, option=_OPTIONS)
+
+
+class FastJSONResponse(JSONResponse):
+    """JSON response rendered with the codec (the app's default response class)"""
+
+    def render(self, content) -> bytes:
+        return dumps(content)
+
+
+def json_response(content, response: Optional[Response] = None, status_code: int = 200) -> FastJSONResponse:
+    """
+    Serialize trusted content (repository models, catalog documents) straight
+    into a response, skipping the validation and jsonable_encoder passes of
+    the route's response_model. The response_model still documents the shape.
+
+    Args:
+        content: Models, dicts, lists and scalars
+        response: The handler's Response parameter; headers set on it are
+            carried over (FastAPI drops them when a Response is returned)
+        status_code: HTTP status
+    """
+    fast = FastJSONResponse(content, status_code=status_code)
+    if response is not None:
+        fast.headers.raw.extend(response.headers.raw)
+    return fast
+
+
+@functools.lru_cache(maxsize=None)
+def _fields(model: Type[BaseModel]) -> Tuple[Tuple[str, object], ...]:
+    return tuple(
+        (name, None if field.is_required() else field.get_default(call_default_factory=True))
+        for name, field in model.model_fields.items()
+    )
+
+
+def project(model: Type[BaseModel], items: Iterable[dict]) -> List[dict]:
+    """
+    Trusted documents reduced to a model's fields, missing ones filled with
+    the model's defaults, without validating them.
+
+    Args:
+        model: Response model whose fields are kept
+        items: Stored documents (e.g. from the catalog snapshot)
+    """
+    fields = _fields(model)
+    return [{name: item.get(name, default) for name, default in fields} for item in items]
@@ -0,0 +1,146 @@
+import heapq
+import threading
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from services.catalog_cache import CatalogSnapshot, get_catalog_cache
+from services.repository import run_blocking
+
+
+class DecompositionGraph:
+    """
+    Bidirectional character <-> radical graph built from one catalog snapshot.
+
+    Edges come from `Character.radicals` (in order, with an optional
+    `radical_positions` map of radical id -> position such as "left" or
+    "top") and from `Radical.examples`, whose hanzi are resolved to catalog
+    characters. Both directions are precomputed, and reverse lists are kept
+    in frequency order, so lookups are dictionary reads.
+
+    A graph is never modified once built; every reload builds a new one (see
+    get_decomposition_graph), so lookups on one graph always see one snapshot.
+    """
+
+    def __init__(self, snapshot: CatalogSnapshot):
+        """Build both directions from a catalog snapshot (linear in the number of edges)"""
+        radicals_of: Dict[str, List[str]] = {}
+        positions: Dict[Tuple[str, str], Optional[str]] = {}
+
+        for character in snapshot.characters_by_frequency:
+            char_id = character['id']
+            declared = character.get('radical_positions') or {}
+            edges = radicals_of[char_id] = []
+            for radical_id in character.get('radicals', []):
+                if radical_id in snapshot.radicals and radical_id not in edges:
+                    edges.append(radical_id)
+                    positions[(char_id, radical_id)] = declared.get(radical_id)
+
+        by_hanzi = {c.get('hanzi'): c['id'] for c in snapshot.characters_by_frequency}
+        for radical in snapshot.radicals_by_frequency:
+            for hanzi in radical.get('examples') or []:
+                char_id = by_hanzi.get(hanzi)
+                if char_id is not None and radical['id'] not in radicals_of[char_id]:
+                    radicals_of[char_id].append(radical['id'])
+                    positions[(char_id, radical['id'])] = None
+
+        characters_of: Dict[str, List[str]] = defaultdict(list)
+        for character in snapshot.characters_by_frequency:
+            for radical_id in radicals_of[character['id']]:
+                characters_of[radical_id].append(character['id'])
+
+        self.snapshot = snapshot
+        self._radicals_of = {c: tuple(r) for c, r in radicals_of.items()}
+        self._characters_of = {r: tuple(c) for r, c in characters_of.items()}
+        self._positions = positions
+        self._rank = {c['id']: rank for rank, c in enumerate(snapshot.characters_by_frequency)}
+
+    def has_character(self, character_id: str) -> bool:
+        return character_id in self._radicals_of
+
+    def radical_ids(self, character_id: str) -> Tuple[str, ...]:
+        """Ids of the radicals composing a character, in decomposition order"""
+        return self._radicals_of.get(character_id, ())
+
+    def decompose(self, character_id: str) -> Optional[List[dict]]:
+        """
+        Radicals composing a character, each with its `position`.
+
+        Returns:
+            Radical documents, or None if the character does not exist
+        """
+        if character_id not in self._radicals_of:
+            return None
+        radicals = self.snapshot.radicals
+        return [
+            {**radicals[r_id], 'position': self._positions.get((character_id, r_id))}
+            for r_id in self._radicals_of[character_id]
+        ]
+
+    def characters_containing(self, radical_id: str, limit: Optional[int] = None,
+                              offset: int = 0) -> List[dict]:
+        """Characters containing a radical, most frequent first, each with the radical's `position`"""
+        ids = self._characters_of.get(radical_id, ())
+        end = None if limit is None else offset + limit
+        characters = self.snapshot.characters
+        return [
+            {**characters[c_id], 'position': self._positions.get((c_id, radical_id))}
+            for c_id in ids[offset:end]
+        ]
+
+    def unlockable(self, known_radicals: Iterable[str], exclude: Iterable[str] = (),
+                   limit: int = 20) -> List[dict]:
+        """
+        Characters whose radicals are all known, most frequent first.
+
+        Only the reverse lists of the known radicals are visited, so the cost
+        depends on what the user knows rather than on the catalog size.
+
+        Args:
+            known_radicals: Radical ids the user has learned
+            exclude: Character ids to leave out (e.g. already learned)
+            limit: Maximum number of characters
+        """
+        excluded: Set[str] = set(exclude)
+        hits: Dict[str, int] = defaultdict(int)
+        for radical_id in set(known_radicals):
+            for char_id in self._characters_of.get(radical_id, ()):
+                hits[char_id] += 1
+
+        complete = (c for c, n in hits.items() if n == len(self._radicals_of[c]) and c not in excluded)
+        characters = self.snapshot.characters
+        return [characters[c] for c in heapq.nsmallest(limit, complete, key=self._rank.__getitem__)]
+
+
+_decomposition_graph: Optional[DecompositionGraph] = None
+_subscribe_lock = threading.Lock()
+
+
+def _rebuild(snapshot: CatalogSnapshot):
+    # Catalog cache listener (reloads run one at a time, on the store thread
+    # pool). Readers hold on to the previous graph until this assignment
+    global _decomposition_graph
+    _decomposition_graph = DecompositionGraph(snapshot)
+
+
+def _subscribe():
+    with _subscribe_lock:
+        if _decomposition_graph is None:
+            get_catalog_cache().subscribe(_rebuild)
+
+
+def current_decomposition_graph() -> Optional[DecompositionGraph]:
+    """The graph of the latest snapshot (for catalog listeners registered after the graph's)"""
+    return _decomposition_graph
+
+
+async def get_decomposition_graph() -> DecompositionGraph:
+    """
+    Get the decomposition graph of the current catalog snapshot.
+
+    It is built on the store thread pool, on first use and after every
+    reload, and replaced whole.
+    """
+    await get_catalog_cache().get_snapshot()
+    if _decomposition_graph is None:
+        await run_blocking(_subscribe)
+    return _decomposition_graph
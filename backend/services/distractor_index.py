@@ -0,0 +1,264 @@
+import random
+import sys
+import threading
+from collections import defaultdict
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Set, Tuple
+
+from services.catalog_cache import CatalogSnapshot, get_catalog_cache
+from services.repository import run_blocking
+from services.search_index import strip_tones
+
+# Number of ranked wrong answers kept per item
+NEIGHBOURS = 9
+
+# Frequency-ordered neighbours considered within an HSK level
+HSK_WINDOW = 12
+
+# Beyond this fraction of changed items a full rebuild is cheaper
+FULL_REBUILD_RATIO = 0.2
+
+_INITIALS = ('zh', 'ch', 'sh', 'b', 'p', 'm', 'f', 'd', 't', 'n', 'l', 'g', 'k', 'h',
+             'j', 'q', 'x', 'r', 'z', 'c', 's', 'y', 'w')
+
+
+def _split_pinyin(pinyin: str) -> Tuple[str, str, str]:
+    """Return (toneless syllable, initial, final) for a pinyin string"""
+    syllable = strip_tones(pinyin.lower()).strip()
+    for initial in _INITIALS:
+        if syllable.startswith(initial):
+            return syllable, initial, syllable[len(initial):]
+    return syllable, '', syllable
+
+
+@dataclass(frozen=True)
+class _IndexState:
+    """A catalog snapshot and the neighbour lists ranked from it; replaced whole, never mutated"""
+    snapshot: CatalogSnapshot
+    radical_neighbours: Dict[str, Tuple[str, ...]]
+    character_neighbours: Dict[str, Tuple[str, ...]]
+
+
+class _Ranker:
+    """Blocking indexes over one snapshot, used to gather and rank candidates while building"""
+
+    def __init__(self, snapshot: CatalogSnapshot):
+        self.snapshot = snapshot
+        self.chars_by_radical: Dict[str, List[str]] = defaultdict(list)
+        self.chars_by_syllable: Dict[str, List[str]] = defaultdict(list)
+        self.chars_by_hsk: Dict[int, List[str]] = defaultdict(list)
+        self.pinyin: Dict[str, Tuple[str, str, str]] = {}
+        self.cooccurrence: Dict[str, Dict[str, int]] = defaultdict(lambda: defaultdict(int))
+
+        for character in snapshot.characters_by_frequency:
+            char_id = character['id']
+            radical_ids = character.get('radicals', [])
+            for radical_id in radical_ids:
+                self.chars_by_radical[radical_id].append(char_id)
+                for other in radical_ids:
+                    if other != radical_id:
+                        self.cooccurrence[radical_id][other] += 1
+
+            pinyin = _split_pinyin(character.get('pinyin', ''))
+            self.pinyin[char_id] = pinyin
+            self.chars_by_syllable[pinyin[0]].append(char_id)
+            self.chars_by_hsk[character.get('hsk_level')].append(char_id)
+
+        self.hsk_position = {
+            char_id: pos for ids in self.chars_by_hsk.values() for pos, char_id in enumerate(ids)
+        }
+
+    def rank_radical(self, radical_id: str) -> Tuple[str, ...]:
+        radicals = self.snapshot.radicals
+        radical = radicals[radical_id]
+        strokes = radical.get('stroke_count', 0)
+        cooccurrence = self.cooccurrence.get(radical_id, {})
+
+        # The radical inventory is small (214 Kangxi radicals), so compare all
+        scored = []
+        for other_id, other in radicals.items():
+            if other_id == radical_id:
+                continue
+            if other.get('meaning') == radical.get('meaning') or other.get('character') == radical.get('character'):
+                continue
+            score = 2 * cooccurrence.get(other_id, 0) + max(0, 3 - abs(other.get('stroke_count', 0) - strokes))
+            scored.append((-score, -other.get('frequency', 0), other_id))
+
+        scored.sort()
+        return tuple(other_id for _, _, other_id in scored[:NEIGHBOURS])
+
+    def character_candidates(self, character_id: str) -> Set[str]:
+        character = self.snapshot.characters[character_id]
+        candidates = set()
+        for radical_id in character.get('radicals', []):
+            candidates.update(self.chars_by_radical.get(radical_id, [])[:50])
+        candidates.update(self.chars_by_syllable.get(self.pinyin[character_id][0], [])[:50])
+
+        level_ids = self.chars_by_hsk.get(character.get('hsk_level'), [])
+        position = self.hsk_position[character_id]
+        candidates.update(level_ids[max(0, position - HSK_WINDOW):position + HSK_WINDOW + 1])
+
+        candidates.discard(character_id)
+        return candidates
+
+    def rank_character(self, character_id: str) -> Tuple[str, ...]:
+        characters = self.snapshot.characters
+        character = characters[character_id]
+        radical_ids = set(character.get('radicals', []))
+        syllable, initial, final = self.pinyin[character_id]
+
+        scored = []
+        for other_id in self.character_candidates(character_id):
+            other = characters[other_id]
+            if other.get('meaning') == character.get('meaning') or other.get('hanzi') == character.get('hanzi'):
+                continue
+            other_syllable, other_initial, other_final = self.pinyin[other_id]
+            score = 3 * len(radical_ids.intersection(other.get('radicals', [])))
+            if other_syllable == syllable:
+                score += 2
+            elif other_initial == initial or other_final == final:
+                score += 1
+            if other.get('hsk_level') == character.get('hsk_level'):
+                score += 1
+            scored.append((-score, -other.get('frequency', 0), other_id))
+
+        scored.sort()
+        return tuple(other_id for _, _, other_id in scored[:NEIGHBOURS])
+
+
+class DistractorIndex:
+    """
+    Precomputed ranked wrong answers for every radical and character.
+
+    Radicals are ranked by how often they co-occur in characters and by
+    stroke-count similarity. Characters are ranked by shared radicals,
+    matching or rhyming pinyin and HSK level; candidates are gathered from
+    blocking indexes (radical -> characters, pinyin syllable, frequency
+    window within an HSK level) so building stays near-linear in the
+    catalog size. Sampling at quiz time is O(1) in the catalog size.
+
+    A rebuild publishes the snapshot and its neighbour lists together in a
+    single assignment, so readers, which take no lock, always see lists
+    ranked from the snapshot they sample items from.
+    """
+
+    def __init__(self):
+        self._state: Optional[_IndexState] = None
+        self._lock = threading.RLock()
+
+    def rebuild(self, snapshot: CatalogSnapshot):
+        """Sync the index with a new catalog snapshot, recomputing only affected items"""
+        with self._lock:
+            previous = self._state
+            ranker = _Ranker(snapshot)
+
+            if (previous is None or previous.snapshot.radicals != snapshot.radicals
+                    or previous.snapshot.characters != snapshot.characters):
+                # Radical rankings depend on character composition and the
+                # radical inventory is small, so they are always recomputed
+                radical_neighbours = {r_id: ranker.rank_radical(r_id) for r_id in snapshot.radicals}
+            else:
+                radical_neighbours = previous.radical_neighbours
+
+            character_neighbours = self._sync_characters(ranker, previous)
+            self._state = _IndexState(snapshot, radical_neighbours, character_neighbours)
+
+    @staticmethod
+    def _sync_characters(ranker: _Ranker, previous: Optional[_IndexState]) -> Dict[str, Tuple[str, ...]]:
+        old_items = previous.snapshot.characters if previous else {}
+        new_items = ranker.snapshot.characters
+        changed = {i for i in new_items if old_items.get(i) != new_items[i]}
+        removed = {i for i in old_items if i not in new_items}
+        if not old_items or len(changed) + len(removed) > FULL_REBUILD_RATIO * max(len(new_items), 1):
+            return {char_id: ranker.rank_character(char_id) for char_id in new_items}
+
+        dirty = changed | removed
+        if not dirty:
+            return previous.character_neighbours
+
+        # Changed items, items that ranked a changed item, and items a changed
+        # item could now rank near need recomputing
+        affected = set(changed)
+        for char_id, ranked in previous.character_neighbours.items():
+            if dirty.intersection(ranked):
+                affected.add(char_id)
+        for char_id in changed:
+            affected |= ranker.character_candidates(char_id)
+
+        result = {i: ranked for i, ranked in previous.character_neighbours.items() if i in new_items}
+        for char_id in affected:
+            if char_id in new_items:
+                result[char_id] = ranker.rank_character(char_id)
+        return result
+
+    def sample_radicals(self, radical_id: str, k: int = 3) -> List[dict]:
+        """Sample k plausible wrong radicals for a radical"""
+        state = self._state
+        return self._sample(state.radical_neighbours.get(radical_id, ()), state.snapshot.radicals,
+                            state.snapshot.radicals_by_frequency, {radical_id}, k)
+
+    def sample_characters(self, character_id: str, k: int = 3) -> List[dict]:
+        """Sample k plausible wrong characters for a character"""
+        state = self._state
+        return self._sample(state.character_neighbours.get(character_id, ()), state.snapshot.characters,
+                            state.snapshot.characters_by_frequency, {character_id}, k)
+
+    def sample_composition_radicals(self, radical_ids: List[str], k: int = 3) -> List[dict]:
+        """Sample k wrong radicals that look plausible next to the given ones"""
+        state = self._state
+        ranked = []
+        for radical_id in radical_ids:
+            ranked.extend(r for r in state.radical_neighbours.get(radical_id, ()) if r not in ranked)
+        return self._sample(tuple(ranked), state.snapshot.radicals,
+                            state.snapshot.radicals_by_frequency, set(radical_ids), k)
+
+    @staticmethod
+    def _sample(ranked: Tuple[str, ...], items: Dict[str, dict], fallback: List[dict],
+                exclude: Set[str], k: int) -> List[dict]:
+        picked = [items[i] for i in random.sample(ranked, min(k, len(ranked)))]
+        if len(picked) < k:
+            # Thin neighbourhoods are padded with the most frequent items
+            taken = exclude | {p['id'] for p in picked}
+            for item in fallback:
+                if len(picked) >= k:
+                    break
+                if item['id'] not in taken:
+                    picked.append(item)
+        return picked
+
+    def memory_usage(self) -> dict:
+        """Approximate memory held by the neighbour lists, in bytes"""
+        def size(neighbours: Dict[str, Tuple[str, ...]]) -> int:
+            return sys.getsizeof(neighbours) + sum(sys.getsizeof(t) for t in neighbours.values())
+
+        state = self._state
+        radical_bytes = size(state.radical_neighbours)
+        character_bytes = size(state.character_neighbours)
+        return {
+            'radicals': len(state.radical_neighbours),
+            'characters': len(state.character_neighbours),
+            'radical_bytes': radical_bytes,
+            'character_bytes': character_bytes,
+            'total_bytes': radical_bytes + character_bytes,
+        }
+
+
+_distractor_index: Optional[DistractorIndex] = None
+_subscribe_lock = threading.Lock()
+
+
+def _subscribe():
+    global _distractor_index
+    with _subscribe_lock:
+        if _distractor_index is None:
+            index = DistractorIndex()
+            get_catalog_cache().subscribe(index.rebuild)
+            _distractor_index = index
+
+
+async def get_distractor_index() -> DistractorIndex:
+    """Get the process-wide distractor index, kept in sync with the catalog cache (built on the store thread pool)"""
+    await get_catalog_cache().get_snapshot()
+    if _distractor_index is None:
+        await run_blocking(_subscribe)
+    return _distractor_index
@@ -0,0 +1,87 @@
+import csv
+import io
+import os
+from typing import AsyncIterator, Awaitable, Callable, List, Optional, Tuple
+
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
+
+from models.schemas import ExportFormat
+from services.codec import dumps, plain
+
+# Every exported record carries the cursor positioned after it; passing the
+# cursor of the last record received resumes an interrupted export.
+CURSOR_FIELD = 'cursor'
+
+MEDIA_TYPES = {
+    ExportFormat.NDJSON: 'application/x-ndjson',
+    ExportFormat.CSV: 'text/csv; charset=utf-8',
+}
+
+PageFetcher = Callable[..., Awaitable[Tuple[List[tuple], Optional[str]]]]
+
+
+def export_page_size() -> int:
+    """Records fetched from the store per page while streaming an export"""
+    return int(os.getenv("EXPORT_PAGE_SIZE", "500"))
+
+
+def _record(item, cursor: str) -> dict:
+    data = item.__dict__ if isinstance(item, BaseModel) else item
+    record = {key: plain(value) for key, value in data.items()}
+    record[CURSOR_FIELD] = cursor
+    return record
+
+
+def _ndjson_chunk(records: List[dict], fields: List[str]) -> bytes:
+    return b''.join(dumps(record) + b'\n' for record in records)
+
+
+def _csv_chunk(records: List[dict], fields: List[str]) -> bytes:
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=fields + [CURSOR_FIELD], extrasaction='ignore')
+    writer.writerows(records)
+    return buffer.getvalue().encode('utf-8')
+
+
+async def stream_export(fetch_page: PageFetcher, user_id: str, fields: List[str],
+                        export_format: ExportFormat, filename: str,
+                        cursor: Optional[str] = None) -> StreamingResponse:
+    """
+    Stream a user's records as NDJSON or CSV, one store page at a time.
+
+    Only one page is held in memory at any point, whatever the size of the
+    history. The first page is fetched before the response starts, so an
+    invalid cursor or a store error still produces a proper error status.
+
+    Args:
+        fetch_page: Awaitable repository page method, returning
+            ([(item, cursor after item)], cursor for the next page or None)
+        user_id: User whose records are exported
+        fields: Column order for CSV
+        export_format: ExportFormat.NDJSON or ExportFormat.CSV
+        filename: Download file name, without extension
+        cursor: Cursor of the last record already received, to resume
+
+    Returns:
+        A StreamingResponse
+    """
+    page_size = export_page_size()
+    rows, next_cursor = await fetch_page(user_id, limit=page_size, cursor=cursor)
+    to_chunk = _csv_chunk if export_format == ExportFormat.CSV else _ndjson_chunk
+
+    async def chunks() -> AsyncIterator[bytes]:
+        nonlocal rows, next_cursor
+        if export_format == ExportFormat.CSV and cursor is None:
+            yield (','.join(fields + [CURSOR_FIELD]) + '\r\n').encode('utf-8')
+        while True:
+            yield to_chunk([_record(item, position) for item, position in rows], fields)
+            if not next_cursor:
+                return
+            rows, next_cursor = await fetch_page(user_id, limit=page_size, cursor=next_cursor)
+
+    return StreamingResponse(
+        chunks(),
+        media_type=MEDIA_TYPES[export_format],
+        headers={'Content-Disposition': f'attachment; filename="{filename}.{export_format.value}"'}
+    )
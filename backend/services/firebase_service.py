@@ -1,10 +1,18 @@
-import firebase_admin
-from firebase_admin import credentials, firestore
 import os
 import json
+import threading
+from services.firestore_instrumentation import instrument
+
+# firebase_admin (and the google-cloud stack behind it) takes a few hundred
+# milliseconds to import, so it is only imported once Firestore is first used
+_client = None
+_client_lock = threading.Lock()
 
 def initialize_firebase():
-    """Initialize Firebase Admin SDK"""
+    """Initialize Firebase Admin SDK and return the Firestore client"""
+    import firebase_admin
+    from firebase_admin import credentials, firestore
+    
     if not firebase_admin._apps:
         # Load Firebase credentials from environment variables
         cred_dict = {
@@ -26,5 +34,10 @@ def initialize_firebase():
     return firestore.client()
 
 def get_db():
-    """Get Firestore database client"""
-    return firestore.client()
+    """Get Firestore database client (instrumented with per-request operation accounting), initializing the SDK on first use"""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = initialize_firebase()
+    return instrument(_client)
@@ -0,0 +1,235 @@
+import time
+from typing import Optional
+
+from services.metrics import record_store_op
+
+
+class _Proxy:
+    """Delegates everything not overridden to the wrapped Firestore object"""
+
+    def __init__(self, inner, shape: str):
+        self._inner = inner
+        self._shape = shape
+
+    def __getattr__(self, name):
+        return getattr(self._inner, name)
+
+
+def _unwrap(value):
+    """Real Firestore objects for proxies passed back into the client (one level deep)"""
+    if isinstance(value, _Proxy):
+        return value._inner
+    if isinstance(value, dict):
+        return {k: v._inner if isinstance(v, _Proxy) else v for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return type(value)(v._inner if isinstance(v, _Proxy) else v for v in value)
+    return value
+
+
+def _unwrap_call(args, kwargs):
+    return [_unwrap(a) for a in args], {k: _unwrap(v) for k, v in kwargs.items()}
+
+
+class _Query(_Proxy):
+    """
+    Query wrapper that records the query shape (collection, filters, ordering,
+    limit, without the values) and bills reads like Firestore: one per
+    returned document, and one for a query with no results.
+    """
+
+    def _derive(self, method: str, description: str, args, kwargs):
+        args, kwargs = _unwrap_call(args, kwargs)
+        return _Query(getattr(self._inner, method)(*args, **kwargs), f"{self._shape} {description}")
+
+    def where(self, *args, **kwargs):
+        description = f"where {args[0]} {args[1]}" if len(args) >= 2 else "where <filter>"
+        return self._derive('where', description, args, kwargs)
+
+    def order_by(self, field_path, *args, **kwargs):
+        direction = kwargs.get('direction', args[0] if args else 'ASCENDING')
+        suffix = " desc" if str(direction).upper().endswith('DESCENDING') else ""
+        return self._derive('order_by', f"order_by {field_path}{suffix}", (field_path,) + args, kwargs)
+
+    def limit(self, count):
+        return self._derive('limit', f"limit {count}", (count,), {})
+
+    def offset(self, count):
+        return self._derive('offset', "offset", (count,), {})
+
+    def select(self, field_paths):
+        return self._derive('select', f"select({', '.join(field_paths)})", (field_paths,), {})
+
+    def start_after(self, *args, **kwargs):
+        return self._derive('start_after', "start_after", args, kwargs)
+
+    def start_at(self, *args, **kwargs):
+        return self._derive('start_at', "start_at", args, kwargs)
+
+    def stream(self, *args, **kwargs):
+        args, kwargs = _unwrap_call(args, kwargs)
+        iterator = iter(self._inner.stream(*args, **kwargs))
+        count, seconds = 0, 0.0
+        try:
+            while True:
+                start = time.perf_counter()
+                try:
+                    doc = next(iterator)
+                except StopIteration:
+                    seconds += time.perf_counter() - start
+                    return
+                seconds += time.perf_counter() - start
+                count += 1
+                yield doc
+        finally:
+            record_store_op(f"query {self._shape}", reads=max(count, 1), seconds=seconds)
+
+    def get(self, *args, **kwargs):
+        return list(self.stream(*args, **kwargs))
+
+
+class _Collection(_Query):
+    def document(self, *args):
+        ref = self._inner.document(*args)
+        return _Document(ref, f"{self._shape}/{{id}}")
+
+    def add(self, *args, **kwargs):
+        args, kwargs = _unwrap_call(args, kwargs)
+        start = time.perf_counter()
+        result = self._inner.add(*args, **kwargs)
+        record_store_op(f"add {self._shape}", writes=1, seconds=time.perf_counter() - start)
+        return result
+
+
+class _Document(_Proxy):
+    def get(self, *args, **kwargs):
+        args, kwargs = _unwrap_call(args, kwargs)
+        start = time.perf_counter()
+        snapshot = self._inner.get(*args, **kwargs)
+        in_transaction = " in transaction" if kwargs.get('transaction') is not None else ""
+        record_store_op(f"get {self._shape}{in_transaction}", reads=1, seconds=time.perf_counter() - start)
+        return snapshot
+
+    def _write(self, method: str, args, kwargs):
+        args, kwargs = _unwrap_call(args, kwargs)
+        start = time.perf_counter()
+        result = getattr(self._inner, method)(*args, **kwargs)
+        record_store_op(f"{method} {self._shape}", writes=1, seconds=time.perf_counter() - start)
+        return result
+
+    def set(self, *args, **kwargs):
+        return self._write('set', args, kwargs)
+
+    def create(self, *args, **kwargs):
+        return self._write('create', args, kwargs)
+
+    def update(self, *args, **kwargs):
+        return self._write('update', args, kwargs)
+
+    def delete(self, *args, **kwargs):
+        return self._write('delete', args, kwargs)
+
+
+class _Writes(_Proxy):
+    """Write batch / transaction: writes are buffered locally and billed on commit"""
+
+    def __init__(self, inner, shape: str):
+        super().__init__(inner, shape)
+        self._pending = []
+
+    def _buffer(self, method: str, args, kwargs):
+        reference = args[0] if args else kwargs.get('reference')
+        self._pending.append(f"{method} {getattr(reference, '_shape', '?')}")
+        args, kwargs = _unwrap_call(args, kwargs)
+        getattr(self._inner, method)(*args, **kwargs)
+        return self
+
+    def set(self, *args, **kwargs):
+        return self._buffer('set', args, kwargs)
+
+    def create(self, *args, **kwargs):
+        return self._buffer('create', args, kwargs)
+
+    def update(self, *args, **kwargs):
+        return self._buffer('update', args, kwargs)
+
+    def delete(self, *args, **kwargs):
+        return self._buffer('delete', args, kwargs)
+
+    def _record_commit(self, seconds: float):
+        targets = sorted(set(self._pending))
+        record_store_op(f"{self._shape} commit [{', '.join(targets)}]", writes=len(self._pending), seconds=seconds)
+        self._pending = []
+
+
+class _Batch(_Writes):
+    def commit(self, *args, **kwargs):
+        start = time.perf_counter()
+        result = self._inner.commit(*args, **kwargs)
+        self._record_commit(time.perf_counter() - start)
+        return result
+
+
+class _Transaction(_Writes):
+    # Called by firestore.transactional around each attempt
+    def _begin(self, *args, **kwargs):
+        start = time.perf_counter()
+        result = self._inner._begin(*args, **kwargs)
+        record_store_op("transaction begin", seconds=time.perf_counter() - start)
+        return result
+
+    def _clean_up(self):
+        self._pending = []
+        return self._inner._clean_up()
+
+    def _commit(self):
+        start = time.perf_counter()
+        result = self._inner._commit()
+        self._record_commit(time.perf_counter() - start)
+        return result
+
+    def get(self, ref_or_query, *args, **kwargs):
+        if isinstance(ref_or_query, _Document):
+            return ref_or_query.get(transaction=self._inner)
+        if isinstance(ref_or_query, _Query):
+            return ref_or_query.stream(transaction=self._inner)
+        return self._inner.get(ref_or_query, *args, **kwargs)
+
+
+class InstrumentedClient(_Proxy):
+    """
+    Firestore client wrapper that attributes every document read, write and
+    round-trip (with its query shape and latency) to the current request.
+    """
+
+    def __init__(self, inner):
+        super().__init__(inner, "client")
+
+    def collection(self, *args):
+        return _Collection(self._inner.collection(*args), "/".join(args))
+
+    def get_all(self, references, *args, **kwargs):
+        references = list(references)
+        collections = sorted({getattr(ref, '_shape', '?') for ref in references})
+        args, kwargs = _unwrap_call(args, kwargs)
+        start = time.perf_counter()
+        snapshots = list(self._inner.get_all([_unwrap(ref) for ref in references], *args, **kwargs))
+        record_store_op(f"get_all [{', '.join(collections)}]", reads=len(references),
+                        seconds=time.perf_counter() - start)
+        return snapshots
+
+    def batch(self):
+        return _Batch(self._inner.batch(), "batch")
+
+    def transaction(self, **kwargs):
+        return _Transaction(self._inner.transaction(**kwargs), "transaction")
+
+
+_instrumented: Optional[InstrumentedClient] = None
+
+
+def instrument(client) -> InstrumentedClient:
+    """Wrap a Firestore client (the wrapper is reused while the client is the same)"""
+    global _instrumented
+    if _instrumented is None or _instrumented._inner is not client:
+        _instrumented = InstrumentedClient(client)
+    return _instrumented
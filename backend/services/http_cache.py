@@ -0,0 +1,65 @@
+import os
+from typing import Optional, Tuple
+
+from fastapi import Request, Response
+
+from services.catalog_cache import CatalogSnapshot, get_catalog_cache
+
+
+def catalog_cache_control() -> str:
+    """
+    Cache-Control for catalog responses.
+
+    Browsers and the CDN edge reuse a response for CATALOG_HTTP_MAX_AGE
+    seconds, then may keep serving it for CATALOG_HTTP_STALE_WHILE_REVALIDATE
+    seconds while revalidating in the background (a 304 when unchanged).
+    """
+    max_age = int(os.getenv("CATALOG_HTTP_MAX_AGE", "300"))
+    stale = int(os.getenv("CATALOG_HTTP_STALE_WHILE_REVALIDATE", "86400"))
+    return f"public, max-age={max_age}, stale-while-revalidate={stale}"
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Whether an If-None-Match header matches `etag` (weak comparison, as RFC 9110 requires)"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == '*':
+        return True
+
+    tag = etag[2:] if etag.startswith('W/') else etag
+    for candidate in if_none_match.split(','):
+        candidate = candidate.strip()
+        if candidate.startswith('W/'):
+            candidate = candidate[2:]
+        if candidate == tag:
+            return True
+    return False
+
+
+async def catalog_conditional(request: Request, response: Response, snapshot: Optional[CatalogSnapshot] = None
+                              ) -> Tuple[CatalogSnapshot, Optional[Response]]:
+    """
+    Conditional GET for catalog endpoints.
+
+    Every catalog response is determined by the catalog snapshot, so they all
+    share the snapshot's ETag. Sets ETag and Cache-Control on `response`.
+
+    Args:
+        snapshot: The snapshot the body will be built from, when the handler
+            already has one (e.g. the one a search index or the decomposition
+            graph was built from); the current one otherwise
+
+    Returns:
+        The snapshot the ETag was taken from, which the handler should build
+        its body from (a reload may install a newer one meanwhile), and a 304
+        response when the client's copy is still current, in which case the
+        handler should return it without doing any work
+    """
+    snapshot = snapshot or await get_catalog_cache().get_snapshot()
+    headers = {'ETag': snapshot.etag, 'Cache-Control': catalog_cache_control()}
+
+    if etag_matches(request.headers.get('if-none-match'), snapshot.etag):
+        return snapshot, Response(status_code=304, headers=headers)
+
+    response.headers.update(headers)
+    return snapshot, None
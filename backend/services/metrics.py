@@ -0,0 +1,290 @@
+import asyncio
+import functools
+import logging
+import os
+import threading
+import time
+from collections import Counter
+from contextvars import ContextVar
+from typing import Callable, Dict, List, Optional, Tuple
+
+from fastapi.routing import APIRoute
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds (seconds) of the request latency histogram
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Query shapes kept per request for the slow-request log
+MAX_QUERY_SHAPES = 50
+
+
+class RequestMetrics:
+    """
+    Store and validation costs accumulated while serving one request.
+
+    Store calls run on worker threads (see repository.run_blocking), possibly
+    several at once for one request, so updates are guarded by a lock.
+    """
+
+    def __init__(self):
+        self.reads = 0
+        self.writes = 0
+        self.round_trips = 0
+        self.store_seconds = 0.0
+        self.validation_seconds = 0.0
+        self.endpoint_seconds = 0.0
+        self.query_shapes: List[str] = []
+        self._lock = threading.Lock()
+
+    def record_store_op(self, shape: str, reads: int = 0, writes: int = 0, seconds: float = 0.0):
+        with self._lock:
+            self.reads += reads
+            self.writes += writes
+            self.round_trips += 1
+            self.store_seconds += seconds
+            if len(self.query_shapes) < MAX_QUERY_SHAPES:
+                self.query_shapes.append(shape)
+
+    def add_validation(self, seconds: float):
+        with self._lock:
+            self.validation_seconds += seconds
+
+    def add_endpoint(self, seconds: float):
+        with self._lock:
+            self.endpoint_seconds += seconds
+
+
+_current: ContextVar[Optional[RequestMetrics]] = ContextVar('request_metrics', default=None)
+
+
+def current_request_metrics() -> Optional[RequestMetrics]:
+    """Metrics of the request being served, or None outside a request"""
+    return _current.get()
+
+
+def record_store_op(shape: str, reads: int = 0, writes: int = 0, seconds: float = 0.0):
+    """Attribute one store round-trip to the current request (no-op outside a request)"""
+    metrics = _current.get()
+    if metrics is not None:
+        metrics.record_store_op(shape, reads, writes, seconds)
+
+
+class _RouteTotals:
+    def __init__(self):
+        self.requests: Counter = Counter()
+        self.buckets = [0] * len(LATENCY_BUCKETS)
+        self.duration_sum = 0.0
+        self.count = 0
+        self.reads = 0
+        self.writes = 0
+        self.round_trips = 0
+        self.store_seconds = 0.0
+        self.validation_seconds = 0.0
+
+
+class MetricsRegistry:
+    """Per-route totals, rendered in the Prometheus text exposition format"""
+
+    def __init__(self):
+        self._routes: Dict[Tuple[str, str], _RouteTotals] = {}
+        self._collectors: List[Callable[[], List[str]]] = []
+        self._lock = threading.Lock()
+
+    def add_collector(self, collector: Callable[[], List[str]]):
+        """Register a callable returning extra exposition lines (e.g. a component's own counters)"""
+        self._collectors.append(collector)
+
+    def observe(self, method: str, route: str, status: int, duration: float, metrics: RequestMetrics):
+        with self._lock:
+            totals = self._routes.setdefault((method, route), _RouteTotals())
+            totals.requests[status] += 1
+            totals.count += 1
+            totals.duration_sum += duration
+            for i, bound in enumerate(LATENCY_BUCKETS):
+                if duration <= bound:
+                    totals.buckets[i] += 1
+            totals.reads += metrics.reads
+            totals.writes += metrics.writes
+            totals.round_trips += metrics.round_trips
+            totals.store_seconds += metrics.store_seconds
+            totals.validation_seconds += metrics.validation_seconds
+
+    def render(self) -> str:
+        lines = []
+
+        def family(name, kind, help_text, samples):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            lines.extend(samples)
+
+        with self._lock:
+            routes = sorted(self._routes.items())
+            family('hanzy_http_requests_total', 'counter', 'Requests served', [
+                f'hanzy_http_requests_total{{{_labels(method, route)},status="{status}"}} {n}'
+                for (method, route), t in routes for status, n in sorted(t.requests.items())
+            ])
+
+            samples = []
+            for (method, route), t in routes:
+                labels = _labels(method, route)
+                for bound, n in zip(LATENCY_BUCKETS, t.buckets):
+                    samples.append(f'hanzy_http_request_duration_seconds_bucket{{{labels},le="{bound}"}} {n}')
+                samples.append(f'hanzy_http_request_duration_seconds_bucket{{{labels},le="+Inf"}} {t.count}')
+                samples.append(f'hanzy_http_request_duration_seconds_sum{{{labels}}} {t.duration_sum:.6f}')
+                samples.append(f'hanzy_http_request_duration_seconds_count{{{labels}}} {t.count}')
+            family('hanzy_http_request_duration_seconds', 'histogram', 'Request latency', samples)
+
+            for name, attr, help_text in (
+                ('hanzy_store_document_reads_total', 'reads', 'Store documents read (billed reads)'),
+                ('hanzy_store_document_writes_total', 'writes', 'Store documents written'),
+                ('hanzy_store_round_trips_total', 'round_trips', 'Store round-trips'),
+                ('hanzy_store_seconds_total', 'store_seconds', 'Time spent waiting on the store'),
+                ('hanzy_validation_seconds_total', 'validation_seconds', 'Time spent in request/response validation'),
+            ):
+                family(name, 'counter', help_text, [
+                    f'{name}{{{_labels(method, route)}}} {_number(getattr(t, attr))}' for (method, route), t in routes
+                ])
+
+        for collector in self._collectors:
+            lines.extend(collector())
+
+        return "\n".join(lines) + "\n"
+
+
+def _labels(method: str, route: str) -> str:
+    return f'method="{method}",route="{route}"'
+
+
+def _number(value) -> str:
+    return f"{value:.6f}" if isinstance(value, float) else str(value)
+
+
+_registry = MetricsRegistry()
+
+
+def get_metrics_registry() -> MetricsRegistry:
+    return _registry
+
+
+def _slow_request_seconds() -> float:
+    return float(os.getenv("SLOW_REQUEST_MS", "500")) / 1000
+
+
+def server_timing(metrics: RequestMetrics, duration: float) -> str:
+    """Server-Timing header value splitting the request into store, validation and app time"""
+    app_seconds = max(duration - metrics.store_seconds - metrics.validation_seconds, 0.0)
+    return (f'store;dur={metrics.store_seconds * 1000:.1f};'
+            f'desc="{metrics.reads} reads, {metrics.writes} writes, {metrics.round_trips} round-trips", '
+            f'validation;dur={metrics.validation_seconds * 1000:.1f}, '
+            f'app;dur={app_seconds * 1000:.1f}, '
+            f'total;dur={duration * 1000:.1f}')
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware recording per-request store operations and timings.
+
+    Adds a Server-Timing header to every response, aggregates the numbers
+    per route for /metrics and logs requests slower than SLOW_REQUEST_MS
+    together with the store queries they ran.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self.slow_seconds = _slow_request_seconds()
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+
+        metrics = RequestMetrics()
+        token = _current.set(metrics)
+        start = time.perf_counter()
+        status = 500
+
+        async def send_with_timing(message):
+            nonlocal status
+            if message['type'] == 'http.response.start':
+                status = message['status']
+                timing = server_timing(metrics, time.perf_counter() - start)
+                message['headers'] = list(message.get('headers', [])) + [(b'server-timing', timing.encode())]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _current.reset(token)
+            duration = time.perf_counter() - start
+            route = scope.get('route')
+            route_path = route.path if route is not None else 'unmatched'
+            _registry.observe(scope['method'], route_path, status, duration, metrics)
+
+            if duration >= self.slow_seconds:
+                shapes = Counter(metrics.query_shapes)
+                logger.warning(
+                    "Slow request %s %s: %.0fms (store %.0fms, %d reads, %d writes, %d round-trips) queries: %s",
+                    scope['method'], route_path, duration * 1000, metrics.store_seconds * 1000,
+                    metrics.reads, metrics.writes, metrics.round_trips,
+                    "; ".join(f"{shape} x{n}" for shape, n in shapes.most_common())
+                )
+
+
+def _timed_endpoint(call: Callable) -> Callable:
+    """Wrap an endpoint function so that its running time is recorded on the current request"""
+    def record(start: float):
+        metrics = _current.get()
+        if metrics is not None:
+            metrics.add_endpoint(time.perf_counter() - start)
+
+    if asyncio.iscoroutinefunction(call):
+        @functools.wraps(call)
+        async def timed(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return await call(*args, **kwargs)
+            finally:
+                record(start)
+    else:
+        @functools.wraps(call)
+        def timed(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return call(*args, **kwargs)
+            finally:
+                record(start)
+
+    timed._endpoint_timed = True
+    return timed
+
+
+class TimedRoute(APIRoute):
+    """
+    Route class that times FastAPI's request parsing/validation and response
+    validation/serialization.
+
+    The route handler runs all of them around the endpoint function, so the
+    validation time is the handler's time minus the endpoint's own. Routers
+    opt in with APIRouter(route_class=TimedRoute).
+    """
+
+    def get_route_handler(self):
+        if not getattr(self.dependant.call, '_endpoint_timed', False):
+            self.dependant.call = _timed_endpoint(self.dependant.call)
+        handler = super().get_route_handler()
+
+        async def timed_handler(request):
+            metrics = _current.get()
+            if metrics is None:
+                return await handler(request)
+
+            endpoint_before = metrics.endpoint_seconds
+            start = time.perf_counter()
+            try:
+                return await handler(request)
+            finally:
+                endpoint = metrics.endpoint_seconds - endpoint_before
+                metrics.add_validation(max(time.perf_counter() - start - endpoint, 0.0))
+
+        return timed_handler
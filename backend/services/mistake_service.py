@@ -0,0 +1,157 @@
+import math
+import os
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional
+from models.schemas import QuizAttempt, MistakeLog, ItemType
+from services.progress_service import to_local_naive, to_stored_timestamp
+
+MISTAKES_COLLECTION = 'user_mistakes'
+
+# Forward-decay reference point. Each mistake made at t weighs
+# 2^((t - epoch) / half_life), so ordering by the summed weight equals
+# ordering by the decayed mistake count at any later time, without rewriting
+# old counters. The weights grow without bound (past float range within
+# decades), so counters store log2 of the sum (decay_log_score), which only
+# grows linearly with time, and sums are combined with log-sum-exp.
+DECAY_EPOCH = datetime(2024, 1, 1)
+
+
+def _half_life_days() -> float:
+    return float(os.getenv("MISTAKE_HALF_LIFE_DAYS", "14"))
+
+
+def decay_log_weight(at: datetime) -> float:
+    """log2 of the forward-decay weight of a mistake made at `at`"""
+    age_days = (to_local_naive(at) - DECAY_EPOCH).total_seconds() / 86400
+    return age_days / _half_life_days()
+
+
+def add_log_weights(a: Optional[float], b: float) -> float:
+    """log2(2^a + 2^b), computed without leaving float range (a None is an empty sum)"""
+    if a is None:
+        return b
+    high, low = (a, b) if a >= b else (b, a)
+    return high + math.log2(1 + 2 ** (low - high))
+
+
+def decayed_count(log_score: float, mistake_count: int, now: datetime) -> float:
+    """
+    The decayed mistake count at `now` of a counter.
+
+    Mistakes dated after `now` count as made now, so the result never exceeds
+    the lifetime count (and never overflows).
+    """
+    if mistake_count <= 0:
+        return 0.0
+    return 2 ** min(log_score - decay_log_weight(now), math.log2(mistake_count))
+
+
+def mistake_doc_id(user_id: str, item_id: str, question_type: str) -> str:
+    """Deterministic document id for a (user, item, question type) counter"""
+    return f"{user_id}_{item_id}_{question_type}"
+
+
+def merge_mistakes(attempts: Iterable[QuizAttempt]) -> Dict[str, dict]:
+    """
+    Counter increments for the incorrect (resolved) attempts of a batch, merged per counter.
+
+    Returns:
+        Counter document id -> {user_id, item_id, item_type, question_type,
+        timestamp (latest mistake), count, log_weight (log2 of the summed decay weight)}
+    """
+    increments: Dict[str, dict] = {}
+    for attempt in attempts:
+        if attempt.correct:
+            continue
+        doc_id = mistake_doc_id(attempt.user_id, attempt.item_id, attempt.question_type)
+        entry = increments.get(doc_id)
+        if entry is None:
+            entry = increments[doc_id] = {
+                'user_id': attempt.user_id,
+                'item_id': attempt.item_id,
+                'item_type': attempt.item_type.value,
+                'question_type': attempt.question_type,
+                'timestamp': to_local_naive(attempt.timestamp),
+                'count': 0,
+                'log_weight': None,
+            }
+        entry['timestamp'] = max(entry['timestamp'], to_local_naive(attempt.timestamp))
+        entry['count'] += 1
+        entry['log_weight'] = add_log_weights(entry['log_weight'], decay_log_weight(attempt.timestamp))
+    return increments
+
+
+def _stored_log_score(data: dict) -> Optional[float]:
+    """A counter's log-score, also for counters stored with a linear decay_score"""
+    if data.get('decay_log_score') is not None:
+        return data['decay_log_score']
+    if data.get('decay_score'):
+        return math.log2(data['decay_score'])
+    return None
+
+
+def set_mistakes(db, transaction, increments: Dict[str, dict]):
+    """
+    Apply merged counter increments in a transaction (one get_all for every counter, one write each).
+
+    Log-scores cannot be combined by a server-side increment, so the counters
+    are read first. Counters stored before log-scores (with a linear
+    decay_score) are converted as they are updated.
+    """
+    if not increments:
+        return
+    mistakes_ref = db.collection(MISTAKES_COLLECTION)
+    refs = [mistakes_ref.document(doc_id) for doc_id in increments]
+    stored = {snapshot.id: snapshot.to_dict() for snapshot in db.get_all(refs, transaction=transaction)
+              if snapshot.exists}
+
+    for ref, (doc_id, entry) in zip(refs, increments.items()):
+        current = stored.get(doc_id, {})
+        log_score = _stored_log_score(current)
+        timestamp = entry['timestamp']
+        if current.get('timestamp') is not None:
+            timestamp = max(timestamp, to_local_naive(current['timestamp']))
+        transaction.set(ref, {
+            'user_id': entry['user_id'],
+            'item_id': entry['item_id'],
+            'item_type': entry['item_type'],
+            'question_type': entry['question_type'],
+            'timestamp': to_stored_timestamp(timestamp),
+            'mistake_count': current.get('mistake_count', 0) + entry['count'],
+            'decay_log_score': add_log_weights(log_score, entry['log_weight']),
+        })
+
+
+def top_mistakes(db, user_id: str, limit: int = 20, decay: bool = False,
+                 now: Optional[datetime] = None) -> List[MistakeLog]:
+    """
+    Items the user gets wrong most often (a single top-K query).
+
+    Args:
+        limit: Number of counters to return
+        decay: Rank by exponentially time-decayed count (MISTAKE_HALF_LIFE_DAYS)
+            instead of the lifetime count
+    """
+    order_field = 'decay_log_score' if decay else 'mistake_count'
+    docs = (db.collection(MISTAKES_COLLECTION)
+            .where('user_id', '==', user_id)
+            .order_by(order_field, direction='DESCENDING')
+            .limit(limit)
+            .stream())
+
+    now = now or datetime.now()
+    mistakes = []
+    for doc in docs:
+        # Written by set_mistakes, so only the enum and timestamp need restoring
+        data = doc.to_dict()
+        log_score = _stored_log_score(data)
+        mistakes.append(MistakeLog.model_construct(
+            user_id=data['user_id'],
+            item_id=data['item_id'],
+            item_type=ItemType(data['item_type']),
+            timestamp=to_local_naive(data['timestamp']),
+            mistake_count=data['mistake_count'],
+            question_type=data.get('question_type'),
+            decayed_count=decayed_count(log_score, data['mistake_count'], now) if log_score is not None else 0.0,
+        ))
+    return mistakes
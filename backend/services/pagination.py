@@ -0,0 +1,68 @@
+import base64
+import json
+from datetime import datetime
+from typing import Dict, Optional, Tuple, Union
+from fastapi import HTTPException
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def encode_cursor(position: dict) -> str:
+    """Encode a query position as an opaque, URL-safe cursor token"""
+    raw = json.dumps(position, separators=(',', ':'), sort_keys=True).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def _invalid_cursor() -> HTTPException:
+    return HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def _is_iso_timestamp(value) -> bool:
+    try:
+        datetime.fromisoformat(value)
+        return True
+    except (TypeError, ValueError):
+        return False
+
+
+def decode_cursor(token: str, fields: Optional[Dict[str, Union[type, Tuple[type, ...]]]] = None) -> dict:
+    """
+    Decode a cursor token produced by encode_cursor.
+
+    Args:
+        token: The cursor
+        fields: Keys the position must have, with their types (str, int, or
+            datetime for an ISO 8601 string, which is left as a string)
+
+    Raises:
+        HTTPException(400) for a malformed, truncated or tampered cursor
+    """
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        position = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+    except (ValueError, UnicodeError):
+        raise _invalid_cursor()
+
+    if not isinstance(position, dict):
+        raise _invalid_cursor()
+    for key, expected in (fields or {}).items():
+        value = position.get(key)
+        if expected is datetime:
+            valid = isinstance(value, str) and _is_iso_timestamp(value)
+        else:
+            # bool is an int, but never a valid position
+            valid = isinstance(value, expected) and not isinstance(value, bool)
+        if not valid:
+            raise _invalid_cursor()
+    return position
+
+
+def frequency_cursor(item: dict) -> str:
+    """Cursor positioned after a catalog item in (frequency desc, id) order"""
+    return encode_cursor({'frequency': item.get('frequency', 0), 'id': item['id']})
+
+
+def decode_frequency_cursor(token: str) -> Tuple[int, str]:
+    """Decode a frequency_cursor token into (frequency, id)"""
+    position = decode_cursor(token, {'frequency': (int, float), 'id': str})
+    return position['frequency'], position['id']
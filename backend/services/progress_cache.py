@@ -0,0 +1,258 @@
+import bisect
+import copy
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from models.schemas import UserProgress
+from services.metrics import get_metrics_registry
+from services.pagination import encode_cursor, decode_cursor
+from services.progress_service import progress_doc_id, to_local_naive, to_stored_timestamp
+
+# Rough fixed cost of a working set, and of one item on top of its field values
+_ENTRY_OVERHEAD = 512
+_ITEM_OVERHEAD = 400
+
+
+def _progress_bytes(doc_id: str, progress: UserProgress) -> int:
+    # Enum members and small ints are shared, so only the per-item objects count
+    return (_ITEM_OVERHEAD + sys.getsizeof(doc_id) + sys.getsizeof(progress.__dict__)
+            + sys.getsizeof(progress.item_id) + 2 * sys.getsizeof(progress.next_review))
+
+
+class _WorkingSet:
+    """
+    One user's progress keyed by document id, a (next_review, document id)
+    index kept sorted for the due query, and the stats aggregate once read.
+
+    Progress objects are shared between requests and must not be mutated;
+    updates replace them.
+    """
+
+    def __init__(self, user_id: str, items: Dict[str, UserProgress]):
+        self.user_id = user_id
+        self.items = items
+        self.due_index: List[Tuple[datetime, str]] = sorted(
+            (progress.next_review, doc_id) for doc_id, progress in items.items()
+        )
+        self.nbytes = _ENTRY_OVERHEAD + sum(_progress_bytes(doc_id, p) for doc_id, p in items.items())
+        self.stats: Optional[dict] = None
+        self.loaded_at = time.monotonic()
+
+    def put(self, doc_id: str, progress: UserProgress) -> int:
+        """Replace one item, returning the change in estimated size"""
+        delta = _progress_bytes(doc_id, progress)
+        previous = self.items.get(doc_id)
+        if previous is not None:
+            key = (previous.next_review, doc_id)
+            position = bisect.bisect_left(self.due_index, key)
+            if position < len(self.due_index) and self.due_index[position] == key:
+                del self.due_index[position]
+            delta -= _progress_bytes(doc_id, previous)
+        self.items[doc_id] = progress
+        bisect.insort(self.due_index, (progress.next_review, doc_id))
+        self.nbytes += delta
+        return delta
+
+
+class CachingRepository:
+    """
+    Repository wrapper with a per-user progress working-set cache.
+
+    The first progress read for a user loads all of their progress once;
+    listing progress, learned items (quiz generation, unlockable,
+    recommendations) and due items are then served from memory, and the
+    stats aggregate is kept next to it after its first read. Reviews go to
+    the store first and are then written through to the cached items (the
+    stats aggregate is dropped and re-read). Working sets are evicted least recently used once their
+    estimated size exceeds PROGRESS_CACHE_MAX_MB, and reloaded after
+    PROGRESS_CACHE_TTL_SECONDS so changes made through other API instances
+    show up.
+
+    Every other repository method is passed through unchanged.
+    """
+
+    def __init__(self, repository, max_bytes: int, ttl: float):
+        self.repository = repository
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, _WorkingSet]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.RLock()
+        self._load_locks: Dict[str, threading.Lock] = {}
+        # Bumped on every write, so a load that raced with a write is not cached
+        self._generations: Dict[str, int] = {}
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __getattr__(self, name):
+        return getattr(self.repository, name)
+
+    # Cache management
+
+    def _working_set(self, user_id: str) -> _WorkingSet:
+        with self._lock:
+            entry = self._fresh_entry(user_id)
+            if entry is not None:
+                self.hits += 1
+                return entry
+            load_lock = self._load_locks.setdefault(user_id, threading.Lock())
+
+        # One load per user at a time; concurrent readers wait for it and share it
+        with load_lock:
+            with self._lock:
+                entry = self._fresh_entry(user_id)
+                if entry is not None:
+                    self.hits += 1
+                    return entry
+                self.misses += 1
+                generation = self._generations.get(user_id, 0)
+
+            items = {
+                progress_doc_id(user_id, progress.item_type, progress.item_id): progress
+                for progress in self.repository.list_progress(user_id)
+            }
+            entry = _WorkingSet(user_id, items)
+
+            with self._lock:
+                self._load_locks.pop(user_id, None)
+                if self._generations.get(user_id, 0) == generation:
+                    self._insert(entry)
+        return entry
+
+    def _fresh_entry(self, user_id: str) -> Optional[_WorkingSet]:
+        entry = self._entries.get(user_id)
+        if entry is None:
+            return None
+        if time.monotonic() - entry.loaded_at > self.ttl:
+            self._remove(user_id)
+            return None
+        self._entries.move_to_end(user_id)
+        return entry
+
+    def _insert(self, entry: _WorkingSet):
+        self._remove(entry.user_id)
+        if entry.nbytes > self.max_bytes:
+            return
+        self._entries[entry.user_id] = entry
+        self._bytes += entry.nbytes
+        while self._bytes > self.max_bytes:
+            self._remove(next(iter(self._entries)))
+            self.evictions += 1
+
+    def _remove(self, user_id: str):
+        entry = self._entries.pop(user_id, None)
+        if entry is not None:
+            self._bytes -= entry.nbytes
+
+    def _write_through(self, user_id: str, updated: List[UserProgress]):
+        with self._lock:
+            self._generations[user_id] = self._generations.get(user_id, 0) + 1
+            entry = self._entries.get(user_id)
+            if entry is None:
+                return
+            for progress in updated:
+                self._bytes += entry.put(progress_doc_id(user_id, progress.item_type, progress.item_id), progress)
+            entry.stats = None
+
+    def invalidate(self, user_id: str):
+        """Drop a user's working set (e.g. after an out-of-band change)"""
+        with self._lock:
+            self._generations[user_id] = self._generations.get(user_id, 0) + 1
+            self._remove(user_id)
+
+    # Reads
+
+    def list_progress(self, user_id):
+        return list(self._working_set(user_id).items.values())
+
+    def list_learned_items(self, user_id):
+        entry = self._working_set(user_id)
+        return [{'item_id': p.item_id, 'item_type': p.item_type.value} for p in list(entry.items.values())]
+
+    def get_due_progress(self, user_id, limit=50, cursor=None, now=None):
+        entry = self._working_set(user_id)
+        now = to_local_naive(now or datetime.now())
+
+        start = 0
+        with self._lock:
+            if cursor:
+                position = decode_cursor(cursor, {'next_review': datetime, 'id': str})
+                after = (to_local_naive(datetime.fromisoformat(position['next_review'])), position['id'])
+                start = bisect.bisect_right(entry.due_index, after)
+            # Same order as the store queries: next_review, then document id
+            page = [key for key in entry.due_index[start:start + limit] if key[0] <= now]
+            due_items = [entry.items[doc_id] for _, doc_id in page]
+
+        next_cursor = None
+        if len(page) == limit:
+            next_review, doc_id = page[-1]
+            next_cursor = encode_cursor({'next_review': to_stored_timestamp(next_review).isoformat(), 'id': doc_id})
+        return due_items, next_cursor
+
+    def get_progress_stats(self, user_id):
+        with self._lock:
+            entry = self._fresh_entry(user_id)
+            stats = entry.stats if entry is not None else None
+            generation = self._generations.get(user_id, 0)
+        if stats is None:
+            stats = self.repository.get_progress_stats(user_id)
+            with self._lock:
+                if entry is not None and self._generations.get(user_id, 0) == generation:
+                    entry.stats = stats
+        return copy.deepcopy(stats)
+
+    # Writes (store first, then the cached items)
+
+    def record_review(self, user_id, item_id, item_type, correct):
+        updated = self.repository.record_review(user_id, item_id, item_type, correct)
+        self._write_through(user_id, [updated])
+        return updated
+
+    def record_reviews(self, user_id, events):
+        updated = self.repository.record_reviews(user_id, events)
+        self._write_through(user_id, updated)
+        return updated
+
+    def reconcile_stats(self, user_id):
+        result = self.repository.reconcile_stats(user_id)
+        self.invalidate(user_id)
+        return result
+
+    def render_metrics(self) -> List[str]:
+        """Prometheus samples for the cache"""
+        with self._lock:
+            samples = [
+                ('hanzy_progress_cache_hits_total', 'counter', 'Progress reads served from a cached working set', self.hits),
+                ('hanzy_progress_cache_misses_total', 'counter', 'Progress working sets loaded from the store', self.misses),
+                ('hanzy_progress_cache_evictions_total', 'counter', 'Working sets evicted to stay under the memory cap', self.evictions),
+                ('hanzy_progress_cache_entries', 'gauge', 'Users with a cached working set', len(self._entries)),
+                ('hanzy_progress_cache_bytes', 'gauge', 'Estimated size of the cached working sets', self._bytes),
+            ]
+        lines = []
+        for name, kind, help_text, value in samples:
+            lines += [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}", f"{name} {value}"]
+        return lines
+
+
+def progress_cache_settings() -> Tuple[int, float]:
+    """(memory cap in bytes, TTL in seconds); a cap of 0 disables the cache"""
+    max_mb = float(os.getenv("PROGRESS_CACHE_MAX_MB", "64"))
+    ttl = float(os.getenv("PROGRESS_CACHE_TTL_SECONDS", "60"))
+    return int(max_mb * 1024 * 1024), ttl
+
+
+def with_progress_cache(repository):
+    """Wrap a repository with the progress working-set cache, unless it is disabled"""
+    max_bytes, ttl = progress_cache_settings()
+    if max_bytes <= 0:
+        return repository
+    cached = CachingRepository(repository, max_bytes, ttl)
+    get_metrics_registry().add_collector(cached.render_metrics)
+    return cached
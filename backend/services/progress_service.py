@@ -0,0 +1,282 @@
+from datetime import datetime
+from typing import Dict, List, Optional, Set, Tuple
+from models.schemas import UserProgress, MasteryLevel, ItemType, ReviewEvent
+from services.spaced_repetition import SpacedRepetitionService
+from services.pagination import encode_cursor, decode_cursor
+from services import stats_service
+
+PROGRESS_COLLECTION = 'user_progress'
+
+# Firestore limits a write batch to 500 operations
+WRITE_BATCH_SIZE = 500
+
+
+def progress_doc_id(user_id: str, item_type, item_id: str) -> str:
+    """Deterministic document id for a user's progress on one item"""
+    return f"{user_id}_{ItemType(item_type).value}_{item_id}"
+
+
+def to_local_naive(value: datetime) -> datetime:
+    """Normalize a timestamp to the naive local time used throughout the API"""
+    if value.tzinfo is not None:
+        return value.astimezone().replace(tzinfo=None)
+    return value
+
+
+def to_stored_timestamp(value: datetime) -> datetime:
+    """Attach the local timezone so Firestore stores the correct instant"""
+    return value.astimezone() if value.tzinfo is None else value
+
+
+def to_sortable_text(value: datetime) -> str:
+    """Fixed-width local ISO timestamp, so text order equals time order"""
+    return to_local_naive(value).isoformat(timespec='microseconds')
+
+
+def progress_from_doc(data: dict) -> UserProgress:
+    """Build a UserProgress from a stored document (native timestamps or legacy ISO strings)"""
+    for field in ('last_reviewed', 'next_review'):
+        value = data.get(field)
+        if isinstance(value, str):
+            data[field] = datetime.fromisoformat(value)
+        elif isinstance(value, datetime):
+            data[field] = to_local_naive(value)
+    # Written by progress_to_doc, so only the enums and defaults need restoring
+    return UserProgress.model_construct(
+        user_id=data['user_id'],
+        item_id=data['item_id'],
+        item_type=ItemType(data['item_type']),
+        mastery_level=MasteryLevel(data.get('mastery_level', MasteryLevel.NEW)),
+        last_reviewed=data['last_reviewed'],
+        next_review=data['next_review'],
+        correct_count=int(data.get('correct_count', 0)),
+        incorrect_count=int(data.get('incorrect_count', 0)),
+        ease_factor=float(data.get('ease_factor', 2.5)),
+        interval=int(data.get('interval', 0)),
+    )
+
+
+def progress_to_doc(progress: UserProgress) -> dict:
+    """Convert a UserProgress into its stored document form"""
+    progress_dict = progress.dict()
+    progress_dict['last_reviewed'] = to_stored_timestamp(progress.last_reviewed)
+    progress_dict['next_review'] = to_stored_timestamp(progress.next_review)
+    progress_dict['mastery_level'] = progress.mastery_level.value
+    progress_dict['item_type'] = progress.item_type.value
+    return progress_dict
+
+
+def stats_from_doc(data: dict) -> dict:
+    """Build a stats aggregate from its stored document"""
+    if isinstance(data.get('last_active'), datetime):
+        data['last_active'] = to_local_naive(data['last_active'])
+    return data
+
+
+def stats_to_doc(stats: dict) -> dict:
+    """Convert a stats aggregate into its stored document form"""
+    stats_dict = dict(stats)
+    if stats_dict.get('last_active') is not None:
+        stats_dict['last_active'] = to_stored_timestamp(stats_dict['last_active'])
+    return stats_dict
+
+
+def new_progress(user_id: str, item_id: str, item_type: ItemType) -> UserProgress:
+    """Fresh progress for an item the user has never reviewed"""
+    return UserProgress(
+        user_id=user_id,
+        item_id=item_id,
+        item_type=item_type,
+        mastery_level=MasteryLevel.NEW,
+        last_reviewed=datetime.now(),
+        next_review=datetime.now(),
+        correct_count=0,
+        incorrect_count=0,
+        ease_factor=2.5,
+        interval=0
+    )
+
+
+def record_review(db, user_id: str, item_id: str, item_type: ItemType, correct: bool) -> UserProgress:
+    """
+    Apply one review to the user's progress in a single transaction.
+
+    The progress document lives at a deterministic id, so concurrent reviews
+    of the same item serialize on that document instead of racing to create
+    duplicate rows. The user's stats aggregate is updated in the same
+    transaction; if it does not exist yet it is built on the next stats read.
+
+    Returns:
+        The updated UserProgress
+    """
+    from firebase_admin import firestore
+    ref = db.collection(PROGRESS_COLLECTION).document(progress_doc_id(user_id, item_type, item_id))
+    stats_ref = db.collection(stats_service.STATS_COLLECTION).document(user_id)
+
+    @firestore.transactional
+    def apply(transaction):
+        snapshot, stats_snapshot = ref.get(transaction=transaction), stats_ref.get(transaction=transaction)
+        if snapshot.exists:
+            progress = progress_from_doc(snapshot.to_dict())
+            before = progress.copy()
+        else:
+            progress = new_progress(user_id, item_id, item_type)
+            before = None
+
+        updated = SpacedRepetitionService.calculate_next_review(progress, correct)
+        transaction.set(ref, progress_to_doc(updated))
+
+        if stats_snapshot.exists:
+            stats = stats_service.apply_review(stats_from_doc(stats_snapshot.to_dict()), before, updated)
+            transaction.set(stats_ref, stats_to_doc(stats))
+        return updated
+
+    return apply(db.transaction())
+
+
+def record_reviews(db, user_id: str, events: List[ReviewEvent]) -> List[UserProgress]:
+    """
+    Apply an ordered batch of reviews for one user.
+
+    The events are split, in order, into chunks touching at most
+    WRITE_BATCH_SIZE - 1 progress documents. Each chunk is one transaction:
+    its progress documents and the stats aggregate are fetched with a single
+    get_all, the reviews are replayed in order using each event's own
+    timestamp, and the results are written back. Concurrent reviews of the
+    same items (record_review, other batches) therefore serialize with it
+    instead of being overwritten, and the stats aggregate stays exact.
+
+    Returns:
+        The updated UserProgress for every item in the batch
+    """
+    from firebase_admin import firestore
+    progress_ref = db.collection(PROGRESS_COLLECTION)
+    stats_ref = db.collection(stats_service.STATS_COLLECTION).document(user_id)
+
+    chunks: List[List[ReviewEvent]] = []
+    chunk_docs: Set[str] = set()
+    for event in events:
+        doc_id = progress_doc_id(user_id, event.item_type, event.item_id)
+        if not chunks or (doc_id not in chunk_docs and len(chunk_docs) >= WRITE_BATCH_SIZE - 1):
+            chunks.append([])
+            chunk_docs = set()
+        chunks[-1].append(event)
+        chunk_docs.add(doc_id)
+
+    @firestore.transactional
+    def apply(transaction, chunk: List[ReviewEvent]) -> Dict[str, UserProgress]:
+        refs = {}
+        for event in chunk:
+            doc_id = progress_doc_id(user_id, event.item_type, event.item_id)
+            refs.setdefault(doc_id, progress_ref.document(doc_id))
+
+        current: Dict[str, UserProgress] = {}
+        stats = None
+        for snapshot in db.get_all(list(refs.values()) + [stats_ref], transaction=transaction):
+            if not snapshot.exists:
+                continue
+            if snapshot.reference.path == stats_ref.path:
+                stats = stats_from_doc(snapshot.to_dict())
+            else:
+                current[snapshot.id] = progress_from_doc(snapshot.to_dict())
+
+        for event in chunk:
+            doc_id = progress_doc_id(user_id, event.item_type, event.item_id)
+            progress = current.get(doc_id)
+            before = progress.copy() if progress else None
+            progress = progress or new_progress(user_id, event.item_id, event.item_type)
+            current[doc_id] = SpacedRepetitionService.calculate_next_review(
+                progress, event.correct, to_local_naive(event.answered_at)
+            )
+            if stats is not None:
+                stats_service.apply_review(stats, before, current[doc_id])
+
+        for doc_id, ref in refs.items():
+            transaction.set(ref, progress_to_doc(current[doc_id]))
+        if stats is not None:
+            transaction.set(stats_ref, stats_to_doc(stats))
+        return current
+
+    updated: Dict[str, UserProgress] = {}
+    for chunk in chunks:
+        updated.update(apply(db.transaction(), chunk))
+    return list(updated.values())
+
+
+def get_due_progress(db, user_id: str, limit: int = 50, cursor: Optional[str] = None,
+                     now: Optional[datetime] = None) -> Tuple[List[UserProgress], Optional[str]]:
+    """
+    Page through the user's items that are due for review, oldest first.
+
+    The due filter and ordering run in Firestore against the composite
+    (user_id, next_review) index, so the cost scales with the page size
+    rather than with the user's lifetime item count.
+
+    Returns:
+        (due items, cursor for the next page or None)
+    """
+    from google.cloud.firestore_v1.field_path import FieldPath
+    progress_ref = db.collection(PROGRESS_COLLECTION)
+    query = (progress_ref
+             .where('user_id', '==', user_id)
+             .where('next_review', '<=', to_stored_timestamp(now or datetime.now()))
+             .order_by('next_review')
+             .order_by(FieldPath.document_id())
+             .limit(limit))
+
+    if cursor:
+        position = decode_cursor(cursor, {'next_review': datetime, 'id': str})
+        query = query.start_after({
+            'next_review': datetime.fromisoformat(position['next_review']),
+            FieldPath.document_id(): progress_ref.document(position['id'])
+        })
+
+    docs = list(query.stream())
+    due_items = [progress_from_doc(doc.to_dict()) for doc in docs]
+
+    next_cursor = None
+    if len(docs) == limit:
+        last = docs[-1]
+        next_cursor = encode_cursor({
+            'next_review': to_stored_timestamp(due_items[-1].next_review).isoformat(),
+            'id': last.id
+        })
+
+    return due_items, next_cursor
+
+
+def get_progress_stats(db, user_id: str) -> dict:
+    """
+    Read the user's stats aggregate (a single document read).
+
+    Users without an aggregate yet get one built from a full scan.
+    """
+    snapshot = db.collection(stats_service.STATS_COLLECTION).document(user_id).get()
+    if snapshot.exists:
+        return stats_from_doc(snapshot.to_dict())
+    return reconcile_stats(db, user_id)[0]
+
+
+def reconcile_stats(db, user_id: str) -> Tuple[dict, bool]:
+    """
+    Rebuild the user's stats aggregate from a full scan of their progress
+    and store it if it drifted from the stored aggregate.
+
+    Returns:
+        (rebuilt aggregate, whether the stored aggregate had drifted)
+    """
+    stats_ref = db.collection(stats_service.STATS_COLLECTION).document(user_id)
+    snapshot = stats_ref.get()
+    stored = stats_from_doc(snapshot.to_dict()) if snapshot.exists else None
+
+    docs = db.collection(PROGRESS_COLLECTION).where('user_id', '==', user_id).stream()
+    rebuilt = stats_service.rebuild_stats(
+        user_id,
+        (progress_from_doc(doc.to_dict()) for doc in docs),
+        stored['review_days'] if stored else ()
+    )
+
+    drifted = stored is None or stats_service.has_drifted(stored, rebuilt)
+    if drifted:
+        stats_ref.set(stats_to_doc(rebuilt))
+    return rebuilt, drifted
@@ -0,0 +1,289 @@
+import asyncio
+import logging
+import os
+import threading
+import uuid
+from collections import OrderedDict
+from typing import List, Optional, Tuple
+
+from fastapi import HTTPException
+
+from models.schemas import QuizAttempt
+from services.metrics import get_metrics_registry
+from services.repository import Repository, get_repository, run_blocking
+
+logger = logging.getLogger(__name__)
+
+
+class QuizAttemptBuffer:
+    """
+    Write-behind buffer that group-commits quiz attempts.
+
+    `submit` only enqueues the attempt; a background task writes queued
+    attempts in batches once QUIZ_BUFFER_BATCH_SIZE are waiting or the
+    oldest has waited QUIZ_BUFFER_FLUSH_MS, so one batch commit carries
+    attempts from many users. Writes are serialized, so attempts pile up
+    into the next batch while one is in flight.
+
+    The queue is bounded (QUIZ_BUFFER_MAX_PENDING). When it is full,
+    submits wait up to QUIZ_BUFFER_SUBMIT_TIMEOUT_MS for room and are then
+    rejected with 503, so a stalled store pushes back on clients instead of
+    growing memory. Batches that fail on a store error are retried with
+    backoff (QUIZ_BUFFER_MAX_RETRIES times); an attempt the store rejects is
+    isolated and dropped (logged) so it cannot hold up everyone else's.
+
+    Every attempt has an idempotency key (the client's Idempotency-Key
+    header, or a generated one). The last QUIZ_BUFFER_RECENT_KEYS keys are
+    remembered, so a client retry of an acknowledged submit is absorbed;
+    the key is also the stored attempt's id.
+
+    Before it is started (e.g. in scripts, or without lifespan events),
+    submits are written through synchronously.
+    """
+
+    def __init__(self, repository: Repository):
+        self.repository = repository
+        self.max_pending = int(os.getenv("QUIZ_BUFFER_MAX_PENDING", "10000"))
+        self.batch_size = int(os.getenv("QUIZ_BUFFER_BATCH_SIZE", "250"))
+        self.flush_interval = int(os.getenv("QUIZ_BUFFER_FLUSH_MS", "50")) / 1000
+        self.submit_timeout = int(os.getenv("QUIZ_BUFFER_SUBMIT_TIMEOUT_MS", "1000")) / 1000
+        self.recent_key_capacity = int(os.getenv("QUIZ_BUFFER_RECENT_KEYS", "100000"))
+        self.max_retries = int(os.getenv("QUIZ_BUFFER_MAX_RETRIES", "8"))
+
+        self._queue: Optional[asyncio.Queue] = None
+        self._batch_ready: Optional[asyncio.Event] = None
+        self._write_lock: Optional[asyncio.Lock] = None
+        self._settled_changed: Optional[asyncio.Condition] = None
+        # Attempts queued so far, and how many of them have been written (or given up on)
+        self._queued = 0
+        self._settled = 0
+        self._task: Optional[asyncio.Task] = None
+        self._stopping = False
+
+        self._recent_keys: "OrderedDict[Tuple[str, str], None]" = OrderedDict()
+        self._pending_users = {}
+
+        # Counters for /metrics (read from other threads)
+        self._stats_lock = threading.Lock()
+        self.accepted = 0
+        self.duplicates = 0
+        self.rejected = 0
+        self.written = 0
+        self.batches = 0
+        self.failed_batches = 0
+        self.dropped = 0
+
+    @property
+    def started(self) -> bool:
+        return self._task is not None
+
+    @property
+    def pending(self) -> int:
+        return self._queue.qsize() if self._queue is not None else 0
+
+    def start(self):
+        """Start the background writer on the running event loop"""
+        if self._task is not None:
+            return
+        self._queue = asyncio.Queue(maxsize=self.max_pending)
+        self._batch_ready = asyncio.Event()
+        self._write_lock = asyncio.Lock()
+        self._settled_changed = asyncio.Condition()
+        self._stopping = False
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        """Stop the background writer after writing everything still queued"""
+        if self._task is None:
+            return
+        self._stopping = True
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        await self.flush()
+        self._task = None
+
+    async def submit(self, attempt: QuizAttempt, key: Optional[str] = None) -> bool:
+        """
+        Accept an attempt for writing.
+
+        Args:
+            attempt: The resolved attempt
+            key: Idempotency key (a fresh one is generated when missing)
+
+        Returns:
+            False if the key was already accepted (a client retry), True otherwise
+
+        Raises:
+            HTTPException(503) when the buffer stays full for the submit timeout
+        """
+        key = key or uuid.uuid4().hex
+        recent = (attempt.user_id, key)
+        if recent in self._recent_keys:
+            self._recent_keys.move_to_end(recent)
+            self._count('duplicates')
+            return False
+
+        # Remembered before awaiting, so a concurrent retry of the same submit is absorbed too
+        self._recent_keys[recent] = None
+        if len(self._recent_keys) > self.recent_key_capacity:
+            self._recent_keys.popitem(last=False)
+
+        try:
+            if self._task is None:
+                await run_blocking(self.repository.add_quiz_attempts, [(key, attempt)])
+            else:
+                try:
+                    self._queue.put_nowait((key, attempt))
+                except asyncio.QueueFull:
+                    await asyncio.wait_for(self._queue.put((key, attempt)), self.submit_timeout)
+        except asyncio.TimeoutError:
+            self._recent_keys.pop(recent, None)
+            self._count('rejected')
+            raise HTTPException(status_code=503, detail="Too many pending quiz submissions, retry shortly",
+                                headers={"Retry-After": "1"})
+        except BaseException:
+            self._recent_keys.pop(recent, None)
+            raise
+
+        if self._task is not None:
+            self._queued += 1
+            self._pending_users[attempt.user_id] = self._pending_users.get(attempt.user_id, 0) + 1
+            if self._queue.qsize() >= self.batch_size:
+                self._batch_ready.set()
+        self._count('accepted')
+        return True
+
+    async def flush(self):
+        """Write everything accepted so far (including a batch already being written)"""
+        if self._queue is None:
+            return
+        target = self._queued
+        # Wake the background task if it is holding a partial batch
+        self._batch_ready.set()
+        while self._queue.qsize():
+            await self._write(self._take(self.batch_size))
+        async with self._settled_changed:
+            await self._settled_changed.wait_for(lambda: self._settled >= target)
+
+    async def flush_user(self, user_id: str):
+        """Flush if the user has attempts waiting, so reads see their own submits"""
+        if self._pending_users.get(user_id):
+            await self.flush()
+
+    def _take(self, limit: int) -> List[Tuple[str, QuizAttempt]]:
+        batch = []
+        while len(batch) < limit and self._queue.qsize():
+            batch.append(self._queue.get_nowait())
+        return batch
+
+    async def _run(self):
+        while True:
+            self._batch_ready.clear()
+            batch = [await self._queue.get()]
+            try:
+                if self._queue.qsize() + 1 < self.batch_size:
+                    await asyncio.wait_for(self._batch_ready.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            finally:
+                batch += self._take(self.batch_size - 1)
+                # Shielded, so stopping the task never abandons a batch it has taken
+                await asyncio.shield(self._write(batch))
+
+    async def _write(self, batch: List[Tuple[str, QuizAttempt]]):
+        if not batch:
+            return
+        async with self._write_lock:
+            await self._commit(batch)
+
+            for _, attempt in batch:
+                remaining = self._pending_users.get(attempt.user_id, 0) - 1
+                if remaining > 0:
+                    self._pending_users[attempt.user_id] = remaining
+                else:
+                    self._pending_users.pop(attempt.user_id, None)
+
+        async with self._settled_changed:
+            self._settled += len(batch)
+            self._settled_changed.notify_all()
+
+    async def _commit(self, batch: List[Tuple[str, QuizAttempt]]):
+        """
+        Write a batch, retrying store errors and isolating attempts that cannot be written.
+
+        Transient errors (the store is unavailable, timed out or contended) are
+        retried with backoff, at most QUIZ_BUFFER_MAX_RETRIES times. Any other
+        error is caused by the data, so the batch is split in halves until the
+        failing attempt is found; it is dropped with its contents logged and the
+        rest of the batch is written.
+        """
+        delay = 0.1
+        for retry in range(self.max_retries + 1):
+            try:
+                await run_blocking(self.repository.add_quiz_attempts, batch)
+                self._count('batches')
+                self._count('written', len(batch))
+                return
+            except Exception as error:
+                self._count('failed_batches')
+                if not self.repository.is_transient_error(error):
+                    if len(batch) > 1:
+                        middle = len(batch) // 2
+                        await self._commit(batch[:middle])
+                        await self._commit(batch[middle:])
+                    else:
+                        self._drop(batch, "it cannot be stored")
+                    return
+                if self._stopping or retry == self.max_retries:
+                    # Shutting down, or the store stayed unavailable: give up loudly
+                    self._drop(batch, f"the store is unavailable ({error})")
+                    return
+                logger.warning("Quiz attempt batch of %d failed (%s), retrying in %.1fs", len(batch), error, delay)
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, 5.0)
+
+    def _drop(self, batch: List[Tuple[str, QuizAttempt]], reason: str):
+        self._count('dropped', len(batch))
+        for key, attempt in batch:
+            logger.exception("Dropping quiz attempt %s because %s: %s", key, reason, attempt.json())
+
+    def _count(self, name: str, n: int = 1):
+        with self._stats_lock:
+            setattr(self, name, getattr(self, name) + n)
+
+    def render_metrics(self) -> List[str]:
+        """Prometheus samples for the buffer"""
+        with self._stats_lock:
+            counters = [
+                ('hanzy_quiz_attempts_accepted_total', 'Quiz attempts accepted by the write-behind buffer', self.accepted),
+                ('hanzy_quiz_attempts_duplicate_total', 'Quiz submits absorbed by their idempotency key', self.duplicates),
+                ('hanzy_quiz_attempts_rejected_total', 'Quiz submits rejected because the buffer was full', self.rejected),
+                ('hanzy_quiz_attempts_written_total', 'Quiz attempts written by the buffer', self.written),
+                ('hanzy_quiz_attempt_batches_total', 'Quiz attempt batches committed', self.batches),
+                ('hanzy_quiz_attempt_batch_failures_total', 'Quiz attempt batch commits that failed', self.failed_batches),
+                ('hanzy_quiz_attempts_dropped_total', 'Quiz attempts dropped because they could not be written', self.dropped),
+            ]
+        lines = []
+        for name, help_text, value in counters:
+            lines += [f"# HELP {name} {help_text}", f"# TYPE {name} counter", f"{name} {value}"]
+        lines += [
+            "# HELP hanzy_quiz_attempts_pending Quiz attempts waiting to be written",
+            "# TYPE hanzy_quiz_attempts_pending gauge",
+            f"hanzy_quiz_attempts_pending {self.pending}",
+        ]
+        return lines
+
+
+_quiz_attempt_buffer: Optional[QuizAttemptBuffer] = None
+
+
+def get_quiz_attempt_buffer() -> QuizAttemptBuffer:
+    """Get the process-wide quiz attempt buffer"""
+    global _quiz_attempt_buffer
+    if _quiz_attempt_buffer is None:
+        _quiz_attempt_buffer = QuizAttemptBuffer(get_repository())
+        get_metrics_registry().add_collector(_quiz_attempt_buffer.render_metrics)
+    return _quiz_attempt_buffer
@@ -0,0 +1,169 @@
+import asyncio
+import os
+import uuid
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+from models.schemas import QuizQuestion
+from services.repository import AsyncRepository, get_async_repository
+
+QuizBuilder = Callable[[], Awaitable[List[QuizQuestion]]]
+
+
+class QuizSessionState:
+    """A generated quiz with its answers, and the answers recorded so far (as seen by this process)"""
+
+    def __init__(self, quiz_id: str, user_id: str, questions: List[QuizQuestion],
+                 created_at: datetime, expires_at: datetime):
+        self.quiz_id = quiz_id
+        self.user_id = user_id
+        self.questions: Dict[str, QuizQuestion] = {q.id: q for q in questions}
+        self.created_at = created_at
+        self.expires_at = expires_at
+        self.answers: Dict[str, Tuple[str, bool]] = {}
+
+    @property
+    def expired(self) -> bool:
+        return self.expires_at <= datetime.now()
+
+    def to_stored(self) -> dict:
+        """The stored form of the session (answers are stored separately, per question)"""
+        return {
+            'user_id': self.user_id,
+            'questions': [q.model_dump(mode='json') for q in self.questions.values()],
+            'created_at': self.created_at,
+            'expires_at': self.expires_at,
+        }
+
+    @classmethod
+    def from_stored(cls, quiz_id: str, data: dict) -> "QuizSessionState":
+        return cls(quiz_id, data['user_id'], [QuizQuestion(**q) for q in data['questions']],
+                   data['created_at'], data['expires_at'])
+
+
+class QuizSessionStore:
+    """
+    Generated quizzes, keyed by quiz id.
+
+    Sessions are stored in the repository, so an answer can be submitted to
+    any API process or instance, not only the one that generated the quiz.
+    Each process keeps the sessions it has seen in memory, so a submit
+    normally costs a single store write: claiming the question's answer,
+    which is what makes answers one-per-question across instances.
+
+    Sessions expire QUIZ_SESSION_TTL_SECONDS after generation. At most
+    QUIZ_SESSION_MAX are kept in memory (the oldest go first); expired ones
+    are dropped from the front on every access. Stored sessions are purged
+    by the repository (on Firestore, by the TTL policies on `expires_at`
+    declared in firestore.indexes.json).
+
+    The store also holds one pre-generated next quiz per (user, quiz type,
+    count): a background task started when a quiz is handed out, so that the
+    following request is served without any store reads. Pre-generated
+    quizzes are kept for QUIZ_PREFETCH_TTL_SECONDS only, since they are built
+    from the user's progress at the time, and are per process; a request
+    that reaches another instance generates its quiz on demand.
+    """
+
+    def __init__(self, repository: AsyncRepository):
+        self.repository = repository
+        self.ttl = int(os.getenv("QUIZ_SESSION_TTL_SECONDS", "1800"))
+        self.max_sessions = int(os.getenv("QUIZ_SESSION_MAX", "10000"))
+        self.prefetch_ttl = int(os.getenv("QUIZ_PREFETCH_TTL_SECONDS", "300"))
+        self._sessions: "OrderedDict[str, QuizSessionState]" = OrderedDict()
+        self._next: "OrderedDict[tuple, Tuple[asyncio.Task, datetime]]" = OrderedDict()
+
+    def _evict(self):
+        now = datetime.now()
+        while self._sessions:
+            quiz_id, session = next(iter(self._sessions.items()))
+            if session.expires_at > now and len(self._sessions) <= self.max_sessions:
+                break
+            del self._sessions[quiz_id]
+        while self._next:
+            key, (task, expires_at) = next(iter(self._next.items()))
+            if expires_at > now and len(self._next) <= self.max_sessions:
+                break
+            task.cancel()
+            del self._next[key]
+
+    async def create(self, user_id: str, questions: List[QuizQuestion]) -> QuizSessionState:
+        """Store a generated quiz under a new, unguessable quiz id"""
+        now = datetime.now()
+        session = QuizSessionState(uuid.uuid4().hex, user_id, questions, now, now + timedelta(seconds=self.ttl))
+        await self.repository.put_quiz_session(session.quiz_id, session.to_stored())
+        self._sessions[session.quiz_id] = session
+        self._evict()
+        return session
+
+    async def get(self, quiz_id: str) -> Optional[QuizSessionState]:
+        """A live session, or None if it never existed or has expired"""
+        self._evict()
+        session = self._sessions.get(quiz_id)
+        if session is None:
+            data = await self.repository.get_quiz_session(quiz_id)
+            if data is None:
+                return None
+            session = QuizSessionState.from_stored(quiz_id, data)
+            if not session.expired:
+                self._sessions[quiz_id] = session
+                self._evict()
+        return None if session.expired else session
+
+    async def claim_answer(self, session: QuizSessionState, question_id: str,
+                           answer: str, correct: bool) -> Optional[Tuple[str, bool]]:
+        """
+        Record the answer to a question, unless one is already recorded.
+
+        Returns:
+            None if this answer was recorded, otherwise the (answer, correct) recorded earlier
+        """
+        if question_id in session.answers:
+            return session.answers[question_id]
+        stored = await self.repository.claim_quiz_answer(
+            session.quiz_id, question_id, answer, correct, session.expires_at
+        )
+        previous = (stored['answer'], stored['correct']) if stored else None
+        session.answers[question_id] = previous or (answer, correct)
+        return previous
+
+    async def release_answer(self, session: QuizSessionState, question_id: str):
+        """Forget a claimed answer whose attempt was not accepted, so it can be submitted again"""
+        session.answers.pop(question_id, None)
+        await self.repository.release_quiz_answer(session.quiz_id, question_id)
+
+    def prefetch(self, key: tuple, build: QuizBuilder):
+        """Start generating the next quiz for `key` in the background, unless one is already pending"""
+        self._evict()
+        if key in self._next:
+            return
+        task = asyncio.get_running_loop().create_task(build())
+        # A failed prefetch is simply regenerated on demand; don't log it as unretrieved
+        task.add_done_callback(lambda t: t.cancelled() or t.exception())
+        self._next[key] = (task, datetime.now() + timedelta(seconds=self.prefetch_ttl))
+
+    async def take_prefetched(self, key: tuple) -> Optional[List[QuizQuestion]]:
+        """The pre-generated quiz for `key` (waiting for it if still in progress), or None"""
+        self._evict()
+        entry = self._next.pop(key, None)
+        if entry is None:
+            return None
+        task, _ = entry
+        if task.get_loop() is not asyncio.get_running_loop():
+            return None
+        try:
+            return await task
+        except Exception:
+            return None
+
+
+_quiz_session_store: Optional[QuizSessionStore] = None
+
+
+def get_quiz_session_store() -> QuizSessionStore:
+    """Get the process-wide quiz session store"""
+    global _quiz_session_store
+    if _quiz_session_store is None:
+        _quiz_session_store = QuizSessionStore(get_async_repository())
+    return _quiz_session_store
@@ -0,0 +1,214 @@
+import heapq
+import math
+import threading
+from typing import Dict, List, Optional
+
+from models.schemas import ItemType
+from services.catalog_cache import CatalogSnapshot, get_catalog_cache
+from services.decomposition_graph import DecompositionGraph, current_decomposition_graph, get_decomposition_graph
+from services.repository import run_blocking
+
+# Score weights. A character scores its frequency, minus a penalty per
+# radical the user still has to learn and per HSK level above the user's;
+# a radical scores how widely it is used plus how many characters it would
+# complete right now.
+FREQUENCY_WEIGHT = 2.0
+READY_BONUS = 1.0
+MISSING_RADICAL_PENALTY = 1.0
+LEVEL_PENALTY = 1.0
+RADICAL_USAGE_WEIGHT = 1.5
+RADICAL_COMPLETES_WEIGHT = 1.0
+
+# A level counts as covered once this share of its characters is learned
+LEVEL_COVERED_RATIO = 0.5
+
+if hasattr(int, 'bit_count'):
+    _popcount = int.bit_count
+else:  # Python < 3.10
+    def _popcount(value: int) -> int:
+        return bin(value).count('1')
+
+
+class LearningPathRecommender:
+    """
+    Ranks the next radicals and characters a user should study.
+
+    Every character's prerequisites (its radicals, from the decomposition
+    graph) are precomputed as a bitset over radical indexes, along with the
+    user-independent part of its score for every HSK level. A recommendation
+    is then one pass over the catalog with an AND-NOT and a popcount per
+    character, and a heap selection of the top N, without any store reads
+    beyond the user's learned items.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._snapshot: Optional[CatalogSnapshot] = None
+
+    def rebuild(self, snapshot: CatalogSnapshot, graph: DecompositionGraph):
+        radical_ids = [r['id'] for r in snapshot.radicals_by_frequency]
+        bit = {r_id: 1 << i for i, r_id in enumerate(radical_ids)}
+
+        characters = snapshot.characters_by_frequency
+        char_ids = [c['id'] for c in characters]
+        masks = []
+        for character in characters:
+            mask = 0
+            for r_id in graph.radical_ids(character['id']):
+                mask |= bit[r_id]
+            masks.append(mask)
+
+        levels = sorted({c.get('hsk_level') or 1 for c in characters}) or [1]
+        level_sizes = {level: 0 for level in levels}
+        for character in characters:
+            level_sizes[character.get('hsk_level') or 1] += 1
+
+        # User-independent score of each character, for each possible user level
+        base_scores = {
+            user_level: [
+                FREQUENCY_WEIGHT * c.get('frequency', 0) / 100
+                - LEVEL_PENALTY * max(0, (c.get('hsk_level') or 1) - user_level)
+                for c in characters
+            ]
+            for user_level in levels
+        }
+
+        # How widely each radical is used, weighted by character frequency (0..1)
+        usage = {r_id: 0.0 for r_id in radical_ids}
+        for character in characters:
+            for r_id in graph.radical_ids(character['id']):
+                usage[r_id] += character.get('frequency', 0) / 100
+        top_usage = max(usage.values(), default=0.0) or 1.0
+
+        with self._lock:
+            self._snapshot = snapshot
+            self._radical_ids = radical_ids
+            self._bit = bit
+            self._char_ids = char_ids
+            self._char_index = {c_id: i for i, c_id in enumerate(char_ids)}
+            self._masks = masks
+            self._frequency_weights = [c.get('frequency', 0) / 100 for c in characters]
+            self._levels = levels
+            self._char_levels = [c.get('hsk_level') or 1 for c in characters]
+            self._level_sizes = level_sizes
+            self._base_scores = base_scores
+            self._radical_usage = {r_id: RADICAL_USAGE_WEIGHT * u / top_usage for r_id, u in usage.items()}
+
+    def _radicals_in(self, mask: int) -> List[str]:
+        radical_ids = []
+        while mask:
+            lowest = mask & -mask
+            radical_ids.append(self._radical_ids[lowest.bit_length() - 1])
+            mask ^= lowest
+        return radical_ids
+
+    def user_level(self, learned_characters: List[str]) -> int:
+        """The lowest HSK level the user has not yet covered"""
+        learned = {level: 0 for level in self._levels}
+        for char_id in learned_characters:
+            index = self._char_index.get(char_id)
+            if index is not None:
+                learned[self._char_levels[index]] += 1
+        for level in self._levels:
+            if learned[level] < LEVEL_COVERED_RATIO * self._level_sizes[level]:
+                return level
+        return self._levels[-1]
+
+    def recommend(self, learned_items: List[dict], limit: int = 10) -> List[dict]:
+        """
+        Top `limit` items to study next, best first.
+
+        Args:
+            learned_items: The user's (item_id, item_type) pairs
+
+        Returns:
+            Recommendation dicts (item_id, item_type, score, missing_radicals, item)
+        """
+        with self._lock:
+            radical_type, character_type = ItemType.RADICAL.value, ItemType.CHARACTER.value
+            known_radicals = {i['item_id'] for i in learned_items if i['item_type'] == radical_type}
+            learned_characters = {i['item_id'] for i in learned_items if i['item_type'] == character_type}
+
+            known_mask = 0
+            for r_id in known_radicals:
+                known_mask |= self._bit.get(r_id, 0)
+
+            base = self._base_scores[self.user_level(list(learned_characters))]
+            masks, char_ids, frequency_weights = self._masks, self._char_ids, self._frequency_weights
+
+            # One AND-NOT and popcount per character, as flat list passes
+            not_known = ~known_mask
+            missing_counts = [_popcount(mask & not_known) for mask in masks]
+            scores = [
+                b + READY_BONUS if not count else b - MISSING_RADICAL_PENALTY * count
+                for b, count in zip(base, missing_counts)
+            ]
+            for char_id in learned_characters:
+                index = self._char_index.get(char_id)
+                if index is not None:
+                    scores[index] = -math.inf
+
+            # A radical that is the last one missing from a character completes it
+            completes: Dict[int, float] = {}
+            for i in [i for i, count in enumerate(missing_counts) if count == 1]:
+                if scores[i] != -math.inf:
+                    missing = masks[i] & not_known
+                    completes[missing] = completes.get(missing, 0.0) + frequency_weights[i]
+
+            top_characters = [
+                (scores[i], i)
+                for i in heapq.nlargest(limit, range(len(scores)), key=scores.__getitem__)
+                if scores[i] != -math.inf
+            ]
+
+            # log2 keeps a radical completing many rare characters comparable to one common character
+            radical_candidates = (
+                (usage + RADICAL_COMPLETES_WEIGHT * math.log2(1 + completes.get(self._bit[r_id], 0.0)), r_id)
+                for r_id, usage in self._radical_usage.items() if r_id not in known_radicals
+            )
+            top_radicals = heapq.nlargest(limit, radical_candidates)
+
+            snapshot = self._snapshot
+            ranked = [
+                (score, {
+                    'item_id': char_ids[i],
+                    'item_type': ItemType.CHARACTER,
+                    'score': round(score, 4),
+                    'missing_radicals': self._radicals_in(masks[i] & ~known_mask),
+                    'item': snapshot.characters[char_ids[i]],
+                })
+                for score, i in top_characters
+            ] + [
+                (score, {
+                    'item_id': r_id,
+                    'item_type': ItemType.RADICAL,
+                    'score': round(score, 4),
+                    'missing_radicals': [],
+                    'item': snapshot.radicals[r_id],
+                })
+                for score, r_id in top_radicals
+            ]
+
+        return [entry for _, entry in heapq.nlargest(limit, ranked, key=lambda pair: pair[0])]
+
+
+_recommender: Optional[LearningPathRecommender] = None
+_subscribe_lock = threading.Lock()
+
+
+def _subscribe():
+    global _recommender
+    with _subscribe_lock:
+        if _recommender is None:
+            recommender = LearningPathRecommender()
+            # Registered after the graph's listener, so the graph is already rebuilt
+            get_catalog_cache().subscribe(lambda s: recommender.rebuild(s, current_decomposition_graph()))
+            _recommender = recommender
+
+
+async def get_recommender() -> LearningPathRecommender:
+    """Get the process-wide recommender, kept in sync with the catalog cache (built on the store thread pool)"""
+    await get_decomposition_graph()
+    if _recommender is None:
+        await run_blocking(_subscribe)
+    return _recommender
@@ -0,0 +1,449 @@
+import asyncio
+import contextvars
+import functools
+import os
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Dict, List, Optional, Set, Tuple
+
+from models.schemas import UserProgress, QuizAttempt, MistakeLog, ItemType, ReviewEvent
+from services.firebase_service import get_db
+from services.pagination import encode_cursor, decode_cursor
+from services import progress_service, mistake_service
+
+CATALOG_META_COLLECTION = 'meta'
+CATALOG_META_DOCUMENT = 'catalog'
+QUIZ_ATTEMPTS_COLLECTION = 'quiz_attempts'
+QUIZ_SESSIONS_COLLECTION = 'quiz_sessions'
+QUIZ_ANSWERS_COLLECTION = 'quiz_answers'
+
+
+def attempt_doc_id(user_id: str, key: str) -> str:
+    """Deterministic document id for a quiz attempt, from its idempotency key"""
+    return f"{user_id}_{key}"
+
+
+class Repository:
+    """
+    Data-access interface for everything the API reads and writes.
+
+    Methods are synchronous (blocking); routes call them through
+    AsyncRepository so the event loop is never blocked on the store.
+    """
+
+    # Catalog
+    def load_catalog(self) -> Tuple[Dict[str, dict], Dict[str, dict]]:
+        """Return (radicals, characters) keyed by document id"""
+        raise NotImplementedError
+
+    def get_catalog_version(self):
+        raise NotImplementedError
+
+    def bump_catalog_version(self):
+        """Mark the catalog as changed so every API instance reloads its cache"""
+        raise NotImplementedError
+
+    def upsert_catalog_items(self, collection: str, items: Dict[str, dict]):
+        """Create or replace catalog documents ('radicals' or 'characters') by id"""
+        raise NotImplementedError
+
+    def delete_catalog_items(self, collection: str, item_ids: List[str]):
+        raise NotImplementedError
+
+    def referenced_item_ids(self, item_ids: List[str]) -> Set[str]:
+        """The catalog ids among `item_ids` that user progress, mistakes or quiz attempts refer to"""
+        raise NotImplementedError
+
+    # Progress
+    def list_progress(self, user_id: str) -> List[UserProgress]:
+        raise NotImplementedError
+
+    def list_learned_items(self, user_id: str) -> List[dict]:
+        """(item_id, item_type) of every item the user has progress on"""
+        raise NotImplementedError
+
+    def list_progress_page(self, user_id: str, limit: int = 500,
+                           cursor: Optional[str] = None) -> Tuple[List[Tuple[UserProgress, str]], Optional[str]]:
+        """
+        One page of a user's progress in document-id order.
+
+        Returns:
+            ([(progress, cursor positioned after it)], cursor for the next page or None)
+        """
+        raise NotImplementedError
+
+    def get_due_progress(self, user_id: str, limit: int = 50, cursor: Optional[str] = None,
+                         now: Optional[datetime] = None) -> Tuple[List[UserProgress], Optional[str]]:
+        raise NotImplementedError
+
+    def record_review(self, user_id: str, item_id: str, item_type: ItemType, correct: bool) -> UserProgress:
+        raise NotImplementedError
+
+    def record_reviews(self, user_id: str, events: List[ReviewEvent]) -> List[UserProgress]:
+        raise NotImplementedError
+
+    def get_progress_stats(self, user_id: str) -> dict:
+        raise NotImplementedError
+
+    def reconcile_stats(self, user_id: str) -> Tuple[dict, bool]:
+        raise NotImplementedError
+
+    # Quiz
+    def add_quiz_attempt(self, attempt: QuizAttempt):
+        """Store an attempt and, if incorrect, count it as a mistake"""
+        self.add_quiz_attempts([(uuid.uuid4().hex, attempt)])
+
+    def add_quiz_attempts(self, attempts: List[Tuple[str, QuizAttempt]]):
+        """
+        Store a batch of attempts in as few writes as possible, counting the incorrect ones as mistakes.
+
+        Args:
+            attempts: (idempotency key, attempt) pairs. The key determines the
+                stored attempt's id, so replaying a key never adds a second attempt
+        """
+        raise NotImplementedError
+
+    def get_quiz_history(self, user_id: str, limit: int = 50,
+                         cursor: Optional[str] = None) -> Tuple[List[dict], Optional[str]]:
+        """Newest attempts first; returns (attempts, cursor for the next page or None)"""
+        rows, next_cursor = self.list_quiz_attempts_page(user_id, limit=limit, cursor=cursor)
+        return [attempt for attempt, _ in rows], next_cursor
+
+    def list_quiz_attempts_page(self, user_id: str, limit: int = 50,
+                                cursor: Optional[str] = None) -> Tuple[List[Tuple[dict, str]], Optional[str]]:
+        """
+        One page of a user's quiz attempts, newest first.
+
+        Returns:
+            ([(attempt, cursor positioned after it)], cursor for the next page or None)
+        """
+        raise NotImplementedError
+
+    def top_mistakes(self, user_id: str, limit: int = 20, decay: bool = False) -> List[MistakeLog]:
+        raise NotImplementedError
+
+    # Quiz sessions
+    def put_quiz_session(self, quiz_id: str, session: dict):
+        """Store a generated quiz (user_id, questions with their answers, created_at, expires_at)"""
+        raise NotImplementedError
+
+    def get_quiz_session(self, quiz_id: str) -> Optional[dict]:
+        """A stored quiz, or None. Expired quizzes may be returned until they are purged"""
+        raise NotImplementedError
+
+    def claim_quiz_answer(self, quiz_id: str, question_id: str, answer: str, correct: bool,
+                          expires_at: datetime) -> Optional[dict]:
+        """
+        Atomically record the answer to a quiz question, unless one is already recorded.
+
+        Returns:
+            None if the answer was recorded, otherwise the recorded {'answer', 'correct'}
+        """
+        raise NotImplementedError
+
+    def release_quiz_answer(self, quiz_id: str, question_id: str):
+        """Forget a recorded answer (its attempt was not accepted)"""
+        raise NotImplementedError
+
+    def is_transient_error(self, error: Exception) -> bool:
+        """Whether a failed call may succeed if retried (store unavailable, timeouts, contention)"""
+        return isinstance(error, OSError)
+
+
+class FirestoreRepository(Repository):
+    """Repository backed by Cloud Firestore"""
+
+    @property
+    def db(self):
+        return get_db()
+
+    def load_catalog(self):
+        return self._load_collection('radicals'), self._load_collection('characters')
+
+    def _load_collection(self, name: str) -> Dict[str, dict]:
+        items = {}
+        for doc in self.db.collection(name).stream():
+            data = doc.to_dict()
+            data['id'] = doc.id
+            items[doc.id] = data
+        return items
+
+    def get_catalog_version(self):
+        doc = self.db.collection(CATALOG_META_COLLECTION).document(CATALOG_META_DOCUMENT).get()
+        if not doc.exists:
+            return None
+        return doc.to_dict().get('version')
+
+    def bump_catalog_version(self):
+        from firebase_admin import firestore
+        self.db.collection(CATALOG_META_COLLECTION).document(CATALOG_META_DOCUMENT).set(
+            {'version': firestore.Increment(1), 'updated_at': firestore.SERVER_TIMESTAMP},
+            merge=True
+        )
+
+    def upsert_catalog_items(self, collection, items):
+        self._write_batched(collection, [(item_id, _without_id(data)) for item_id, data in items.items()])
+
+    def delete_catalog_items(self, collection, item_ids):
+        self._write_batched(collection, [(item_id, None) for item_id in item_ids])
+
+    def referenced_item_ids(self, item_ids):
+        referenced = set()
+        for collection in (progress_service.PROGRESS_COLLECTION, mistake_service.MISTAKES_COLLECTION,
+                           QUIZ_ATTEMPTS_COLLECTION):
+            collection_ref = self.db.collection(collection)
+            for item_id in item_ids:
+                # One document is enough, so at most one read per id and collection
+                if item_id not in referenced and list(collection_ref.where('item_id', '==', item_id).limit(1).stream()):
+                    referenced.add(item_id)
+        return referenced
+
+    def _write_batched(self, collection: str, writes: List[Tuple[str, Optional[dict]]]):
+        collection_ref = self.db.collection(collection)
+        for start in range(0, len(writes), progress_service.WRITE_BATCH_SIZE):
+            batch = self.db.batch()
+            for doc_id, data in writes[start:start + progress_service.WRITE_BATCH_SIZE]:
+                if data is None:
+                    batch.delete(collection_ref.document(doc_id))
+                else:
+                    batch.set(collection_ref.document(doc_id), data)
+            batch.commit()
+
+    def list_progress(self, user_id):
+        docs = self.db.collection(progress_service.PROGRESS_COLLECTION).where('user_id', '==', user_id).stream()
+        return [progress_service.progress_from_doc(doc.to_dict()) for doc in docs]
+
+    def list_learned_items(self, user_id):
+        docs = (self.db.collection(progress_service.PROGRESS_COLLECTION)
+                .where('user_id', '==', user_id)
+                .select(['item_id', 'item_type'])
+                .stream())
+        return [{'item_id': data['item_id'], 'item_type': data['item_type']} for data in (doc.to_dict() for doc in docs)]
+
+    def list_progress_page(self, user_id, limit=500, cursor=None):
+        from google.cloud.firestore_v1.field_path import FieldPath
+        progress_ref = self.db.collection(progress_service.PROGRESS_COLLECTION)
+        query = (progress_ref
+                 .where('user_id', '==', user_id)
+                 .order_by(FieldPath.document_id())
+                 .limit(limit))
+
+        if cursor:
+            position = decode_cursor(cursor, {'id': str})
+            query = query.start_after({FieldPath.document_id(): progress_ref.document(position['id'])})
+
+        rows = [
+            (progress_service.progress_from_doc(doc.to_dict()), encode_cursor({'id': doc.id}))
+            for doc in query.stream()
+        ]
+        next_cursor = rows[-1][1] if len(rows) == limit else None
+        return rows, next_cursor
+
+    def get_due_progress(self, user_id, limit=50, cursor=None, now=None):
+        return progress_service.get_due_progress(self.db, user_id, limit=limit, cursor=cursor, now=now)
+
+    def record_review(self, user_id, item_id, item_type, correct):
+        return progress_service.record_review(self.db, user_id, item_id, item_type, correct)
+
+    def record_reviews(self, user_id, events):
+        return progress_service.record_reviews(self.db, user_id, events)
+
+    def get_progress_stats(self, user_id):
+        return progress_service.get_progress_stats(self.db, user_id)
+
+    def reconcile_stats(self, user_id):
+        return progress_service.reconcile_stats(self.db, user_id)
+
+    def add_quiz_attempts(self, attempts):
+        from firebase_admin import firestore
+        db = self.db
+        attempts_ref = db.collection(QUIZ_ATTEMPTS_COLLECTION)
+        # Every attempt may add a mistake counter write, so half a batch of attempts always fits
+        chunk_size = progress_service.WRITE_BATCH_SIZE // 2
+        for start in range(0, len(attempts), chunk_size):
+            chunk = attempts[start:start + chunk_size]
+            increments = mistake_service.merge_mistakes(a for _, a in chunk)
+
+            # A transaction, since the mistake counters are read and rewritten
+            @firestore.transactional
+            def commit(transaction):
+                mistake_service.set_mistakes(db, transaction, increments)
+                for key, attempt in chunk:
+                    attempt_dict = attempt.dict()
+                    attempt_dict['timestamp'] = progress_service.to_sortable_text(attempt.timestamp)
+                    if attempt.item_type is not None:
+                        attempt_dict['item_type'] = attempt.item_type.value
+                    transaction.set(attempts_ref.document(attempt_doc_id(attempt.user_id, key)), attempt_dict)
+
+            commit(db.transaction())
+
+    def list_quiz_attempts_page(self, user_id, limit=50, cursor=None):
+        from google.cloud.firestore_v1.field_path import FieldPath
+        attempts_ref = self.db.collection(QUIZ_ATTEMPTS_COLLECTION)
+        query = (attempts_ref
+                 .where('user_id', '==', user_id)
+                 .order_by('timestamp', direction='DESCENDING')
+                 .order_by(FieldPath.document_id(), direction='DESCENDING')
+                 .limit(limit))
+
+        if cursor:
+            position = decode_cursor(cursor, {'timestamp': datetime, 'id': str})
+            timestamp = position['timestamp']
+            query = query.start_after({
+                'timestamp': datetime.fromisoformat(timestamp) if position.get('native') else timestamp,
+                FieldPath.document_id(): attempts_ref.document(position['id'])
+            })
+
+        rows = []
+        for doc in query.stream():
+            data = doc.to_dict()
+            # The API stores sortable text; attempts written by clients may carry native timestamps.
+            # The cursor holds the stored value, which is what the query resumes after
+            stored = data.get('timestamp')
+            native = isinstance(stored, datetime)
+            position = encode_cursor({'timestamp': stored.isoformat() if native else stored,
+                                      'native': native, 'id': doc.id})
+            if native:
+                data['timestamp'] = progress_service.to_local_naive(stored)
+            elif isinstance(stored, str):
+                data['timestamp'] = datetime.fromisoformat(stored)
+            rows.append((data, position))
+
+        next_cursor = rows[-1][1] if len(rows) == limit else None
+        return rows, next_cursor
+
+    def top_mistakes(self, user_id, limit=20, decay=False):
+        return mistake_service.top_mistakes(self.db, user_id, limit=limit, decay=decay)
+
+    def put_quiz_session(self, quiz_id, session):
+        self.db.collection(QUIZ_SESSIONS_COLLECTION).document(quiz_id).set({
+            **session,
+            'created_at': progress_service.to_stored_timestamp(session['created_at']),
+            'expires_at': progress_service.to_stored_timestamp(session['expires_at']),
+        })
+
+    def get_quiz_session(self, quiz_id):
+        doc = self.db.collection(QUIZ_SESSIONS_COLLECTION).document(quiz_id).get()
+        if not doc.exists:
+            return None
+        data = doc.to_dict()
+        data['created_at'] = progress_service.to_local_naive(data['created_at'])
+        data['expires_at'] = progress_service.to_local_naive(data['expires_at'])
+        return data
+
+    def claim_quiz_answer(self, quiz_id, question_id, answer, correct, expires_at):
+        from google.api_core.exceptions import AlreadyExists
+        ref = self.db.collection(QUIZ_ANSWERS_COLLECTION).document(f"{quiz_id}_{question_id}")
+        while True:
+            try:
+                # create() fails if the document exists, so the first answer wins without a transaction
+                ref.create({'answer': answer, 'correct': correct,
+                            'expires_at': progress_service.to_stored_timestamp(expires_at)})
+                return None
+            except AlreadyExists:
+                snapshot = ref.get()
+                # Otherwise released in between: claim it again
+                if snapshot.exists:
+                    data = snapshot.to_dict()
+                    return {'answer': data['answer'], 'correct': data['correct']}
+
+    def release_quiz_answer(self, quiz_id, question_id):
+        self.db.collection(QUIZ_ANSWERS_COLLECTION).document(f"{quiz_id}_{question_id}").delete()
+
+    def is_transient_error(self, error):
+        from google.api_core import exceptions
+        return isinstance(error, (OSError, exceptions.RetryError, exceptions.Aborted, exceptions.DeadlineExceeded,
+                                  exceptions.InternalServerError, exceptions.ServiceUnavailable,
+                                  exceptions.TooManyRequests, exceptions.Unknown))
+
+
+def _without_id(data: dict) -> dict:
+    return {key: value for key, value in data.items() if key != 'id'}
+
+
+_executor: Optional[ThreadPoolExecutor] = None
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=int(os.getenv("DB_MAX_WORKERS", "16")),
+            thread_name_prefix="store"
+        )
+    return _executor
+
+
+async def run_blocking(func, *args, **kwargs):
+    """
+    Run a blocking store call on the bounded store thread pool.
+
+    The caller's context variables are propagated to the worker thread.
+    """
+    context = contextvars.copy_context()
+    call = functools.partial(context.run, func, *args, **kwargs)
+    return await asyncio.get_running_loop().run_in_executor(_get_executor(), call)
+
+
+def shutdown_executor():
+    """Stop the store thread pool (called on application shutdown)"""
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=True)
+        _executor = None
+
+
+class AsyncRepository:
+    """
+    Awaitable view of a Repository.
+
+    Every repository method is exposed as a coroutine that runs the blocking
+    call on the bounded store thread pool, so slow store calls never stall
+    other requests on the event loop.
+    """
+
+    def __init__(self, repository: Repository):
+        self.repository = repository
+
+    def __getattr__(self, name):
+        method = getattr(self.repository, name)
+
+        async def call(*args, **kwargs):
+            return await run_blocking(method, *args, **kwargs)
+
+        return call
+
+
+_repository: Optional[Repository] = None
+_async_repository: Optional[AsyncRepository] = None
+
+
+def storage_backend() -> str:
+    """Configured storage backend: 'firestore' (default) or 'sqlite'"""
+    return os.getenv("STORAGE_BACKEND", "firestore").lower()
+
+
+def get_repository() -> Repository:
+    """Get the process-wide (blocking) repository for the configured backend, behind the progress cache"""
+    global _repository
+    if _repository is None:
+        backend = storage_backend()
+        if backend == "firestore":
+            _repository = FirestoreRepository()
+        elif backend == "sqlite":
+            from services.sqlite_repository import SQLiteRepository
+            _repository = SQLiteRepository(os.getenv("SQLITE_PATH", ":memory:"))
+        else:
+            raise ValueError(f"Unknown STORAGE_BACKEND: {backend}")
+        from services.progress_cache import with_progress_cache
+        _repository = with_progress_cache(_repository)
+    return _repository
+
+
+def get_async_repository() -> AsyncRepository:
+    """Get the process-wide repository for use from async route handlers"""
+    global _async_repository
+    if _async_repository is None:
+        _async_repository = AsyncRepository(get_repository())
+    return _async_repository
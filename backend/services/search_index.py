@@ -0,0 +1,179 @@
+import threading
+import unicodedata
+from typing import Callable, Dict, List, Optional, Set
+
+from services.catalog_cache import CatalogSnapshot, get_catalog_cache
+from services.repository import run_blocking
+
+MAX_GRAM = 3
+
+
+def strip_tones(text: str) -> str:
+    """Remove pinyin tone marks (e.g. 'hǎo' -> 'hao', 'lǜ' -> 'lu')"""
+    decomposed = unicodedata.normalize('NFD', text)
+    return ''.join(ch for ch in decomposed if not unicodedata.combining(ch))
+
+
+def _grams(text: str) -> Set[str]:
+    """All substrings of length 1..MAX_GRAM"""
+    grams = set()
+    for size in range(1, MAX_GRAM + 1):
+        for start in range(len(text) - size + 1):
+            grams.add(text[start:start + size])
+    return grams
+
+
+class SearchIndex:
+    """
+    Inverted n-gram index supporting substring search over a set of documents.
+
+    Every searchable field value is broken into all grams of length
+    1..MAX_GRAM. Queries up to MAX_GRAM characters are answered directly from
+    the postings; longer queries intersect the postings of their grams and
+    verify the candidates with a substring test. Results are ranked by
+    frequency (descending).
+
+    An index is never modified once built. Passing the index of the previous
+    catalog snapshot as `previous` reindexes only the documents that changed,
+    copying the postings they touch and sharing the rest.
+    """
+
+    def __init__(self, fields: Callable[[dict], List[str]], docs: Dict[str, dict],
+                 previous: Optional["SearchIndex"] = None):
+        self._fields = fields
+        self._docs: Dict[str, dict] = dict(previous._docs) if previous else {}
+        self._texts: Dict[str, List[str]] = dict(previous._texts) if previous else {}
+        self._postings: Dict[str, Set[str]] = dict(previous._postings) if previous else {}
+        self._owned: Set[str] = set()
+
+        for doc_id in [d for d in self._docs if d not in docs]:
+            self._remove(doc_id)
+        for doc_id, doc in docs.items():
+            if self._docs.get(doc_id) != doc:
+                self._upsert(doc)
+        del self._owned
+
+    def __len__(self):
+        return len(self._docs)
+
+    def _posting(self, gram: str) -> Set[str]:
+        # Posting sets may still be shared with the previous index; copy before changing one
+        if gram not in self._owned:
+            self._postings[gram] = set(self._postings.get(gram, ()))
+            self._owned.add(gram)
+        return self._postings[gram]
+
+    def _upsert(self, doc: dict):
+        doc_id = doc['id']
+        if doc_id in self._docs:
+            self._remove(doc_id)
+
+        texts = [t for t in self._fields(doc) if t]
+        self._docs[doc_id] = doc
+        self._texts[doc_id] = texts
+        for text in texts:
+            for gram in _grams(text):
+                self._posting(gram).add(doc_id)
+
+    def _remove(self, doc_id: str):
+        for text in self._texts.pop(doc_id):
+            for gram in _grams(text):
+                if gram in self._postings:
+                    ids = self._posting(gram)
+                    ids.discard(doc_id)
+                    if not ids:
+                        del self._postings[gram]
+                        self._owned.discard(gram)
+        del self._docs[doc_id]
+
+    def search(self, queries: List[str], limit: Optional[int] = None) -> List[dict]:
+        """
+        Find documents where any field contains any of the query variants.
+
+        Args:
+            queries: Normalized query strings (e.g. lowercased, tone-stripped)
+            limit: Maximum number of results
+
+        Returns:
+            Matching documents ordered by frequency (descending)
+        """
+        matches: Set[str] = set()
+        for query in {q for q in queries if q}:
+            matches |= self._match(query)
+
+        results = [self._docs[doc_id] for doc_id in matches]
+
+        results.sort(key=lambda d: (-d.get('frequency', 0), d['id']))
+        return results[:limit] if limit is not None else results
+
+    def _match(self, query: str) -> Set[str]:
+        if len(query) <= MAX_GRAM:
+            return set(self._postings.get(query, ()))
+
+        candidates = None
+        for start in range(len(query) - MAX_GRAM + 1):
+            ids = self._postings.get(query[start:start + MAX_GRAM])
+            if not ids:
+                return set()
+            candidates = set(ids) if candidates is None else candidates & ids
+            if not candidates:
+                return set()
+
+        return {d for d in candidates if any(query in text for text in self._texts[d])}
+
+
+def _radical_fields(doc: dict) -> List[str]:
+    return [doc.get('meaning', '').lower(), doc.get('character', '')]
+
+
+def _character_fields(doc: dict) -> List[str]:
+    pinyin = doc.get('pinyin', '').lower()
+    return [doc.get('meaning', '').lower(), pinyin, strip_tones(pinyin), doc.get('hanzi', '')]
+
+
+class CatalogSearch:
+    """Search indexes for the radicals and characters of one catalog snapshot"""
+
+    def __init__(self, snapshot: CatalogSnapshot, previous: Optional["CatalogSearch"] = None):
+        self.snapshot = snapshot
+        self.radicals = SearchIndex(_radical_fields, snapshot.radicals, previous.radicals if previous else None)
+        self.characters = SearchIndex(_character_fields, snapshot.characters,
+                                      previous.characters if previous else None)
+
+    def search_radicals(self, query: str, limit: Optional[int] = None) -> List[dict]:
+        return self.radicals.search([query.lower(), query], limit)
+
+    def search_characters(self, query: str, limit: Optional[int] = None) -> List[dict]:
+        query_lower = query.lower()
+        return self.characters.search([query_lower, strip_tones(query_lower), query], limit)
+
+
+_catalog_search: Optional[CatalogSearch] = None
+_subscribe_lock = threading.Lock()
+
+
+def _rebuild(snapshot: CatalogSnapshot):
+    # Catalog cache listener (reloads run one at a time, on the store thread
+    # pool). Readers hold on to the previous indexes until this assignment
+    global _catalog_search
+    _catalog_search = CatalogSearch(snapshot, _catalog_search)
+
+
+def _subscribe():
+    with _subscribe_lock:
+        if _catalog_search is None:
+            get_catalog_cache().subscribe(_rebuild)
+
+
+async def get_catalog_search() -> CatalogSearch:
+    """
+    Get the search indexes of the current catalog snapshot.
+
+    They are built on the store thread pool, on first use and after every
+    reload, and replaced whole, so a caller holding them searches one
+    snapshot (see `CatalogSearch.snapshot`).
+    """
+    await get_catalog_cache().get_snapshot()
+    if _catalog_search is None:
+        await run_blocking(_subscribe)
+    return _catalog_search
@@ -1,4 +1,5 @@
 from datetime import datetime, timedelta
+from typing import Optional
 from models.schemas import UserProgress, MasteryLevel
 
 class SpacedRepetitionService:
@@ -8,13 +9,14 @@ class SpacedRepetitionService:
     """
     
     @staticmethod
-    def calculate_next_review(progress: UserProgress, correct: bool) -> UserProgress:
+    def calculate_next_review(progress: UserProgress, correct: bool, reviewed_at: Optional[datetime] = None) -> UserProgress:
         """
         Calculate the next review date based on performance.
         
         Args:
             progress: Current user progress
             correct: Whether the answer was correct
+            reviewed_at: When the answer was given (defaults to now)
             
         Returns:
             Updated UserProgress with new scheduling parameters
@@ -59,8 +61,9 @@ class SpacedRepetitionService:
                 progress.mastery_level = MasteryLevel.NEW
         
         # Set next review date
-        progress.last_reviewed = datetime.now()
-        progress.next_review = datetime.now() + timedelta(days=progress.interval)
+        reviewed_at = reviewed_at or datetime.now()
+        progress.last_reviewed = reviewed_at
+        progress.next_review = reviewed_at + timedelta(days=progress.interval)
         
         return progress
     
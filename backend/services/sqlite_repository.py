@@ -0,0 +1,532 @@
+import json
+import math
+import re
+import sqlite3
+import threading
+from datetime import datetime
+from typing import Dict, Iterable, Optional
+
+from models.schemas import UserProgress, MistakeLog, MasteryLevel, ItemType
+from services.repository import Repository, CATALOG_META_DOCUMENT
+from services.spaced_repetition import SpacedRepetitionService
+from services.pagination import encode_cursor, decode_cursor
+from services.progress_service import progress_doc_id, new_progress, to_local_naive, to_sortable_text as _timestamp
+from services.mistake_service import add_log_weights, decayed_count, merge_mistakes
+from services.metrics import record_store_op
+from services import stats_service
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS radicals (
+    id TEXT PRIMARY KEY,
+    data TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS characters (
+    id TEXT PRIMARY KEY,
+    data TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    version INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS user_progress (
+    id TEXT PRIMARY KEY,
+    user_id TEXT NOT NULL,
+    item_id TEXT NOT NULL,
+    item_type TEXT NOT NULL,
+    mastery_level TEXT NOT NULL,
+    last_reviewed TEXT NOT NULL,
+    next_review TEXT NOT NULL,
+    correct_count INTEGER NOT NULL,
+    incorrect_count INTEGER NOT NULL,
+    ease_factor REAL NOT NULL,
+    interval INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_progress_due ON user_progress (user_id, next_review, id);
+CREATE INDEX IF NOT EXISTS idx_progress_export ON user_progress (user_id, id);
+CREATE TABLE IF NOT EXISTS user_stats (
+    user_id TEXT PRIMARY KEY,
+    data TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS quiz_attempts (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id TEXT NOT NULL,
+    question_id TEXT NOT NULL,
+    question_type TEXT NOT NULL,
+    answer TEXT NOT NULL,
+    correct INTEGER NOT NULL,
+    timestamp TEXT NOT NULL,
+    item_id TEXT,
+    item_type TEXT,
+    attempt_key TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_attempts_history ON quiz_attempts (user_id, timestamp DESC);
+CREATE TABLE IF NOT EXISTS user_mistakes (
+    id TEXT PRIMARY KEY,
+    user_id TEXT NOT NULL,
+    item_id TEXT NOT NULL,
+    item_type TEXT NOT NULL,
+    question_type TEXT NOT NULL,
+    timestamp TEXT NOT NULL,
+    mistake_count INTEGER NOT NULL,
+    decay_log_score REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_mistakes_count ON user_mistakes (user_id, mistake_count DESC);
+CREATE INDEX IF NOT EXISTS idx_mistakes_decay ON user_mistakes (user_id, decay_log_score DESC);
+CREATE TABLE IF NOT EXISTS quiz_sessions (
+    id TEXT PRIMARY KEY,
+    data TEXT NOT NULL,
+    expires_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_quiz_sessions_expiry ON quiz_sessions (expires_at);
+CREATE TABLE IF NOT EXISTS quiz_answers (
+    quiz_id TEXT NOT NULL,
+    question_id TEXT NOT NULL,
+    answer TEXT NOT NULL,
+    correct INTEGER NOT NULL,
+    expires_at TEXT NOT NULL,
+    PRIMARY KEY (quiz_id, question_id)
+);
+CREATE INDEX IF NOT EXISTS idx_quiz_answers_expiry ON quiz_answers (expires_at);
+"""
+
+PROGRESS_COLUMNS = ('id', 'user_id', 'item_id', 'item_type', 'mastery_level', 'last_reviewed', 'next_review',
+                    'correct_count', 'incorrect_count', 'ease_factor', 'interval')
+
+CATALOG_TABLES = ('radicals', 'characters')
+
+TRANSACTION_CONTROL = ('BEGIN', 'COMMIT', 'ROLLBACK', 'PRAGMA')
+
+# Literals in traced (parameter-expanded) statements, replaced to recover the query shape
+_LITERALS = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+
+
+def _progress_row(progress: UserProgress) -> tuple:
+    return (
+        progress_doc_id(progress.user_id, progress.item_type, progress.item_id),
+        progress.user_id, progress.item_id, progress.item_type.value, progress.mastery_level.value,
+        _timestamp(progress.last_reviewed), _timestamp(progress.next_review),
+        progress.correct_count, progress.incorrect_count, progress.ease_factor, progress.interval
+    )
+
+
+def _progress_from_row(row: sqlite3.Row) -> UserProgress:
+    # Columns are typed by the schema, so the row is trusted as is
+    return UserProgress.model_construct(
+        user_id=row['user_id'],
+        item_id=row['item_id'],
+        item_type=ItemType(row['item_type']),
+        mastery_level=MasteryLevel(row['mastery_level']),
+        last_reviewed=datetime.fromisoformat(row['last_reviewed']),
+        next_review=datetime.fromisoformat(row['next_review']),
+        correct_count=row['correct_count'],
+        incorrect_count=row['incorrect_count'],
+        ease_factor=row['ease_factor'],
+        interval=row['interval'],
+    )
+
+
+def _stats_to_json(stats: dict) -> str:
+    data = dict(stats)
+    if data.get('last_active') is not None:
+        data['last_active'] = _timestamp(data['last_active'])
+    return json.dumps(data)
+
+
+def _stats_from_json(raw: str) -> dict:
+    data = json.loads(raw)
+    if data.get('last_active') is not None:
+        data['last_active'] = datetime.fromisoformat(data['last_active'])
+    return data
+
+
+class SQLiteRepository(Repository):
+    """
+    Repository backed by a local SQLite database (":memory:" for a purely
+    in-memory store).
+
+    Used for local development, deterministic profiling and load tests
+    without Firestore credentials. Tables mirror the Firestore collections
+    and carry the indexes the API's queries need. A single connection is
+    shared and serialized with a lock. `statement_count` counts executed
+    statements (store round-trips), excluding transaction control; each one
+    is also attributed to the current request's metrics.
+    """
+
+    def __init__(self, path: str = ":memory:"):
+        self.path = path
+        self.statement_count = 0
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.create_function('add_log_weights', 2, add_log_weights, deterministic=True)
+        self._lock = threading.RLock()
+        with self._lock:
+            if path != ":memory:":
+                self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.executescript(SCHEMA)
+            self._migrate()
+        self._conn.set_trace_callback(self._count_statement)
+
+    def _migrate(self):
+        """Bring databases created by earlier versions up to the current schema"""
+        columns = {row['name'] for row in self._conn.execute("PRAGMA table_info(quiz_attempts)")}
+        if 'attempt_key' not in columns:
+            self._conn.execute("ALTER TABLE quiz_attempts ADD COLUMN attempt_key TEXT")
+        self._conn.execute(
+            "CREATE UNIQUE INDEX IF NOT EXISTS idx_attempts_key ON quiz_attempts (user_id, attempt_key)"
+        )
+        columns = {row['name'] for row in self._conn.execute("PRAGMA table_info(user_mistakes)")}
+        if 'decay_score' in columns:
+            # Linear forward-decay sums become log2 sums (the index follows the renamed column).
+            # log2 is only built into SQLite when compiled with its math functions
+            self._conn.create_function('log2', 1, math.log2, deterministic=True)
+            with self._transaction() as conn:
+                conn.execute("UPDATE user_mistakes SET decay_score = log2(MAX(decay_score, 1e-300))")
+                conn.execute("ALTER TABLE user_mistakes RENAME COLUMN decay_score TO decay_log_score")
+
+    def _count_statement(self, statement: str):
+        if not statement.lstrip().upper().startswith(TRANSACTION_CONTROL):
+            self.statement_count += 1
+            record_store_op(_LITERALS.sub('?', statement))
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def _transaction(self):
+        return _Transaction(self._conn, self._lock)
+
+    # Catalog
+
+    def load_catalog(self):
+        with self._lock:
+            return tuple(self._load_table(table) for table in CATALOG_TABLES)
+
+    def _load_table(self, table: str) -> Dict[str, dict]:
+        items = {}
+        for row in self._conn.execute(f"SELECT id, data FROM {table}"):
+            data = json.loads(row['data'])
+            data['id'] = row['id']
+            items[row['id']] = data
+        return items
+
+    def get_catalog_version(self):
+        with self._lock:
+            row = self._conn.execute("SELECT version FROM meta WHERE key = ?", (CATALOG_META_DOCUMENT,)).fetchone()
+        return row['version'] if row else None
+
+    def bump_catalog_version(self):
+        with self._transaction() as conn:
+            conn.execute(
+                "INSERT INTO meta (key, version) VALUES (?, 1) "
+                "ON CONFLICT (key) DO UPDATE SET version = version + 1",
+                (CATALOG_META_DOCUMENT,)
+            )
+
+    def upsert_catalog_items(self, collection, items):
+        table = _catalog_table(collection)
+        rows = [
+            (item_id, json.dumps({k: v for k, v in data.items() if k != 'id'}, ensure_ascii=False))
+            for item_id, data in items.items()
+        ]
+        with self._transaction() as conn:
+            conn.executemany(f"INSERT OR REPLACE INTO {table} (id, data) VALUES (?, ?)", rows)
+
+    def delete_catalog_items(self, collection, item_ids):
+        table = _catalog_table(collection)
+        with self._transaction() as conn:
+            conn.executemany(f"DELETE FROM {table} WHERE id = ?", [(item_id,) for item_id in item_ids])
+
+    def referenced_item_ids(self, item_ids):
+        referenced = set()
+        # Three IN lists per statement, kept under SQLite's default limit of 999 parameters
+        chunk_size = 300
+        with self._lock:
+            for start in range(0, len(item_ids), chunk_size):
+                chunk = list(item_ids[start:start + chunk_size])
+                marks = ', '.join('?' * len(chunk))
+                rows = self._conn.execute(
+                    f"SELECT item_id FROM user_progress WHERE item_id IN ({marks}) "
+                    f"UNION SELECT item_id FROM user_mistakes WHERE item_id IN ({marks}) "
+                    f"UNION SELECT item_id FROM quiz_attempts WHERE item_id IN ({marks})",
+                    chunk * 3
+                ).fetchall()
+                referenced.update(row['item_id'] for row in rows)
+        return referenced
+
+    # Progress
+
+    def list_progress(self, user_id):
+        with self._lock:
+            rows = self._conn.execute("SELECT * FROM user_progress WHERE user_id = ?", (user_id,)).fetchall()
+        return [_progress_from_row(row) for row in rows]
+
+    def list_learned_items(self, user_id):
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT item_id, item_type FROM user_progress WHERE user_id = ?", (user_id,)
+            ).fetchall()
+        return [{'item_id': row['item_id'], 'item_type': row['item_type']} for row in rows]
+
+    def list_progress_page(self, user_id, limit=500, cursor=None):
+        sql = "SELECT * FROM user_progress WHERE user_id = ?"
+        params = [user_id]
+        if cursor:
+            sql += " AND id > ?"
+            params.append(decode_cursor(cursor, {'id': str})['id'])
+        sql += " ORDER BY id LIMIT ?"
+        params.append(limit)
+
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+
+        page = [(_progress_from_row(row), encode_cursor({'id': row['id']})) for row in rows]
+        next_cursor = page[-1][1] if len(page) == limit else None
+        return page, next_cursor
+
+    def get_due_progress(self, user_id, limit=50, cursor=None, now=None):
+        sql = "SELECT * FROM user_progress WHERE user_id = ? AND next_review <= ?"
+        params = [user_id, _timestamp(now or datetime.now())]
+        if cursor:
+            position = decode_cursor(cursor, {'next_review': datetime, 'id': str})
+            sql += " AND (next_review, id) > (?, ?)"
+            # Normalized, so cursors issued by the progress cache work here too
+            params += [_timestamp(datetime.fromisoformat(position['next_review'])), position['id']]
+        sql += " ORDER BY next_review, id LIMIT ?"
+        params.append(limit)
+
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+
+        next_cursor = None
+        if len(rows) == limit:
+            next_cursor = encode_cursor({'next_review': rows[-1]['next_review'], 'id': rows[-1]['id']})
+        return [_progress_from_row(row) for row in rows], next_cursor
+
+    def record_review(self, user_id, item_id, item_type, correct):
+        with self._transaction() as conn:
+            before = self._get_progress(conn, user_id, item_type, item_id)
+            progress = before.copy() if before else new_progress(user_id, item_id, item_type)
+            updated = SpacedRepetitionService.calculate_next_review(progress, correct)
+            self._save_progress(conn, [updated])
+
+            stats = self._get_stats(conn, user_id)
+            if stats is not None:
+                self._save_stats(conn, stats_service.apply_review(stats, before, updated))
+        return updated
+
+    def record_reviews(self, user_id, events):
+        with self._transaction() as conn:
+            current: Dict[str, UserProgress] = {}
+            stats = self._get_stats(conn, user_id)
+            for event in events:
+                doc_id = progress_doc_id(user_id, event.item_type, event.item_id)
+                if doc_id not in current:
+                    current[doc_id] = self._get_progress(conn, user_id, event.item_type, event.item_id)
+
+                before = current[doc_id].copy() if current[doc_id] else None
+                progress = current[doc_id] or new_progress(user_id, event.item_id, event.item_type)
+                current[doc_id] = SpacedRepetitionService.calculate_next_review(
+                    progress, event.correct, to_local_naive(event.answered_at)
+                )
+                if stats is not None:
+                    stats_service.apply_review(stats, before, current[doc_id])
+
+            self._save_progress(conn, list(current.values()))
+            if stats is not None:
+                self._save_stats(conn, stats)
+        return list(current.values())
+
+    def import_progress(self, progress_list: Iterable[UserProgress]):
+        """Bulk insert progress rows in one transaction (fixtures and benchmarks)"""
+        with self._transaction() as conn:
+            self._save_progress(conn, progress_list)
+
+    def _get_progress(self, conn, user_id, item_type, item_id) -> Optional[UserProgress]:
+        row = conn.execute(
+            "SELECT * FROM user_progress WHERE id = ?", (progress_doc_id(user_id, item_type, item_id),)
+        ).fetchone()
+        return _progress_from_row(row) if row else None
+
+    def _save_progress(self, conn, progress_list: Iterable[UserProgress]):
+        placeholders = ", ".join("?" for _ in PROGRESS_COLUMNS)
+        conn.executemany(
+            f"INSERT OR REPLACE INTO user_progress ({', '.join(PROGRESS_COLUMNS)}) VALUES ({placeholders})",
+            (_progress_row(p) for p in progress_list)
+        )
+
+    def _get_stats(self, conn, user_id) -> Optional[dict]:
+        row = conn.execute("SELECT data FROM user_stats WHERE user_id = ?", (user_id,)).fetchone()
+        return _stats_from_json(row['data']) if row else None
+
+    def _save_stats(self, conn, stats: dict):
+        conn.execute(
+            "INSERT OR REPLACE INTO user_stats (user_id, data) VALUES (?, ?)",
+            (stats['user_id'], _stats_to_json(stats))
+        )
+
+    def get_progress_stats(self, user_id):
+        with self._lock:
+            stats = self._get_stats(self._conn, user_id)
+        if stats is not None:
+            return stats
+        return self.reconcile_stats(user_id)[0]
+
+    def reconcile_stats(self, user_id):
+        with self._transaction() as conn:
+            stored = self._get_stats(conn, user_id)
+            rows = conn.execute("SELECT * FROM user_progress WHERE user_id = ?", (user_id,)).fetchall()
+            rebuilt = stats_service.rebuild_stats(
+                user_id, (_progress_from_row(row) for row in rows), stored['review_days'] if stored else ()
+            )
+
+            drifted = stored is None or stats_service.has_drifted(stored, rebuilt)
+            if drifted:
+                self._save_stats(conn, rebuilt)
+        return rebuilt, drifted
+
+    # Quiz
+
+    def add_quiz_attempts(self, attempts):
+        with self._transaction() as conn:
+            stored = []
+            for key, attempt in attempts:
+                cursor = conn.execute(
+                    "INSERT OR IGNORE INTO quiz_attempts (user_id, question_id, question_type, answer, correct, "
+                    "timestamp, item_id, item_type, attempt_key) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (attempt.user_id, attempt.question_id, attempt.question_type, attempt.answer,
+                     int(attempt.correct), _timestamp(attempt.timestamp), attempt.item_id,
+                     attempt.item_type.value if attempt.item_type else None, key)
+                )
+                # Keys already stored are replays: neither the attempt nor its mistake is added again
+                if cursor.rowcount:
+                    stored.append(attempt)
+
+            conn.executemany(
+                "INSERT INTO user_mistakes (id, user_id, item_id, item_type, question_type, timestamp, "
+                "mistake_count, decay_log_score) VALUES (?, ?, ?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT (id) DO UPDATE SET mistake_count = mistake_count + excluded.mistake_count, "
+                "decay_log_score = add_log_weights(decay_log_score, excluded.decay_log_score), "
+                "timestamp = MAX(timestamp, excluded.timestamp)",
+                [
+                    (doc_id, m['user_id'], m['item_id'], m['item_type'], m['question_type'],
+                     _timestamp(m['timestamp']), m['count'], m['log_weight'])
+                    for doc_id, m in merge_mistakes(stored).items()
+                ]
+            )
+
+    def list_quiz_attempts_page(self, user_id, limit=50, cursor=None):
+        sql = ("SELECT id, user_id, question_id, question_type, answer, correct, timestamp, item_id, item_type "
+               "FROM quiz_attempts WHERE user_id = ?")
+        params = [user_id]
+        if cursor:
+            position = decode_cursor(cursor, {'timestamp': datetime, 'id': int})
+            sql += " AND (timestamp, id) < (?, ?)"
+            params += [position['timestamp'], position['id']]
+        sql += " ORDER BY timestamp DESC, id DESC LIMIT ?"
+        params.append(limit)
+
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+
+        attempts = []
+        for row in rows:
+            data = dict(row)
+            position = encode_cursor({'timestamp': data['timestamp'], 'id': data.pop('id')})
+            data['correct'] = bool(data['correct'])
+            data['timestamp'] = datetime.fromisoformat(data['timestamp'])
+            attempts.append((data, position))
+
+        next_cursor = attempts[-1][1] if len(attempts) == limit else None
+        return attempts, next_cursor
+
+    def top_mistakes(self, user_id, limit=20, decay=False):
+        order_column = 'decay_log_score' if decay else 'mistake_count'
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT * FROM user_mistakes WHERE user_id = ? ORDER BY {order_column} DESC LIMIT ?",
+                (user_id, limit)
+            ).fetchall()
+
+        now = datetime.now()
+        return [
+            MistakeLog.model_construct(
+                user_id=row['user_id'],
+                item_id=row['item_id'],
+                item_type=ItemType(row['item_type']),
+                timestamp=datetime.fromisoformat(row['timestamp']),
+                mistake_count=row['mistake_count'],
+                question_type=row['question_type'],
+                decayed_count=decayed_count(row['decay_log_score'], row['mistake_count'], now),
+            )
+            for row in rows
+        ]
+
+    # Quiz sessions
+
+    def put_quiz_session(self, quiz_id, session):
+        data = {**session, 'created_at': _timestamp(session['created_at']),
+                'expires_at': _timestamp(session['expires_at'])}
+        with self._transaction() as conn:
+            # Expired sessions and answers are purged as new ones are stored
+            now = _timestamp(datetime.now())
+            conn.execute("DELETE FROM quiz_sessions WHERE expires_at <= ?", (now,))
+            conn.execute("DELETE FROM quiz_answers WHERE expires_at <= ?", (now,))
+            conn.execute("INSERT OR REPLACE INTO quiz_sessions (id, data, expires_at) VALUES (?, ?, ?)",
+                         (quiz_id, json.dumps(data), data['expires_at']))
+
+    def get_quiz_session(self, quiz_id):
+        with self._lock:
+            row = self._conn.execute("SELECT data FROM quiz_sessions WHERE id = ?", (quiz_id,)).fetchone()
+        if row is None:
+            return None
+        data = json.loads(row['data'])
+        data['created_at'] = datetime.fromisoformat(data['created_at'])
+        data['expires_at'] = datetime.fromisoformat(data['expires_at'])
+        return data
+
+    def claim_quiz_answer(self, quiz_id, question_id, answer, correct, expires_at):
+        with self._transaction() as conn:
+            cursor = conn.execute(
+                "INSERT OR IGNORE INTO quiz_answers (quiz_id, question_id, answer, correct, expires_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (quiz_id, question_id, answer, int(correct), _timestamp(expires_at))
+            )
+            if cursor.rowcount:
+                return None
+            row = conn.execute("SELECT answer, correct FROM quiz_answers WHERE quiz_id = ? AND question_id = ?",
+                               (quiz_id, question_id)).fetchone()
+        return {'answer': row['answer'], 'correct': bool(row['correct'])}
+
+    def release_quiz_answer(self, quiz_id, question_id):
+        with self._transaction() as conn:
+            conn.execute("DELETE FROM quiz_answers WHERE quiz_id = ? AND question_id = ?", (quiz_id, question_id))
+
+    def is_transient_error(self, error):
+        # Locked/busy database and I/O errors; constraint and data errors are not retried
+        return isinstance(error, (OSError, sqlite3.OperationalError))
+
+
+def _catalog_table(collection: str) -> str:
+    if collection not in CATALOG_TABLES:
+        raise ValueError(f"Unknown catalog collection: {collection}")
+    return collection
+
+
+class _Transaction:
+    """Serialize on the repository lock and wrap the block in BEGIN/COMMIT"""
+
+    def __init__(self, conn: sqlite3.Connection, lock: threading.RLock):
+        self._conn = conn
+        self._lock = lock
+
+    def __enter__(self):
+        self._lock.acquire()
+        self._conn.execute("BEGIN IMMEDIATE")
+        return self._conn
+
+    def __exit__(self, exc_type, exc, tb):
+        try:
+            self._conn.execute("ROLLBACK" if exc_type else "COMMIT")
+        finally:
+            self._lock.release()
+        return False
@@ -0,0 +1,180 @@
+from datetime import datetime, timedelta
+from typing import List, Optional, Union
+
+import numpy as np
+
+from models.schemas import UserProgress, MasteryLevel, ItemType
+
+# Mastery levels as small integer codes, ordered by review priority
+MASTERY_CODES = {
+    MasteryLevel.NEW: 0,
+    MasteryLevel.LEARNING: 1,
+    MasteryLevel.FAMILIAR: 2,
+    MasteryLevel.MASTERED: 3
+}
+MASTERY_LEVELS = [MasteryLevel.NEW, MasteryLevel.LEARNING, MasteryLevel.FAMILIAR, MasteryLevel.MASTERED]
+
+NEW, LEARNING, FAMILIAR, MASTERED = range(4)
+
+# Timestamps are kept as integer microseconds since this (naive) epoch so that
+# conversions to and from datetime are exact
+_EPOCH = datetime(1970, 1, 1)
+_MICROSECONDS_PER_DAY = 86_400_000_000
+
+
+def to_micros(value: datetime) -> int:
+    """Convert a naive datetime to integer microseconds since the epoch"""
+    delta = value - _EPOCH
+    return (delta.days * 86_400 + delta.seconds) * 1_000_000 + delta.microseconds
+
+
+def from_micros(value: int) -> datetime:
+    """Convert integer microseconds since the epoch back to a naive datetime"""
+    return _EPOCH + timedelta(microseconds=int(value))
+
+
+class ProgressColumns:
+    """
+    Columnar (structure-of-arrays) representation of many UserProgress rows.
+    """
+
+    def __init__(self, user_id: np.ndarray, item_id: np.ndarray, item_type: np.ndarray,
+                 mastery: np.ndarray, last_reviewed: np.ndarray, next_review: np.ndarray,
+                 correct_count: np.ndarray, incorrect_count: np.ndarray,
+                 ease_factor: np.ndarray, interval: np.ndarray):
+        self.user_id = user_id
+        self.item_id = item_id
+        self.item_type = item_type
+        self.mastery = mastery
+        self.last_reviewed = last_reviewed
+        self.next_review = next_review
+        self.correct_count = correct_count
+        self.incorrect_count = incorrect_count
+        self.ease_factor = ease_factor
+        self.interval = interval
+
+    def __len__(self):
+        return len(self.mastery)
+
+    @classmethod
+    def from_progress(cls, progress_list: List[UserProgress]) -> "ProgressColumns":
+        """Build columns from UserProgress objects"""
+        return cls(
+            user_id=np.array([p.user_id for p in progress_list], dtype=object),
+            item_id=np.array([p.item_id for p in progress_list], dtype=object),
+            item_type=np.array([p.item_type.value for p in progress_list], dtype=object),
+            mastery=np.array([MASTERY_CODES[p.mastery_level] for p in progress_list], dtype=np.int8),
+            last_reviewed=np.array([to_micros(p.last_reviewed) for p in progress_list], dtype=np.int64),
+            next_review=np.array([to_micros(p.next_review) for p in progress_list], dtype=np.int64),
+            correct_count=np.array([p.correct_count for p in progress_list], dtype=np.int64),
+            incorrect_count=np.array([p.incorrect_count for p in progress_list], dtype=np.int64),
+            ease_factor=np.array([p.ease_factor for p in progress_list], dtype=np.float64),
+            interval=np.array([p.interval for p in progress_list], dtype=np.int64),
+        )
+
+    def to_progress(self, index: int) -> UserProgress:
+        """Materialize a single row as a UserProgress"""
+        return UserProgress(
+            user_id=self.user_id[index],
+            item_id=self.item_id[index],
+            item_type=ItemType(self.item_type[index]),
+            mastery_level=MASTERY_LEVELS[self.mastery[index]],
+            last_reviewed=from_micros(self.last_reviewed[index]),
+            next_review=from_micros(self.next_review[index]),
+            correct_count=int(self.correct_count[index]),
+            incorrect_count=int(self.incorrect_count[index]),
+            ease_factor=float(self.ease_factor[index]),
+            interval=int(self.interval[index])
+        )
+
+
+class VectorizedSpacedRepetition:
+    """
+    Batch version of SpacedRepetitionService over ProgressColumns.
+
+    Every operation produces exactly the same results as the scalar service
+    applied row by row.
+    """
+
+    @staticmethod
+    def calculate_next_review(columns: ProgressColumns, correct: np.ndarray,
+                              reviewed_at: Union[datetime, np.ndarray, None] = None,
+                              rows: Optional[np.ndarray] = None) -> ProgressColumns:
+        """
+        Apply one review to each selected row, in place.
+
+        Args:
+            columns: Progress columns to update
+            correct: Boolean array, one entry per selected row
+            reviewed_at: Review time as a datetime, or int64 microseconds per row
+                (defaults to now)
+            rows: Indices of the rows being reviewed (defaults to all rows)
+
+        Returns:
+            The updated columns
+        """
+        if rows is None:
+            rows = np.arange(len(columns))
+        correct = np.asarray(correct, dtype=bool)
+        if reviewed_at is None:
+            reviewed_at = datetime.now()
+        if isinstance(reviewed_at, datetime):
+            reviewed_at = np.int64(to_micros(reviewed_at))
+
+        ease = columns.ease_factor[rows]
+        interval = columns.interval[rows]
+        mastery = columns.mastery[rows]
+        correct_count = columns.correct_count[rows] + correct
+        incorrect_count = columns.incorrect_count[rows] + ~correct
+
+        # Correct answers
+        ease_ok = np.maximum(1.3, ease + 0.1)
+        interval_ok = np.where(
+            interval == 0, 1,
+            np.where(interval == 1, 6, np.floor(interval * ease_ok).astype(np.int64))
+        )
+        mastery_ok = np.where(
+            (interval_ok >= 21) & (correct_count >= 5), MASTERED,
+            np.where(interval_ok >= 6, FAMILIAR, np.where(correct_count >= 1, LEARNING, mastery))
+        )
+
+        # Incorrect answers
+        ease_bad = np.maximum(1.3, ease - 0.2)
+        mastery_bad = np.where(
+            mastery == MASTERED, FAMILIAR, np.where(mastery == FAMILIAR, LEARNING, NEW)
+        )
+
+        new_interval = np.where(correct, interval_ok, 1)
+        columns.ease_factor[rows] = np.where(correct, ease_ok, ease_bad)
+        columns.interval[rows] = new_interval
+        columns.mastery[rows] = np.where(correct, mastery_ok, mastery_bad)
+        columns.correct_count[rows] = correct_count
+        columns.incorrect_count[rows] = incorrect_count
+        columns.last_reviewed[rows] = reviewed_at
+        columns.next_review[rows] = reviewed_at + new_interval * _MICROSECONDS_PER_DAY
+
+        return columns
+
+    @staticmethod
+    def get_items_due_for_review(columns: ProgressColumns, now: Optional[datetime] = None) -> np.ndarray:
+        """
+        Get rows that are due for review.
+
+        Returns:
+            Row indices of due items, sorted by next_review (oldest first)
+            and then mastery level (new items first)
+        """
+        now_micros = to_micros(now or datetime.now())
+        due = np.flatnonzero(columns.next_review <= now_micros)
+
+        # lexsort is stable and sorts by its last key first
+        order = np.lexsort((columns.mastery[due], columns.next_review[due]))
+        return due[order]
+
+    @staticmethod
+    def calculate_retention_rate(columns: ProgressColumns) -> np.ndarray:
+        """Retention rate per row as a percentage (0-100)"""
+        total = columns.correct_count + columns.incorrect_count
+        rate = np.zeros(len(columns), dtype=np.float64)
+        np.divide(columns.correct_count, total, out=rate, where=total > 0)
+        return rate * 100
@@ -0,0 +1,107 @@
+from datetime import date, datetime, timedelta
+from typing import Iterable, Optional
+from models.schemas import UserProgress, ProgressStats, MasteryLevel, ItemType
+
+STATS_COLLECTION = 'user_stats'
+
+# Number of most recent review days kept for streak calculation
+MAX_REVIEW_DAYS = 400
+
+
+def empty_stats(user_id: str) -> dict:
+    """A stats aggregate for a user with no reviews"""
+    return {
+        'user_id': user_id,
+        'items': {
+            item_type.value: {level.value: 0 for level in MasteryLevel}
+            for item_type in ItemType
+        },
+        'total_correct': 0,
+        'total_attempts': 0,
+        'review_days': [],
+        'last_active': None,
+    }
+
+
+def _add_review_day(stats: dict, reviewed_at: datetime):
+    day = reviewed_at.date().isoformat()
+    if day not in stats['review_days']:
+        stats['review_days'] = sorted(stats['review_days'] + [day])[-MAX_REVIEW_DAYS:]
+
+    if stats['last_active'] is None or reviewed_at > stats['last_active']:
+        stats['last_active'] = reviewed_at
+
+
+def apply_review(stats: dict, before: Optional[UserProgress], after: UserProgress) -> dict:
+    """
+    Update a stats aggregate in place for one progress change.
+
+    Args:
+        stats: Current aggregate
+        before: Progress before the review, or None for a newly learned item
+        after: Progress after the review
+
+    Returns:
+        The updated aggregate
+    """
+    if before is not None:
+        stats['items'][before.item_type.value][before.mastery_level.value] -= 1
+        stats['total_correct'] -= before.correct_count
+        stats['total_attempts'] -= before.correct_count + before.incorrect_count
+
+    stats['items'][after.item_type.value][after.mastery_level.value] += 1
+    stats['total_correct'] += after.correct_count
+    stats['total_attempts'] += after.correct_count + after.incorrect_count
+    _add_review_day(stats, after.last_reviewed)
+    return stats
+
+
+def rebuild_stats(user_id: str, progress_list: Iterable[UserProgress], review_days: Iterable[str] = ()) -> dict:
+    """
+    Recompute a stats aggregate from a full scan of the user's progress.
+
+    Review days cannot be recovered from progress alone (only the latest
+    review of each item is stored), so previously recorded days are kept.
+    """
+    stats = empty_stats(user_id)
+    stats['review_days'] = sorted(set(review_days))[-MAX_REVIEW_DAYS:]
+    for progress in progress_list:
+        apply_review(stats, None, progress)
+    return stats
+
+
+def calculate_streak(review_days: Iterable[str], today: Optional[date] = None) -> int:
+    """
+    Number of consecutive days with at least one review, ending today (or
+    yesterday, so the streak survives until the user's first review of the day).
+    """
+    days = set(review_days)
+    today = today or date.today()
+
+    day = today if today.isoformat() in days else today - timedelta(days=1)
+    streak = 0
+    while day.isoformat() in days:
+        streak += 1
+        day -= timedelta(days=1)
+    return streak
+
+
+def to_progress_stats(stats: dict, today: Optional[date] = None) -> ProgressStats:
+    """Build the API response from a stats aggregate"""
+    items = stats['items']
+    total_correct = stats['total_correct']
+    total_attempts = stats['total_attempts']
+
+    return ProgressStats(
+        total_learned=sum(sum(levels.values()) for levels in items.values()),
+        radicals_mastered=items[ItemType.RADICAL.value][MasteryLevel.MASTERED.value],
+        characters_mastered=items[ItemType.CHARACTER.value][MasteryLevel.MASTERED.value],
+        accuracy_rate=(total_correct / total_attempts * 100) if total_attempts > 0 else 0.0,
+        streak_days=calculate_streak(stats['review_days'], today),
+        total_reviews=total_attempts
+    )
+
+
+def has_drifted(stored: dict, rebuilt: dict) -> bool:
+    """Whether a stored aggregate disagrees with one rebuilt from a full scan"""
+    return any(stored.get(field) != rebuilt[field] for field in ('items', 'total_correct', 'total_attempts'))
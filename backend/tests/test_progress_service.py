@@ -0,0 +1,78 @@
+"""
+Review writes against the Firestore emulator.
+
+Skipped unless FIRESTORE_EMULATOR_HOST is set, e.g.:
+
+    firebase emulators:start --only firestore
+    FIRESTORE_EMULATOR_HOST=localhost:8080 python -m pytest tests
+"""
+import os
+import threading
+import uuid
+from datetime import datetime
+
+import pytest
+
+from models.schemas import ItemType, ReviewEvent
+from services import progress_service, stats_service
+
+pytestmark = pytest.mark.skipif(
+    not os.getenv("FIRESTORE_EMULATOR_HOST"), reason="needs the Firestore emulator (FIRESTORE_EMULATOR_HOST)"
+)
+
+
+@pytest.fixture
+def db():
+    from google.cloud import firestore
+    return firestore.Client(project="happy-hanzy-test")
+
+
+def _attempts(db, user_id: str, item_id: str) -> int:
+    doc_id = progress_service.progress_doc_id(user_id, ItemType.CHARACTER, item_id)
+    data = db.collection(progress_service.PROGRESS_COLLECTION).document(doc_id).get().to_dict()
+    return data['correct_count'] + data['incorrect_count']
+
+
+def test_single_reviews_interleaved_with_batches_are_all_applied(db):
+    user_id = f"user-{uuid.uuid4().hex}"
+    db.collection(stats_service.STATS_COLLECTION).document(user_id).set(
+        progress_service.stats_to_doc(stats_service.empty_stats(user_id))
+    )
+
+    rounds, singles_per_round = 5, 3
+    batch = [
+        ReviewEvent(item_id=item_id, item_type=ItemType.CHARACTER, correct=i % 2 == 0, answered_at=datetime.now())
+        for i, item_id in enumerate(['c1', 'c2', 'c1', 'c3'])
+    ]
+    start = threading.Barrier(2, timeout=30)
+    errors = []
+
+    def run(work):
+        try:
+            for _ in range(rounds):
+                start.wait()
+                work()
+        except Exception as e:  # surfaced by the assertion below
+            errors.append(e)
+
+    def singles():
+        for _ in range(singles_per_round):
+            progress_service.record_review(db, user_id, 'c1', ItemType.CHARACTER, False)
+
+    threads = [
+        threading.Thread(target=run, args=(singles,)),
+        threading.Thread(target=run, args=(lambda: progress_service.record_reviews(db, user_id, batch),)),
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert not errors
+    assert _attempts(db, user_id, 'c1') == rounds * (singles_per_round + 2)
+    assert _attempts(db, user_id, 'c2') == rounds
+    assert _attempts(db, user_id, 'c3') == rounds
+
+    stored = progress_service.get_progress_stats(db, user_id)
+    assert stored['total_attempts'] == rounds * (singles_per_round + len(batch))
+    assert progress_service.reconcile_stats(db, user_id)[1] is False